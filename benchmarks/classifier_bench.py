@@ -0,0 +1,129 @@
+"""
+Throughput and latency of the plant disease classifier on a tiny stand-in model.
+
+A small Keras network with the real input shape and class count is built in
+a temporary directory, and the app is imported with PREDICT_MODEL pointing
+at it. The numbers therefore track the serving code (decoding,
+preprocessing, batching, the predict path) rather than the size of the
+trained model, and the run needs no model file.
+
+    python benchmarks/classifier_bench.py [--requests 50] [--batch-sizes 1 8 32] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from timing import percentiles
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "plantdiseaseprediction", "app")
+
+
+def build_stand_in(path: str, classes: int):
+    import tensorflow as tf
+    model = tf.keras.Sequential([
+        tf.keras.Input((224, 224, 3)),
+        tf.keras.layers.Conv2D(8, 3, strides=4, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(classes, activation="softmax"),
+    ])
+    model.save(path)
+
+
+def run(requests: int, batch_sizes, clients: int, seed: int = 0) -> dict:
+    with open(os.path.join(APP_DIR, "class_indices.json")) as file:
+        classes = len(json.load(file))
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "stand_in.h5")
+        build_stand_in(model_path, classes)
+        os.environ["PREDICT_MODEL"] = model_path
+        os.environ["PREDICT_BACKEND"] = "keras"
+        sys.path.insert(0, APP_DIR)
+        import main as classifier
+        from batching import MicroBatcher
+        from PIL import Image
+
+        rng = np.random.default_rng(seed)
+        image_path = os.path.join(tmp, "leaf.jpg")
+        Image.fromarray(rng.integers(0, 256, (600, 800, 3), dtype=np.uint8)).save(image_path, quality=90)
+        results = {}
+
+        # predict_class end to end: decode + preprocess + one forward pass
+        classifier.predict_class(classifier.model, image_path, classifier.class_indices)
+        latencies = []
+        began = time.perf_counter()
+        for _ in range(requests):
+            started = time.perf_counter()
+            classifier.predict_class(classifier.model, image_path, classifier.class_indices)
+            latencies.append((time.perf_counter() - started) * 1000)
+        results["classifier_predict_class"] = {
+            **percentiles(latencies), "images_per_s": round(requests / (time.perf_counter() - began), 2),
+        }
+
+        # Forward pass alone at each batch size
+        for size in batch_sizes:
+            batch = rng.random((size, 224, 224, 3), dtype=np.float32)
+            classifier.predict_batch(classifier.model, batch)
+            rounds = max(1, requests // size)
+            began = time.perf_counter()
+            for _ in range(rounds):
+                classifier.predict_batch(classifier.model, batch)
+            elapsed = time.perf_counter() - began
+            results[f"classifier_batch_{size}"] = {
+                "batch_ms": round(elapsed / rounds * 1000, 3), "images_per_s": round(rounds * size / elapsed, 2),
+            }
+
+        # Concurrent clients through the server's micro-batcher
+        batcher = MicroBatcher(lambda batch: classifier.predict_batch(classifier.model, batch), max(batch_sizes), 5)
+        image = rng.random((224, 224, 3), dtype=np.float32)
+        for size in {1, batcher.max_batch}:
+            classifier.predict_batch(classifier.model, np.zeros((size, 224, 224, 3), dtype=np.float32))
+        latencies = []
+        lock = threading.Lock()
+
+        def client():
+            mine = []
+            for _ in range(max(1, requests // clients)):
+                started = time.perf_counter()
+                batcher.predict(image)
+                mine.append((time.perf_counter() - started) * 1000)
+            with lock:
+                latencies.extend(mine)
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        results["classifier_micro_batched"] = {
+            **percentiles(latencies), "images_per_s": round(len(latencies) / elapsed, 2),
+            "mean_batch_size": batcher.stats()["mean_batch_size"],
+        }
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients for the micro-batched run")
+    parser.add_argument("--json", action="store_true", help="print only the results as JSON (used by run.py)")
+    args = parser.parse_args()
+
+    results = run(args.requests, args.batch_sizes, args.clients)
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for name, metrics in results.items():
+            print(f"{name:<28} " + "  ".join(f"{key}={value}" for key, value in metrics.items()))
+
+
+if __name__ == "__main__":
+    main()
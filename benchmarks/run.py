@@ -0,0 +1,354 @@
+"""
+Benchmark suite for crisp-backend and the plant disease classifier.
+
+Suites:
+  micro       grna_scan / grna_stream guide design over random sequences of increasing length
+  e2e         the FastAPI app in a subprocess against local upstream stubs (stubs.py) with the
+              fake explanation backend: cold reports, stored (warm) reports and one batch
+  classifier  classifier_bench.py on a tiny stand-in model (needs TensorFlow)
+
+Results are written as JSON: {"meta": {...}, "results": {benchmark: {metric: value}}}.
+meta["params"] holds the parameters of each suite that ran. With --baseline
+every metric whose name says which way is better (*_ms, seconds, error_rate
+lower; *_per_s, rps higher) is compared with the stored run, and the exit
+status is 1 when one regressed beyond --tolerance. A suite whose parameters
+differ from the baseline's is not compared.
+
+    python benchmarks/run.py --out results.json --baseline benchmarks/baseline.json
+    python benchmarks/run.py --suite e2e --latency chopchop=0.3 --failure-rate chopchop=0.1 ensembl=0.05
+    python benchmarks/run.py --update-baseline          # after an intended change, on the reference machine
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+CRISP_DIR = os.path.join(ROOT, "crisp-backend")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+SUITES = ("micro", "e2e", "classifier")
+SUITE_PREFIXES = {"micro": "grna_", "e2e": "e2e_", "classifier": "classifier_"}
+
+sys.path.insert(0, CRISP_DIR)
+sys.path.insert(0, os.path.join(CRISP_DIR, "benchmarks"))
+
+from timing import best_of, percentiles  # noqa: E402
+
+
+# ---------------------------------------------------------------- micro
+
+def run_micro(args) -> dict:
+    """bench_grna_scan's whole-sequence design and bench_grna_stream's chunked design from a FASTA."""
+    import bench_grna_scan
+    import bench_grna_stream
+
+    rng = random.Random(args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        fasta = os.path.join(tmp, "seq.fa")
+        for size in args.sizes:
+            seq = "".join(rng.choices("ACGT", k=size))
+            bench_grna_stream.write_fasta(fasta, seq)
+            for label, fn in (
+                ("grna_scan", lambda: bench_grna_scan.vector_design(seq)),
+                ("grna_stream", lambda: bench_grna_stream.stream_design(fasta, top_n=5)),
+            ):
+                seconds, _ = best_of(fn, args.repeat, min_time=0.25)
+                results[f"{label}_{size}"] = {"ms": round(seconds * 1000, 3), "mb_per_s": round(size / seconds / 1e6, 2)}
+                print(f"  {label:<12} {size:>10,} bp  {seconds * 1000:9.1f} ms  {size / seconds / 1e6:7.1f} Mb/s")
+    return results
+
+
+# ---------------------------------------------------------------- e2e
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60):
+    import httpx
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{url} exited with status {process.returncode} before answering")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{url} did not come up within {timeout}s")
+
+
+def stage_means(metrics_text: str) -> dict:
+    """Mean ms per pipeline stage from the app's /metrics output."""
+    sums, counts = {}, {}
+    for kind, stage, value in re.findall(r'crisp_stage_seconds_(sum|count)\{stage="([^"]+)"[^}]*\} (\S+)', metrics_text):
+        target = sums if kind == "sum" else counts
+        target[stage] = target.get(stage, 0) + float(value)
+    return {stage: round(sums[stage] / counts[stage] * 1000, 3) for stage in sorted(sums) if counts.get(stage)}
+
+
+async def load(client, items, concurrency: int) -> dict:
+    """Posts /api/generate-report for every item with `concurrency` requests in flight."""
+    slots = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(item):
+        nonlocal errors
+        async with slots:
+            began = time.perf_counter()
+            try:
+                response = await client.post("/api/generate-report", json=item)
+                ok = response.status_code == 200 and not response.json()["explanation"].startswith("❌")
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - began) * 1000)
+            errors += not ok
+
+    began = time.perf_counter()
+    await asyncio.gather(*(one(item) for item in items))
+    elapsed = time.perf_counter() - began
+    return {**percentiles(latencies), "rps": round(len(items) / elapsed, 2), "error_rate": round(errors / len(items), 4)}
+
+
+async def drive(base_url: str, args) -> dict:
+    import httpx
+    from catalogue import Catalogue
+
+    catalogue = Catalogue.load(os.path.join(CRISP_DIR, "catalogue.json"))
+    targets = [{"crop": t.crop, "trait": t.trait} for t in catalogue.targets]
+    random.Random(args.seed).shuffle(targets)
+    reports, batch = targets[:args.requests], targets[args.requests:args.requests + args.batch_items]
+
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        results["e2e_report_cold"] = await load(client, reports, args.concurrency)
+        results["e2e_report_warm"] = await load(client, reports, args.concurrency)
+
+        began = time.perf_counter()
+        lines = []
+        async with client.stream("POST", "/api/generate-reports", json={"items": batch, "concurrency": args.concurrency}) as response:
+            async for line in response.aiter_lines():
+                if line:
+                    lines.append(json.loads(line))
+        elapsed = time.perf_counter() - began
+        failed = sum(line["status"] != "ok" or line["report"]["explanation"].startswith("❌") for line in lines)
+        results["e2e_batch"] = {
+            "seconds": round(elapsed, 3),
+            "items_per_s": round(len(batch) / elapsed, 2),
+            "error_rate": round(failed / max(len(batch), 1), 4),
+        }
+        results["e2e_stage_mean_ms"] = stage_means((await client.get("/metrics")).text)
+    return results
+
+
+def run_e2e(args) -> dict:
+    stub_port, app_port = free_port(), free_port()
+    stub_url, app_url = f"http://127.0.0.1:{stub_port}", f"http://127.0.0.1:{app_port}"
+    # Gemini is not an HTTP stub: its latency and failures go to the fake explanation backend
+    stub_latency = [f"{name}={value}" for name, value in args.latency.items() if name != "gemini"]
+    stub_failures = [f"{name}={value}" for name, value in args.failure_rate.items() if name != "gemini"]
+    processes = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "ENSEMBL_BASE_URL": f"{stub_url}/ensembl",
+            "NCBI_EUTILS_URL": f"{stub_url}/ncbi",
+            "CHOPCHOP_URL": f"{stub_url}/chopchop/",
+            "EXPLAIN_BACKEND": "fake",
+            "FAKE_TOKEN_DELAY": str(args.latency.get("gemini", 0) / 60),  # the fake answer is ~60 tokens
+            "FAKE_FAILURE_RATE": str(args.failure_rate.get("gemini", 0)),
+            "SEQUENCE_CACHE_PATH": os.path.join(tmp, "sequences.sqlite"),
+            "GENOME_DIR": os.path.join(tmp, "genomes"),
+            "PRECOMPUTE_ON_STARTUP": "0",
+            "ENSEMBL_MAX_RPS": "1000",
+        }
+        try:
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.join(BENCH_DIR, "stubs.py"), "--port", str(stub_port), "--seed", str(args.seed),
+                 "--gene-length", str(args.gene_length), "--latency", *stub_latency, "--failure-rate", *stub_failures],
+                env=env,
+            ))
+            wait_until_up(f"{stub_url}/stats", processes[-1])
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+                cwd=CRISP_DIR, env=env, stdout=subprocess.DEVNULL,
+            ))
+            wait_until_up(f"{app_url}/api/health", processes[-1])
+            results = asyncio.run(drive(app_url, args))
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait(timeout=30)
+    for name, metrics in results.items():
+        print(f"  {name:<18} " + "  ".join(f"{key}={value}" for key, value in metrics.items()))
+    return results
+
+
+# ---------------------------------------------------------------- classifier
+
+def run_classifier(args) -> dict:
+    completed = subprocess.run(
+        [sys.executable, os.path.join(BENCH_DIR, "classifier_bench.py"), "--json", "--requests", str(args.classifier_requests)],
+        capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        print(f"[WARNING] classifier benchmark failed, skipping it:\n{completed.stderr[-2000:]}")
+        return {}
+    results = json.loads(completed.stdout.strip().splitlines()[-1])
+    for name, metrics in results.items():
+        print(f"  {name:<28} " + "  ".join(f"{key}={value}" for key, value in metrics.items()))
+    return results
+
+
+# ---------------------------------------------------------------- baseline
+
+def direction(metric: str):
+    """-1 if lower is better, 1 if higher is better, None for informational metrics."""
+    if metric.endswith("_ms") or metric in ("ms", "seconds", "error_rate"):
+        return -1
+    if metric.endswith("_per_s") or metric == "rps":
+        return 1
+    return None
+
+
+def run_parameters(args) -> dict:
+    """Everything that changes what a suite measures, per suite that runs."""
+    params = {
+        "micro": {"sizes": args.sizes, "repeat": args.repeat, "seed": args.seed},
+        "e2e": {
+            "requests": args.requests, "batch_items": args.batch_items, "concurrency": args.concurrency,
+            "gene_length": args.gene_length, "latency": args.latency, "failure_rate": args.failure_rate, "seed": args.seed,
+        },
+        "classifier": {"requests": args.classifier_requests},
+    }
+    return {suite: params[suite] for suite in args.suite}
+
+
+def mismatched_params(report: dict, baseline: dict) -> dict:
+    """{suite: [parameter, ...]} for every suite that ran with other parameters than the baseline."""
+    mismatched = {}
+    baseline_params = baseline["meta"].get("params", {})
+    for suite, params in report["meta"]["params"].items():
+        before = baseline_params.get(suite)
+        if before is None:
+            mismatched[suite] = ["(not recorded in the baseline)"]
+            continue
+        differing = sorted(name for name in params.keys() | before.keys() if params.get(name) != before.get(name))
+        if differing:
+            mismatched[suite] = differing
+    return mismatched
+
+
+def compare(report: dict, baseline: dict, tolerance: float, error_slack: float = 0.02):
+    """
+    Rows of (benchmark, metric, baseline, current, change, regressed) for
+    every comparable metric, and the suites skipped because their parameters
+    differ from the baseline's ({suite: [parameter, ...]}).
+    """
+    skipped = mismatched_params(report, baseline)
+    rows = []
+    for name, metrics in report["results"].items():
+        if any(name.startswith(SUITE_PREFIXES[suite]) for suite in skipped):
+            continue
+        for metric, value in metrics.items():
+            better = direction(metric)
+            before = baseline["results"].get(name, {}).get(metric)
+            if better is None or before is None:
+                continue
+            if metric == "error_rate":
+                change = value - before
+                regressed = change > error_slack
+            else:
+                change = (value - before) / before if before else 0.0
+                regressed = change * better < -tolerance
+            rows.append((name, metric, before, value, change, regressed))
+    return rows, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--out", help="write the results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--update-baseline", action="store_true", help=f"store the results as {os.path.relpath(DEFAULT_BASELINE, ROOT)}")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before a metric counts as regressed")
+    parser.add_argument("--seed", type=int, default=42)
+    micro = parser.add_argument_group("micro")
+    micro.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 5_000_000])
+    micro.add_argument("--repeat", type=int, default=3)
+    e2e = parser.add_argument_group("e2e")
+    e2e.add_argument("--requests", type=int, default=40, help="distinct crop/trait reports, requested cold then warm")
+    e2e.add_argument("--batch-items", type=int, default=40, help="further items sent through /api/generate-reports")
+    e2e.add_argument("--concurrency", type=int, default=8)
+    e2e.add_argument("--gene-length", type=int, default=5000, help="length of the stub genes")
+    e2e.add_argument("--latency", nargs="*", default=["ensembl=0.05", "ncbi=0.1", "chopchop=0.2", "gemini=0.3"],
+                     help="upstream=seconds for ensembl, ncbi, chopchop, gemini")
+    e2e.add_argument("--failure-rate", nargs="*", default=[], help="upstream=share of failed calls")
+    classifier = parser.add_argument_group("classifier")
+    classifier.add_argument("--classifier-requests", type=int, default=64)
+    args = parser.parse_args()
+
+    def settings(pairs):
+        return {name: float(value) for name, _, value in (pair.partition("=") for pair in pairs)}
+
+    args.latency, args.failure_rate = settings(args.latency), settings(args.failure_rate)
+
+    results = {}
+    for suite in args.suite:
+        print(f"⏱️ {suite}")
+        results.update({"micro": run_micro, "e2e": run_e2e, "classifier": run_classifier}[suite](args))
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "suites": args.suite,
+            "seed": args.seed,
+            "params": run_parameters(args),
+        },
+        "results": results,
+    }
+    for path in filter(None, [args.out, DEFAULT_BASELINE if args.update_baseline else None]):
+        with open(path, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+        print(f"✅ results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline["meta"].get("platform") != report["meta"]["platform"] or baseline["meta"].get("cpu_count") != os.cpu_count():
+            print(f"[WARNING] baseline was recorded on {baseline['meta'].get('platform')} "
+                  f"with {baseline['meta'].get('cpu_count')} CPUs; timings may not be comparable")
+        rows, skipped = compare(report, baseline, args.tolerance)
+        for suite, params in skipped.items():
+            print(f"[WARNING] {suite} ran with other parameters than the baseline ({', '.join(params)}); not compared")
+        print(f"{'benchmark':<28} {'metric':<12} {'baseline':>10} {'current':>10} {'change':>8}")
+        for name, metric, before, value, change, regressed in rows:
+            shown = f"{change:+.3f}" if metric == "error_rate" else f"{change:+.0%}"
+            print(f"{name:<28} {metric:<12} {before:>10} {value:>10} {shown:>8}{'  ❌ REGRESSION' if regressed else ''}")
+        regressions = sum(row[-1] for row in rows)
+        if regressions:
+            print(f"❌ {regressions} metric(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+        print(f"✅ no regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Local stand-ins for the upstreams crisp-backend calls: Ensembl REST, NCBI
+E-utilities and CHOPCHOP. Gemini is replaced by the backend's own
+EXPLAIN_BACKEND=fake, see run.py. Every upstream takes a latency (seconds)
+and a failure rate (share of requests answered with 503), so load tests can
+reproduce slow or flaky services.
+
+Sequences are derived from the gene ID, so runs with the same seed see the
+same genes and the same guides.
+
+    python benchmarks/stubs.py --port 5900 --latency ensembl=0.05 chopchop=0.3 --failure-rate chopchop=0.1
+
+Point crisp-backend at it with
+    ENSEMBL_BASE_URL=http://127.0.0.1:5900/ensembl
+    NCBI_EUTILS_URL=http://127.0.0.1:5900/ncbi
+    CHOPCHOP_URL=http://127.0.0.1:5900/chopchop/
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+from urllib.parse import parse_qs
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+UPSTREAMS = ("ensembl", "ncbi", "chopchop")
+
+
+def parse_settings(pairs) -> dict:
+    """["ensembl=0.05", ...] -> {"ensembl": 0.05}"""
+    settings = {}
+    for pair in pairs or []:
+        name, _, value = pair.partition("=")
+        if name not in UPSTREAMS:
+            raise SystemExit(f"unknown upstream {name!r}, expected one of {', '.join(UPSTREAMS)}")
+        settings[name] = float(value)
+    return settings
+
+
+def gene_sequence(key: str, length: int, seed: int) -> str:
+    digest = hashlib.sha256(f"{seed}:{key}".encode("utf-8")).digest()
+    rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+    return np.frombuffer(b"ACGT", dtype=np.uint8)[rng.integers(0, 4, length)].tobytes().decode("ascii")
+
+
+def create_app(latency: dict = None, failure_rate: dict = None, gene_length: int = 5000, seed: int = 0) -> FastAPI:
+    latency = latency or {}
+    failure_rate = failure_rate or {}
+    rng = random.Random(seed)
+    counts = {name: {"requests": 0, "failed": 0} for name in UPSTREAMS}
+    app = FastAPI()
+
+    async def answer(upstream: str):
+        """Sleeps for the configured latency; returns a 503 response for a simulated failure, else None."""
+        counts[upstream]["requests"] += 1
+        if latency.get(upstream):
+            await asyncio.sleep(latency[upstream])
+        if rng.random() < failure_rate.get(upstream, 0):
+            counts[upstream]["failed"] += 1
+            return JSONResponse({"error": "stub failure"}, status_code=503)
+        return None
+
+    @app.post("/ensembl/lookup/id")
+    async def ensembl_lookup(request: Request):
+        failed = await answer("ensembl")
+        if failed:
+            return failed
+        ids = (await request.json())["ids"]
+        return {i: {"id": i, "seq_region_name": i, "start": 1, "end": gene_length, "strand": 1} for i in ids}
+
+    @app.post("/ensembl/sequence/region/{species}")
+    async def ensembl_regions(species: str, request: Request):
+        failed = await answer("ensembl")
+        if failed:
+            return failed
+        regions = (await request.json())["regions"]
+        return [{"query": r, "seq": gene_sequence(f"{species}:{r.split(':')[0]}", gene_length, seed)} for r in regions]
+
+    @app.get("/ncbi/esearch.fcgi")
+    async def ncbi_search(term: str):
+        failed = await answer("ncbi")
+        if failed:
+            return failed
+        return {"esearchresult": {"idlist": [hashlib.sha1(term.encode("utf-8")).hexdigest()[:10]]}}
+
+    @app.get("/ncbi/efetch.fcgi")
+    async def ncbi_fetch(id: str):
+        failed = await answer("ncbi")
+        if failed:
+            return failed
+        seq = gene_sequence(f"ncbi:{id}", gene_length, seed)
+        return PlainTextResponse(f">{id} stub\n" + "\n".join(seq[i:i + 70] for i in range(0, len(seq), 70)) + "\n")
+
+    @app.post("/chopchop/")
+    async def chopchop(request: Request):
+        failed = await answer("chopchop")
+        if failed:
+            return failed
+        seq = parse_qs((await request.body()).decode("ascii"))["SEQ"][0]  # urlencoded form, as CHOPCHOP takes it
+        results = []
+        for start in range(0, len(seq) - 23, 97):
+            guide = seq[start:start + 20]
+            results.append({
+                "gRNA_sequence": guide,
+                "PAM": seq[start + 20:start + 23],
+                "start": start,
+                "strand": "+",
+                "score": round((guide.count("G") + guide.count("C")) / 20, 3),
+            })
+        return {"results": results}
+
+    @app.get("/stats")
+    async def stats():
+        return counts
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5900)
+    parser.add_argument("--latency", nargs="*", help="upstream=seconds, e.g. ensembl=0.05")
+    parser.add_argument("--failure-rate", nargs="*", help="upstream=share of 503 answers, e.g. chopchop=0.1")
+    parser.add_argument("--gene-length", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(parse_settings(args.latency), parse_settings(args.failure_rate), args.gene_length, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
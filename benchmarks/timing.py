@@ -0,0 +1,31 @@
+"""
+Timing helpers shared by benchmarks/run.py, classifier_bench.py and the
+per-app scripts under crisp-backend/benchmarks and
+src/plantdiseaseprediction/app/benchmarks.
+"""
+import time
+
+import numpy as np
+
+
+def best_of(fn, repeat: int, min_time: float = 0.0):
+    """
+    (seconds, result) of the fastest of at least `repeat` runs of fn(),
+    repeating until `min_time` has passed so short cases are not noise.
+    """
+    best, spent, runs, result = float("inf"), 0.0, 0, None
+    while runs < repeat or spent < min_time:
+        began = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - began
+        best, spent, runs = min(best, elapsed), spent + elapsed, runs + 1
+    return best, result
+
+
+def percentiles(samples_ms) -> dict:
+    samples = np.asarray(samples_ms)
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+    }
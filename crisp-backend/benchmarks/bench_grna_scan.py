@@ -0,0 +1,63 @@
+"""
+Compares the vectorised scanner in grna_scan.py with the original regex
+implementation of grna_design_basic on random sequences.
+
+    python benchmarks/bench_grna_scan.py [--sizes 10000 100000 1000000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "benchmarks"))
+
+import grna_scan  # noqa: E402
+from timing import best_of  # noqa: E402
+
+
+def regex_design(dna_seq, pam="NGG", guide_length=20):
+    """The original + strand only implementation, kept as the reference."""
+    guides = []
+    pam_regex = pam.replace("N", "[ATGC]")
+    for match in re.finditer(f"(?=([ATGC]{{{guide_length}}}{pam_regex}))", dna_seq.upper()):
+        guides.append({
+            "sequence": match.group(1)[:guide_length],
+            "pam": match.group(1)[guide_length:],
+            "start": match.start(),
+            "strand": "+",
+            "score": round(0.9 - (match.start() % 10) * 0.02, 2)
+        })
+    return sorted(guides, key=lambda x: x["score"], reverse=True)
+
+
+def vector_design(dna_seq, pam="NGG", guide_length=20):
+    codes = grna_scan.encode_sequence(dna_seq)
+    candidates = grna_scan.scan_guides(codes, pam=pam, guide_length=guide_length)
+    return candidates, grna_scan.guides_from_candidates(codes, candidates, pam=pam, guide_length=guide_length, top_n=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--pam", default="NGG")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'length':>10} {'regex s':>10} {'+ sites':>9} {'numpy s':>10} {'+/- sites':>10} {'speedup':>8}")
+    for size in args.sizes:
+        seq = "".join(rng.choices("ACGT", k=size))
+        regex_time, regex_guides = best_of(lambda: regex_design(seq, args.pam), args.repeat)
+        numpy_time, (candidates, _) = best_of(lambda: vector_design(seq, args.pam), args.repeat)
+        plus = candidates[candidates["strand"] > 0]
+        if args.pam.upper() in ("NGG", "NAG") and len(plus) != len(regex_guides):
+            raise SystemExit(f"+ strand site count mismatch at {size} bp: {len(plus)} vs {len(regex_guides)}")
+        print(f"{size:>10} {regex_time:>10.4f} {len(regex_guides):>9} {numpy_time:>10.4f} "
+              f"{len(candidates):>10} {regex_time / numpy_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
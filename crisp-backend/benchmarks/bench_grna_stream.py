@@ -0,0 +1,80 @@
+"""
+Compares peak memory and time of whole-sequence gRNA design (grna_scan on one
+array) with chunked design (grna_stream) on a random sequence, read from a
+FASTA and a .2bit file written to a temporary directory.
+
+    python benchmarks/bench_grna_stream.py [--sizes 1000000 10000000 50000000] [--chunk-size 1048576]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grna_scan  # noqa: E402
+import grna_stream  # noqa: E402
+
+
+def measure(fn):
+    """(seconds, peak traced MB, result) of fn()."""
+    tracemalloc.start()
+    began = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - began
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6, result
+
+
+def whole_design(path, top_n):
+    """The pre-streaming path: the whole FASTA as one string, encoded and scanned at once."""
+    with open(path) as file:
+        seq = "".join(line.strip() for line in file if not line.startswith(">"))
+    codes = grna_scan.encode_sequence(seq)
+    candidates = grna_scan.scan_guides(codes)
+    return grna_scan.guides_from_candidates(codes, candidates, top_n=top_n)
+
+
+def write_fasta(path, seq, name="seq"):
+    with open(path, "w") as file:
+        file.write(f">{name}\n")
+        file.writelines(seq[i:i + 60] + "\n" for i in range(0, len(seq), 60))
+
+
+def stream_design(path, chunk_size=grna_stream.DEFAULT_CHUNK, top_n=20):
+    """Chunked design straight from a FASTA or .2bit file."""
+    return grna_stream.design_stream(grna_stream.open_source(path, chunk_size), top_n=top_n).results()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--chunk-size", type=int, default=grna_stream.DEFAULT_CHUNK)
+    parser.add_argument("--top-n", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'length':>11} {'method':>12} {'seconds':>9} {'peak MB':>9} {'same top':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            seq = "".join(rng.choices("ACGT", k=size))
+            fasta, twobit = os.path.join(tmp, "seq.fa"), os.path.join(tmp, "seq.2bit")
+            write_fasta(fasta, seq)
+            grna_stream.write_twobit(twobit, {"seq": seq})
+            del seq
+
+            seconds, peak, reference = measure(lambda: whole_design(fasta, args.top_n))
+            print(f"{size:>11} {'whole':>12} {seconds:>9.2f} {peak:>9.1f} {'':>9}")
+            for label, path in (("stream fasta", fasta), ("stream 2bit", twobit)):
+                seconds, peak, results = measure(lambda: stream_design(path, args.chunk_size, args.top_n))
+                guides = [{k: v for k, v in guide.items() if k != "record"} for guide in results]
+                print(f"{size:>11} {label:>12} {seconds:>9.2f} {peak:>9.1f} {str(guides == reference):>9}")
+
+
+if __name__ == "__main__":
+    main()
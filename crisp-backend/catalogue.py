@@ -0,0 +1,175 @@
+"""
+The crop/trait/gene catalogue, loaded once and indexed.
+
+catalogue.json maps crop -> {"scientific_name", "traits": {trait: {"ensembl_id", "symbol"}}}.
+Loading rejects duplicate keys at any level (a JSON object, like the dict
+literal it replaced, would otherwise keep only the last one) and entries
+missing required fields.
+
+Catalogue is read-only after construction. Every listing the API serves is
+serialised once, with a strong ETag, into a JsonResource, so repeat fetches
+cost a header comparison instead of a JSON encode.
+"""
+import difflib
+import hashlib
+import json
+import os
+import functools
+from types import MappingProxyType
+from typing import NamedTuple
+
+
+class CatalogueError(ValueError):
+    pass
+
+
+class Target(NamedTuple):
+    crop: str
+    trait: str
+    species: str
+    ensembl_id: str
+    symbol: str
+
+    def gene_info(self) -> dict:
+        return {"ensembl_id": self.ensembl_id, "symbol": self.symbol}
+
+    def as_dict(self) -> dict:
+        return self._asdict()
+
+
+class JsonResource(NamedTuple):
+    body: bytes
+    etag: str
+
+    @classmethod
+    def of(cls, payload):
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        return cls(body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+
+
+def normalise(text: str) -> str:
+    return " ".join(text.lower().replace("_", " ").replace("-", " ").split())
+
+
+def _reject_duplicates(pairs):
+    result = {}
+    for key, value in pairs:
+        if key in result:
+            raise CatalogueError(f"duplicate key {key!r}")
+        result[key] = value
+    return result
+
+
+def _group(targets, key):
+    index = {}
+    for target in targets:
+        index.setdefault(key(target), []).append(target)
+    return MappingProxyType({k: tuple(v) for k, v in index.items()})
+
+
+class Catalogue:
+    def __init__(self, data: dict):
+        targets = []
+        crops = {}
+        for crop, entry in data.items():
+            try:
+                species = entry["scientific_name"]
+                traits = entry["traits"]
+                crop_targets = [
+                    Target(crop, trait, species, gene["ensembl_id"], gene["symbol"]) for trait, gene in traits.items()
+                ]
+            except (KeyError, TypeError, AttributeError) as e:
+                raise CatalogueError(f"catalogue entry {crop!r} is malformed: missing {e}") from e
+            crops[crop] = MappingProxyType({target.trait: target for target in crop_targets})
+            targets.extend(crop_targets)
+
+        self.targets = tuple(targets)
+        self.species_of = MappingProxyType({crop: entry["scientific_name"] for crop, entry in data.items()})
+        self.by_crop = MappingProxyType(crops)
+        self.by_trait = _group(targets, lambda t: t.trait)
+        self.by_symbol = _group(targets, lambda t: t.symbol.lower())
+        self.by_ensembl_id = _group(targets, lambda t: t.ensembl_id.lower())
+        self.by_species = _group(targets, lambda t: t.species)
+
+        # Search vocabulary: (normalised text, field, target) for every searchable value
+        self._vocabulary = tuple(
+            (normalise(value), field, target)
+            for target in targets
+            for field, value in (
+                ("crop", target.crop), ("trait", target.trait), ("symbol", target.symbol),
+                ("ensembl_id", target.ensembl_id), ("species", target.species),
+            )
+        ) + tuple(
+            # crops without any traits are still selectable
+            (normalise(crop), "crop", Target(crop, "", self.species_of[crop], "", ""))
+            for crop, traits in crops.items() if not traits
+        )
+        self._words = tuple(sorted({text for text, _, _ in self._vocabulary}))
+
+        self.crops_resource = JsonResource.of({"crops": list(crops)})
+        self.full_resource = JsonResource.of(data)
+        self.traits_resources = MappingProxyType(
+            {crop: JsonResource.of({"traits": list(traits)}) for crop, traits in crops.items()}
+        )
+        self._lookup_resources = {
+            name: MappingProxyType({key: JsonResource.of({"results": [t.as_dict() for t in group]}) for key, group in index.items()})
+            for name, index in (
+                ("trait", self.by_trait), ("symbol", self.by_symbol),
+                ("ensembl_id", self.by_ensembl_id), ("species", self.by_species),
+            )
+        }
+        # Per-instance cache: a method-level lru_cache would keep every Catalogue alive (B019)
+        self.search_resource = functools.lru_cache(maxsize=1024)(self._search_resource)
+
+    @classmethod
+    def load(cls, path: str) -> "Catalogue":
+        with open(path, encoding="utf-8") as file:
+            try:
+                data = json.load(file, object_pairs_hook=_reject_duplicates)
+            except CatalogueError as e:
+                raise CatalogueError(f"{os.path.basename(path)}: {e}") from None
+        return cls(data)
+
+    def target(self, crop: str, trait: str):
+        """The Target for (crop, trait), or None."""
+        traits = self.by_crop.get(crop)
+        return traits.get(trait) if traits is not None else None
+
+    def lookup_resource(self, field: str, value: str):
+        """Pre-serialised targets whose `field` (trait, symbol, ensembl_id or species) equals `value`, or None."""
+        if field in ("symbol", "ensembl_id"):
+            value = value.lower()
+        return self._lookup_resources[field].get(value)
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """
+        Targets matching `query` by crop, trait, gene symbol, Ensembl ID or
+        species: exact matches first, then prefixes, then substrings, then
+        close misspellings (difflib). Underscores, dashes and case are ignored.
+        """
+        query = normalise(query)
+        if not query:
+            return []
+        close = set(difflib.get_close_matches(query, self._words, n=limit, cutoff=0.75))
+        best = {}
+        for text, field, target in self._vocabulary:
+            if text == query:
+                score = 1.0
+            elif text.startswith(query):
+                score = 0.9
+            elif any(word.startswith(query) for word in text.split()):
+                score = 0.8
+            elif query in text:
+                score = 0.7
+            elif text in close:
+                score = round(0.6 * difflib.SequenceMatcher(None, query, text).ratio(), 3)
+            else:
+                continue
+            key = (target.crop, target.trait)
+            if key not in best or score > best[key][0]:
+                best[key] = (score, field, target)
+        ranked = sorted(best.values(), key=lambda item: (-item[0], item[2].crop, item[2].trait))
+        return [{**target.as_dict(), "match": field, "score": score} for score, field, target in ranked[:limit]]
+
+    def _search_resource(self, query: str, limit: int = 20) -> JsonResource:
+        return JsonResource.of({"query": query, "results": self.search(query, limit)})
@@ -0,0 +1,196 @@
+"""
+Concurrent CHOPCHOP client.
+
+The gene is cut into overlapping windows (CHOPCHOP accepts at most 3000 bp
+per request) and the windows are submitted in parallel over one keep-alive
+client, bounded by a semaphore. Transient failures (timeouts, connection
+errors, 429 and 5xx) are retried with exponential backoff, and guides are
+merged and de-duplicated as each window completes.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+
+import httpx
+
+import metrics
+
+WINDOW_LENGTH = 3000  # CHOPCHOP API sequence length limit
+WINDOW_STEP = 2000    # Overlap windows for better coverage
+MIN_WINDOW = 20
+
+
+class ChopchopStats:
+    """Running per-window counters, reported by /api/stats."""
+
+    def __init__(self, sample_size: int = 512):
+        self.windows = 0
+        self.failed_windows = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=sample_size)
+
+    def record(self, latency: float, ok: bool, retries: int):
+        self.windows += 1
+        self.retries += retries
+        if not ok:
+            self.failed_windows += 1
+        self.latencies.append(latency)
+
+    def snapshot(self) -> dict:
+        samples = sorted(self.latencies)
+
+        def pct(p):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 4)
+
+        return {
+            "windows": self.windows,
+            "failed_windows": self.failed_windows,
+            "retries": self.retries,
+            "latency_seconds": {"p50": pct(0.5), "p90": pct(0.9), "p99": pct(0.99), "samples": len(samples)},
+        }
+
+
+def split_windows(dna_seq: str, length: int = WINDOW_LENGTH, step: int = WINDOW_STEP):
+    for start in range(0, len(dna_seq), step):
+        window_seq = dna_seq[start:start + length]
+        if len(window_seq) < MIN_WINDOW:  # skip too-short windows
+            continue
+        yield start, window_seq
+
+
+class ChopchopClient:
+    def __init__(self, url: str, concurrency: int = 4, retries: int = 2,
+                 timeout: float = 30, backoff: float = 0.5, max_retry_after: float = 10):
+        self.url = url
+        self.concurrency = concurrency
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self.stats = ChopchopStats()
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            # CHOPCHOP's certificate chain does not validate everywhere; matches the old verify=False
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                verify=False,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _delay(self, attempt: int, response=None, remaining: float = None) -> float:
+        """
+        Retry-After (capped at max_retry_after) when the server sends one that
+        fits in the remaining time, else exponential backoff with jitter.
+        """
+        backoff = self.backoff * (2 ** attempt) * (1 + random.random())
+        if response is not None and "Retry-After" in response.headers:
+            try:
+                retry_after = float(response.headers["Retry-After"])
+            except ValueError:
+                return backoff
+            if remaining is not None and retry_after > remaining:
+                return backoff
+            return min(retry_after, self.max_retry_after)
+        return backoff
+
+    async def _submit(self, start: int, params: dict, give_up_at: float = None):
+        """
+        Posts one window; returns (start, results) or raises after the last
+        retry, or as soon as the next wait would end past `give_up_at`
+        (a time.monotonic() value).
+        """
+        client = self._get_client()
+        began = time.perf_counter()
+        attempt = 0
+        while True:
+            response = None
+            try:
+                response = await client.post(self.url, data=params)
+                metrics.record_upstream("chopchop", response.status_code)
+                if response.status_code != 429 and response.status_code < 500:
+                    response.raise_for_status()
+                    results = response.json().get("results", [])
+                    self.stats.record(time.perf_counter() - began, True, attempt)
+                    return start, results
+                error = httpx.HTTPStatusError(
+                    f"CHOPCHOP answered {response.status_code}", request=response.request, response=response
+                )
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                metrics.record_upstream("chopchop", "error")
+                error = e
+            except Exception:
+                self.stats.record(time.perf_counter() - began, False, attempt)
+                raise
+            remaining = None if give_up_at is None else give_up_at - time.monotonic()
+            delay = self._delay(attempt, response, remaining)
+            if attempt >= self.retries or (remaining is not None and delay >= remaining):
+                self.stats.record(time.perf_counter() - began, False, attempt)
+                raise error
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def design(self, dna_seq: str, pam: str, genome: str, scoring: str, top_n: int, deadline: float = None):
+        """
+        Best `top_n` guides over every window. With `deadline` (seconds), a
+        window stops retrying when its next wait would end after it, so the
+        call returns what it has instead of running into the caller's timeout.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        give_up_at = None if deadline is None else time.monotonic() + deadline
+
+        async def bounded(start, window_seq):
+            params = {
+                "SEQ": window_seq,
+                "GENOME": genome,
+                "PAM": pam,
+                "TYPE": "CRISPR/Cas9",
+                "SCORING": scoring
+            }
+            async with semaphore:
+                try:
+                    found = await self._submit(start, params, give_up_at)
+                    metrics.chopchop_windows.inc("ok")
+                    return found
+                except Exception as e:
+                    print(f"[WARNING] CHOPCHOP window {start}-{start + WINDOW_LENGTH} failed: {e!r}")
+                    metrics.chopchop_windows.inc("failed")
+                    failed.append(start)
+                    return start, []
+
+        failed = []
+        tasks = [asyncio.create_task(bounded(start, w)) for start, w in split_windows(dna_seq)]
+        metrics.annotate(windows=len(tasks))
+        best = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                start, results = await next_done
+                for g in results:
+                    # Adjust position to full gene
+                    abs_start = g["start"] + start
+                    key = (g["gRNA_sequence"], abs_start)
+                    if key in best:
+                        continue
+                    best[key] = {
+                        "sequence": g["gRNA_sequence"],
+                        "pam": g["PAM"],
+                        "start": abs_start,
+                        "strand": g["strand"],
+                        "score": g.get("score", 0.0)
+                    }
+        finally:
+            for task in tasks:
+                task.cancel()
+            metrics.annotate(failed_windows=len(failed))
+        # Sort by score descending (position breaks ties, since windows finish in any order)
+        return sorted(best.values(), key=lambda x: (-x["score"], x["start"]))[:top_n]
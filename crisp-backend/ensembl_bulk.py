@@ -0,0 +1,209 @@
+"""
+Batched Ensembl REST client.
+
+Gene sequences are fetched with batched POSTs instead of two GETs per gene:
+one POST /lookup/id per 1000 IDs across all species (without expand, so
+only the coordinates come back), then one POST /sequence/region/{species}
+per 50 regions of each species. Requests go through the caller's pooled
+httpx client.
+
+Throttling adapts to what Ensembl reports: requests are spaced to stay under
+`max_rps`, they pause until X-RateLimit-Reset once X-RateLimit-Remaining
+falls to `reserve`, and a 429 is retried after its Retry-After. Other
+transient failures (transport errors, 5xx) are retried with backoff.
+
+Results distinguish a definite miss from a failure: an ID Ensembl does not
+know maps to None, an ID whose request failed is left out of the result.
+"""
+import asyncio
+import random
+import time
+
+import httpx
+
+import metrics
+
+HEADERS = {"Content-Type": "application/json", "Accept": "application/json"}
+LOOKUP_BATCH = 1000  # Ensembl's POST /lookup/id limit
+REGION_BATCH = 50    # Ensembl's POST /sequence/region limit
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def bisect(fetch, chunk) -> dict:
+    """Retries a rejected chunk as two halves; a single rejected item is a definite miss."""
+    if len(chunk) == 1:
+        return {chunk[0]: None}
+    mid = len(chunk) // 2
+    left, right = await asyncio.gather(fetch(chunk[:mid]), fetch(chunk[mid:]))
+    return {**left, **right}
+
+
+def has_region(gene) -> bool:
+    return isinstance(gene, dict) and all(gene.get(field) is not None for field in ("seq_region_name", "start", "end"))
+
+
+def gene_region(gene: dict) -> str:
+    return f"{gene['seq_region_name']}:{gene['start']}-{gene['end']}"
+
+
+class RateLimiter:
+    def __init__(self, max_rps: float, reserve: int):
+        self.interval = 1 / max_rps if max_rps > 0 else 0
+        self.reserve = reserve
+        self.remaining = None
+        self.limit = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.next_slot = 0.0
+        self.waited = 0.0
+
+    async def wait(self):
+        now = time.monotonic()
+        until = max(self.next_slot, self.blocked_until)
+        if self.remaining is not None and self.remaining <= self.reserve and self.reset_at > now:
+            until = max(until, self.reset_at)
+        self.next_slot = max(until, now) + self.interval
+        if until > now:
+            self.waited += until - now
+            await asyncio.sleep(until - now)
+
+    def update(self, response: httpx.Response):
+        headers = response.headers
+        now = time.monotonic()
+        try:
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Limit" in headers:
+                self.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Reset" in headers:
+                self.reset_at = now + float(headers["X-RateLimit-Reset"])
+            if response.status_code == 429 and "Retry-After" in headers:
+                self.blocked_until = max(self.blocked_until, now + float(headers["Retry-After"]))
+        except ValueError:
+            pass
+
+
+class EnsemblBulkClient:
+    def __init__(self, base_url: str, get_client, concurrency: int = 4, retries: int = 3,
+                 backoff: float = 0.5, max_rps: float = 15, reserve: int = 10):
+        self.base_url = base_url.rstrip("/")
+        self.get_client = get_client
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = RateLimiter(max_rps, reserve)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.counters = {"requests": 0, "retries": 0, "rate_limited": 0, "failed": 0}
+
+    async def _post(self, path: str, payload: dict):
+        """Posts JSON; returns the decoded body, or None if Ensembl rejected the request (400/404)."""
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        async with self._semaphore:
+            while True:
+                await self.limiter.wait()
+                self.counters["requests"] += 1
+                response = None
+                try:
+                    response = await self.get_client().post(url, json=payload, headers=HEADERS)
+                    metrics.record_upstream("ensembl", response.status_code)
+                    self.limiter.update(response)
+                    if response.status_code in (400, 404):
+                        return None
+                    if response.status_code != 429 and response.status_code < 500:
+                        response.raise_for_status()
+                        return response.json()
+                    if response.status_code == 429:
+                        self.counters["rate_limited"] += 1
+                    error = httpx.HTTPStatusError(
+                        f"Ensembl answered {response.status_code}", request=response.request, response=response
+                    )
+                except (httpx.TransportError, httpx.TimeoutException) as e:
+                    metrics.record_upstream("ensembl", "error")
+                    error = e
+                if attempt >= self.retries:
+                    self.counters["failed"] += 1
+                    raise error
+                self.counters["retries"] += 1
+                if response is None or response.status_code != 429:
+                    await asyncio.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+                attempt += 1
+
+    async def lookup(self, ids) -> dict:
+        """{id: {"seq_region_name", "start", "end", "strand"} or None if unknown}; failed chunks are left out."""
+        ids = list(dict.fromkeys(ids))
+
+        async def one(chunk):
+            try:
+                data = await self._post("/lookup/id", {"ids": chunk})
+            except Exception as e:
+                print(f"[WARNING] Ensembl bulk lookup of {len(chunk)} IDs failed: {e!r}")
+                return {}
+            if data is None:
+                # A 400 for the whole chunk: bisect so one bad ID does not sink the rest
+                return await bisect(one, chunk)
+            return {i: data.get(i) if has_region(data.get(i)) else None for i in chunk}
+
+        found = {}
+        for part in await asyncio.gather(*(one(chunk) for chunk in chunks(ids, LOOKUP_BATCH))):
+            found.update(part)
+        return found
+
+    async def regions(self, species: str, regions) -> dict:
+        """{region: sequence or None if rejected}; failed chunks are left out."""
+        regions = list(dict.fromkeys(regions))
+
+        async def one(chunk):
+            try:
+                data = await self._post(f"/sequence/region/{species}", {"regions": chunk})
+            except Exception as e:
+                print(f"[WARNING] Ensembl bulk sequence fetch of {len(chunk)} regions failed: {e!r}")
+                return {}
+            if data is None:
+                return await bisect(one, chunk)
+            seqs = {entry.get("query"): entry.get("seq") for entry in data if isinstance(entry, dict)}
+            return {region: seqs[region] for region in chunk if region in seqs}
+
+        found = {}
+        for part in await asyncio.gather(*(one(chunk) for chunk in chunks(regions, REGION_BATCH))):
+            found.update(part)
+        return found
+
+    async def gene_sequences(self, genes) -> dict:
+        """
+        {(gene_id, species): genomic sequence, or None if Ensembl has no such
+        gene}, for (gene_id, species) pairs. One lookup covers every species;
+        sequences are then fetched per species. Pairs whose requests failed
+        are left out.
+        """
+        genes = list(dict.fromkeys(genes))
+        located = await self.lookup([gene_id for gene_id, _ in genes])
+        by_species = {}
+        for gene_id, species in genes:
+            if located.get(gene_id):
+                by_species.setdefault(species, []).append(gene_region(located[gene_id]))
+        species_list = list(by_species)
+        fetched = await asyncio.gather(*(self.regions(species, by_species[species]) for species in species_list))
+        seqs = dict(zip(species_list, fetched))
+        result = {}
+        for gene_id, species in genes:
+            if gene_id not in located:
+                continue
+            if located[gene_id] is None:
+                result[(gene_id, species)] = None
+                continue
+            region = gene_region(located[gene_id])
+            if region in seqs[species]:
+                result[(gene_id, species)] = seqs[species][region] or None
+        return result
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "rate_limit_remaining": self.limiter.remaining,
+            "rate_limit_limit": self.limiter.limit,
+            "throttled_seconds": round(self.limiter.waited, 3),
+        }
@@ -0,0 +1,200 @@
+"""
+Gene target explanations: prompt, durable cache and pluggable LLM backends.
+
+The cache key is a hash of the prompt template, the model and the inputs,
+so editing PROMPT_TEMPLATE or switching models invalidates old entries
+without touching the database. Only complete, successful generations are
+stored; failures are raised as ExplanationError and never cached.
+
+Backends implement `generate(prompt)` and `stream(prompt)`. GeminiBackend
+talks to Google Gemini; FakeBackend produces a deterministic local answer so
+the pipeline can run offline (EXPLAIN_BACKEND=fake).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+
+import metrics
+
+PROMPT_TEMPLATE = """
+    You are an expert plant biotechnologist explaining a CRISPR target to agricultural scientists in India.
+    Your tone should be professional yet accessible. Use emojis to add visual cues.
+
+    Please provide a concise explanation for the following gene target:
+
+    **🌱 Crop:** {crop}
+    **🎯 Trait for Improvement:** {trait}
+    **🧬 Target Gene:** {symbol} (ID: {ensembl_id})
+
+    Structure your response into these four sections:
+
+    **1. Gene Function & Significance:**
+       - What is the primary role of this gene in the plant?
+       - Why is it a crucial target for improving the specified trait?
+
+    **2. CRISPR-Cas9 Strategy:**
+       - How would gene editing (e.g., knockout, modification) of this gene lead to the desired trait?
+       - Briefly mention the expected molecular outcome (e.g., loss-of-function, altered expression).
+
+    **3. Potential Agronomic Impact:**
+       - What are the real-world benefits for farmers if this modification is successful? (e.g., higher yield, better stress tolerance, reduced inputs).
+       - Mention any known examples or similar research successes.
+
+    **4. Next Steps & Considerations:**
+       - What are the immediate next steps in the research pipeline? (e.g., gRNA validation, transformation, field trials).
+       - Mention one or two key challenges or considerations (e.g., off-target effects, regulatory hurdles).
+    """
+
+TEMPLATE_HASH = hashlib.sha256(PROMPT_TEMPLATE.encode("utf-8")).hexdigest()
+
+
+class ExplanationError(Exception):
+    pass
+
+
+def render_prompt(crop: str, trait: str, symbol: str, ensembl_id: str = "") -> str:
+    return PROMPT_TEMPLATE.format(crop=crop.capitalize(), trait=trait.title(), symbol=symbol, ensembl_id=ensembl_id)
+
+
+def cache_key(model: str, crop: str, trait: str, symbol: str, ensembl_id: str = "") -> str:
+    payload = json.dumps([TEMPLATE_HASH, model, crop, trait, symbol, ensembl_id])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GeminiBackend:
+    upstream = "gemini"  # label in the upstream metrics
+
+    def __init__(self, model):
+        self.model = model
+        self.name = getattr(model, "model_name", "gemini")
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt: str):
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeBackend:
+    """
+    Offline stand-in: answers from the prompt itself, optionally with a
+    per-token delay and a share of failed generations (for load tests).
+    """
+
+    name = "fake"
+    upstream = "fake"
+
+    def __init__(self, token_delay: float = 0.0, failure_rate: float = 0.0):
+        self.token_delay = token_delay
+        self.failure_rate = failure_rate
+
+    def _answer(self, prompt: str) -> str:
+        target = ", ".join(re.findall(r"(?:Crop|Trait for Improvement|Target Gene):\*\* (.+)", prompt))
+        return (
+            f"**1. Gene Function & Significance:** {target}\n\n"
+            "**2. CRISPR-Cas9 Strategy:** knockout of the target gene.\n\n"
+            "**3. Potential Agronomic Impact:** improved trait performance.\n\n"
+            "**4. Next Steps & Considerations:** validate guides, transform, run field trials."
+        )
+
+    async def generate(self, prompt: str) -> str:
+        return "".join([chunk async for chunk in self.stream(prompt)])
+
+    async def stream(self, prompt: str):
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError("fake backend failure")
+        for word in self._answer(prompt).split(" "):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield word + " "
+
+
+class ExplanationCache:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS explanations (key TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        row = self._connect().execute("SELECT text FROM explanations WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, text: str):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO explanations (key, text, created_at) VALUES (?, ?, ?)", (key, text, time.time())
+        )
+
+    def stats(self) -> dict:
+        return {"entries": self._connect().execute("SELECT COUNT(*) FROM explanations").fetchone()[0]}
+
+
+class Explainer:
+    def __init__(self, backend, cache: ExplanationCache):
+        self.backend = backend
+        self.cache = cache
+
+    def _key(self, crop, trait, symbol, ensembl_id):
+        return cache_key(self.backend.name, crop, trait, symbol, ensembl_id)
+
+    async def explain(self, crop: str, trait: str, symbol: str, ensembl_id: str = "") -> str:
+        key = self._key(crop, trait, symbol, ensembl_id)
+        text = await asyncio.to_thread(self.cache.get, key)
+        metrics.record_cache("explanation", "hit" if text is not None else "miss")
+        if text is not None:
+            return text
+        try:
+            text = await self.backend.generate(render_prompt(crop, trait, symbol, ensembl_id))
+        except Exception as e:
+            metrics.record_upstream(self.backend.upstream, "error")
+            raise ExplanationError(str(e)) from e
+        metrics.record_upstream(self.backend.upstream, "ok")
+        if not text:
+            raise ExplanationError("empty response")
+        await asyncio.to_thread(self.cache.put, key, text)
+        return text
+
+    async def stream(self, crop: str, trait: str, symbol: str, ensembl_id: str = ""):
+        """
+        Yields text chunks as the backend produces them; a cached explanation
+        comes back as one chunk. The full text is cached only once the stream
+        completes successfully.
+        """
+        key = self._key(crop, trait, symbol, ensembl_id)
+        text = await asyncio.to_thread(self.cache.get, key)
+        metrics.record_cache("explanation", "hit" if text is not None else "miss")
+        if text is not None:
+            yield text
+            return
+        parts = []
+        try:
+            async for chunk in self.backend.stream(render_prompt(crop, trait, symbol, ensembl_id)):
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            metrics.record_upstream(self.backend.upstream, "error")
+            raise ExplanationError(str(e)) from e
+        metrics.record_upstream(self.backend.upstream, "ok")
+        if parts:
+            await asyncio.to_thread(self.cache.put, key, "".join(parts))
@@ -0,0 +1,205 @@
+"""
+Vectorised local gRNA scanner.
+
+The sequence is encoded once as a uint8 array (A=0 C=1 G=2 T=3, anything
+else 4) and concatenated with its reverse complement, separated by a single
+ambiguous base, so PAM sites on both strands are found in one pass. Each
+candidate is kept as a row of a structured array with its on-target
+features; strings are only built for the guides that are actually returned.
+"""
+import numpy as np
+
+AMBIGUOUS = 4
+
+_ENCODE = np.full(256, AMBIGUOUS, dtype=np.uint8)
+for _code, _base in enumerate("ACGT"):
+    _ENCODE[ord(_base)] = _code
+    _ENCODE[ord(_base.lower())] = _code
+_DECODE = np.frombuffer(b"ACGTN", dtype=np.uint8)
+_COMPLEMENT = np.array([3, 2, 1, 0, AMBIGUOUS], dtype=np.uint8)
+# One bit per base so an IUPAC letter becomes a mask; ambiguous bases match nothing
+_BASE_BITS = np.array([1, 2, 4, 8, 0], dtype=np.uint8)
+_IUPAC_BITS = {
+    "A": 1, "C": 2, "G": 4, "T": 8,
+    "R": 5, "Y": 10, "S": 6, "W": 9, "K": 12, "M": 3,
+    "B": 14, "D": 13, "H": 11, "V": 7, "N": 15,
+}
+
+# PAM -> side of the protospacer it sits on (3' for Cas9-type, 5' for Cas12a)
+PAM_SIDES = {
+    "NGG": 3,
+    "NAG": 3,
+    "NG": 3,
+    "TTTV": 5,
+    "TTTN": 5,
+}
+
+SEED_LENGTH = 12
+
+CANDIDATE_DTYPE = np.dtype([
+    ("start", np.int64),          # leftmost + strand coordinate of the protospacer
+    ("strand", np.int8),          # +1 / -1
+    ("gc", np.float32),
+    ("seed_gc", np.float32),      # GC fraction of the PAM-proximal seed
+    ("max_homopolymer", np.uint8),
+    ("poly_t", np.uint8),         # longest T run (TTTT terminates Pol III transcription)
+    ("score", np.float32),
+])
+
+
+def encode_sequence(seq: str) -> np.ndarray:
+    return encode_bytes(seq.encode("ascii"))
+
+
+def encode_bytes(data) -> np.ndarray:
+    """Encodes raw ASCII bases (bytes, bytearray or a uint8 array) without going through str."""
+    return _ENCODE[np.frombuffer(data, dtype=np.uint8)]
+
+
+def decode_sequence(codes: np.ndarray) -> str:
+    return _DECODE[codes].tobytes().decode("ascii")
+
+
+def reverse_complement(codes: np.ndarray) -> np.ndarray:
+    return _COMPLEMENT[codes[::-1]]
+
+
+def pam_side(pam: str) -> int:
+    pam = pam.upper()
+    if pam in PAM_SIDES:
+        return PAM_SIDES[pam]
+    return 5 if pam.startswith("TTT") else 3
+
+
+def _site_positions(codes: np.ndarray, pam: str, guide_length: int, side: int) -> np.ndarray:
+    """Guide start positions (in the orientation of `codes`) followed or preceded by the PAM."""
+    masks = [_IUPAC_BITS[ch] for ch in pam.upper()]
+    total = guide_length + len(masks)
+    m = codes.size - total + 1
+    if m <= 0:
+        return np.empty(0, dtype=np.int64)
+    pam_offset = guide_length if side == 3 else 0
+    guide_offset = 0 if side == 3 else len(masks)
+    bits = None
+    ok = np.ones(m, dtype=bool)
+    for j, mask in enumerate(masks):
+        if mask == 15:
+            continue  # N: ambiguous bases are rejected below with the rest of the site
+        if mask in (1, 2, 4, 8):
+            ok &= codes[pam_offset + j:pam_offset + j + m] == mask.bit_length() - 1
+        else:
+            if bits is None:
+                bits = _BASE_BITS[codes]
+            ok &= (bits[pam_offset + j:pam_offset + j + m] & mask) != 0
+    sites = np.flatnonzero(ok)
+    # Drop sites whose span contains an ambiguous base (usually none, or just the strand separator)
+    ambiguous = np.flatnonzero(codes == AMBIGUOUS)
+    if ambiguous.size:
+        inside = np.searchsorted(ambiguous, sites + total) - np.searchsorted(ambiguous, sites)
+        sites = sites[inside == 0]
+    return sites + guide_offset
+
+
+def find_sites(codes: np.ndarray, pam: str = "NGG", guide_length: int = 20) -> np.ndarray:
+    """Guide start positions in `codes` (one strand, as given) adjacent to `pam`."""
+    return _site_positions(codes, pam, guide_length, pam_side(pam))
+
+
+def _guide_matrix(codes: np.ndarray, positions: np.ndarray, guide_length: int) -> np.ndarray:
+    """(guide_length, n_candidates): one contiguous row per guide position."""
+    return codes[np.arange(guide_length)[:, None] + positions[None, :]]
+
+
+def _score(gc, seed_gc, max_homopolymer, poly_t, last_base_g):
+    gc_score = np.clip(1 - np.abs(gc - 0.5) / 0.3, 0, 1)
+    seed_score = np.clip(1 - np.abs(seed_gc - 0.5) / 0.5, 0, 1)
+    run_score = np.where(max_homopolymer >= 5, 0.0, np.where(max_homopolymer == 4, 0.5, 1.0))
+    run_score = np.where(poly_t >= 4, 0.0, run_score)
+    return (0.5 * gc_score + 0.2 * seed_score + 0.2 * run_score + 0.1 * last_base_g).astype(np.float32)
+
+
+def scan_guides(codes: np.ndarray, pam: str = "NGG", guide_length: int = 20, both_strands: bool = True) -> np.ndarray:
+    """
+    Finds every protospacer adjacent to `pam` and returns a CANDIDATE_DTYPE
+    array. `codes` is the output of encode_sequence.
+    """
+    n = codes.size
+    side = pam_side(pam)
+    if both_strands:
+        # + strand, one ambiguous separator, - strand: sites cannot span the join
+        combined = np.concatenate([codes, np.array([AMBIGUOUS], dtype=np.uint8), reverse_complement(codes)])
+    else:
+        combined = codes
+    positions = _site_positions(combined, pam, guide_length, side)
+
+    out = np.empty(positions.size, dtype=CANDIDATE_DTYPE)
+    if positions.size == 0:
+        return out
+    minus = positions > n
+    out["strand"] = np.where(minus, -1, 1)
+    out["start"] = np.where(minus, n - (positions - (n + 1)) - guide_length, positions)
+
+    guides = _guide_matrix(combined, positions, guide_length)
+    strong = (guides == 1) | (guides == 2)
+    out["gc"] = np.count_nonzero(strong, axis=0) / guide_length
+    seed_length = min(SEED_LENGTH, guide_length)
+    seed = strong[-seed_length:] if side == 3 else strong[:seed_length]
+    out["seed_gc"] = np.count_nonzero(seed, axis=0) / seed_length
+
+    # Run length ending at each guide position, updated in place column by column
+    thymine = (guides == 3).view(np.uint8)
+    run = np.ones(positions.size, dtype=np.uint8)
+    max_run = run.copy()
+    t_run = thymine[0].copy()
+    max_t = t_run.copy()
+    for j in range(1, guide_length):
+        run *= guides[j] == guides[j - 1]
+        run += 1
+        np.maximum(max_run, run, out=max_run)
+        t_run *= thymine[j]
+        t_run += thymine[j]
+        np.maximum(max_t, t_run, out=max_t)
+    out["max_homopolymer"] = max_run
+    out["poly_t"] = max_t
+
+    # A G at the PAM-proximal end helps SpCas9 activity; neutral for 5' PAMs
+    last_base_g = (guides[-1] == 2).astype(np.float32) if side == 3 else np.full(positions.size, 0.5, np.float32)
+    out["score"] = _score(out["gc"], out["seed_gc"], max_run, max_t, last_base_g)
+    return out
+
+
+def top_candidates(candidates: np.ndarray, top_n=None) -> np.ndarray:
+    """Best-scoring candidates first, ties broken by position."""
+    if top_n is not None and candidates.size > top_n:
+        cutoff = np.partition(candidates["score"], candidates.size - top_n)[candidates.size - top_n]
+        candidates = candidates[candidates["score"] >= cutoff]
+    order = np.lexsort((candidates["start"], -candidates["score"]))
+    if top_n is not None:
+        order = order[:top_n]
+    return candidates[order]
+
+
+def guides_from_candidates(codes: np.ndarray, candidates: np.ndarray, pam: str = "NGG", guide_length: int = 20, top_n=None):
+    """Converts the best candidates into the report's guide dicts."""
+    side = pam_side(pam)
+    pam_length = len(pam)
+    rc = None
+    guides = []
+    for row in top_candidates(candidates, top_n):
+        start = int(row["start"])
+        if row["strand"] > 0:
+            oriented, pos = codes, start
+        else:
+            if rc is None:
+                rc = reverse_complement(codes)
+            oriented, pos = rc, codes.size - start - guide_length
+        pam_pos = pos + guide_length if side == 3 else pos - pam_length
+        guides.append({
+            "sequence": decode_sequence(oriented[pos:pos + guide_length]),
+            "pam": decode_sequence(oriented[pam_pos:pam_pos + pam_length]),
+            "start": start,
+            "strand": "+" if row["strand"] > 0 else "-",
+            "score": round(float(row["score"]), 2),
+            "gc_content": round(float(row["gc"]), 2),
+        })
+    return guides
@@ -0,0 +1,302 @@
+"""
+Streaming gRNA design for chromosome-scale and multi-gene input.
+
+The sequence is read in chunks: FASTA (optionally gzipped) block by block, or
+a UCSC .2bit file through a memory map. grna_scan scans each chunk on both
+strands. The last guide_length + len(pam) - 1 bases of a chunk are carried
+into the next one, so every site is seen exactly once and none is lost at a
+boundary. Only the best `top_n` guides are kept, in a bounded heap, and
+their strings are built while their chunk is still in memory. Memory
+therefore depends on the chunk size, not on the input length.
+
+    python grna_stream.py genome.2bit --region chr3:1200000-3400000 --top-n 20
+    python grna_stream.py promoters_and_genes.fa.gz --pam TTTV --per-record
+"""
+import argparse
+import gzip
+import heapq
+import itertools
+import json
+import re
+import struct
+import sys
+import time
+
+import numpy as np
+
+import grna_scan
+
+DEFAULT_CHUNK = 1 << 20
+TWOBIT_SIGNATURE = 0x1A412743
+_TWOBIT_CODES = np.array([3, 1, 0, 2], dtype=np.uint8)  # .2bit packs T C A G as 0 1 2 3
+_SHIFTS = np.array([6, 4, 2, 0], dtype=np.uint8)
+
+
+# ---------------------------------------------------------------- sources
+# Every source yields (record_index, record_name, offset, codes) pieces in order;
+# offset is the 0-based position of codes[0] within the record.
+
+def iter_string(seq: str, chunk_size: int = DEFAULT_CHUNK, name: str = "sequence"):
+    for start in range(0, len(seq), chunk_size):
+        yield 0, name, start, grna_scan.encode_sequence(seq[start:start + chunk_size])
+
+
+def iter_fasta(path: str, chunk_size: int = DEFAULT_CHUNK, records=None):
+    """Reads FASTA in blocks of `chunk_size` bytes; line breaks never reach the scanner."""
+    opener = gzip.open if path.endswith(".gz") else open
+    index, name, header, offset = -1, None, None, 0
+    with opener(path, "rb") as handle:
+        while True:
+            data = handle.read(chunk_size)
+            if not data:
+                break
+            pos = 0
+            while pos < len(data):
+                if header is not None:  # inside a ">name description" line
+                    newline = data.find(b"\n", pos)
+                    if newline < 0:
+                        header += data[pos:]
+                        break
+                    header += data[pos:newline]
+                    fields = header.decode("utf-8", "replace").split(None, 1)
+                    index, name, header, offset = index + 1, fields[0] if fields else "", None, 0
+                    pos = newline + 1
+                    continue
+                marker = data.find(b">", pos)
+                end = len(data) if marker < 0 else marker
+                if name is not None and end > pos and (records is None or name in records):
+                    bases = data[pos:end].translate(None, b" \t\r\n")
+                    if bases:
+                        yield index, name, offset, grna_scan.encode_bytes(bases)
+                        offset += len(bases)
+                if marker < 0:
+                    break
+                header, pos = b"", marker + 1
+
+
+class TwoBitFile:
+    """Random access to a UCSC .2bit file through a read-only memory map."""
+
+    def __init__(self, path: str):
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        if int.from_bytes(self.data[:4].tobytes(), "little") == TWOBIT_SIGNATURE:
+            self.endian = "<"
+        elif int.from_bytes(self.data[:4].tobytes(), "big") == TWOBIT_SIGNATURE:
+            self.endian = ">"
+        else:
+            raise ValueError(f"{path} is not a .2bit file")
+        version, count = struct.unpack_from(self.endian + "II", self.data, 4)
+        offset_format = self.endian + ("Q" if version == 1 else "I")
+        self.offsets = {}
+        pos = 16
+        for _ in range(count):
+            size = int(self.data[pos])
+            name = self.data[pos + 1:pos + 1 + size].tobytes().decode("ascii")
+            pos += 1 + size
+            self.offsets[name] = struct.unpack_from(offset_format, self.data, pos)[0]
+            pos += struct.calcsize(offset_format)
+        self._records = {}
+
+    @property
+    def names(self):
+        return list(self.offsets)
+
+    def _record(self, name: str):
+        if name not in self._records:
+            pos = self.offsets[name]
+            size, n_blocks = struct.unpack_from(self.endian + "II", self.data, pos)
+            pos += 8
+            u4 = np.dtype(self.endian + "u4")
+            n_starts = np.frombuffer(self.data, dtype=u4, count=n_blocks, offset=pos).astype(np.int64)
+            n_ends = n_starts + np.frombuffer(self.data, dtype=u4, count=n_blocks, offset=pos + 4 * n_blocks)
+            pos += 8 * n_blocks
+            mask_blocks = struct.unpack_from(self.endian + "I", self.data, pos)[0]
+            pos += 4 + 8 * mask_blocks + 4  # soft-mask blocks (case only) and the reserved word
+            self._records[name] = (size, n_starts, n_ends, pos)
+        return self._records[name]
+
+    def length(self, name: str) -> int:
+        return self._record(name)[0]
+
+    def fetch(self, name: str, start: int, end: int) -> np.ndarray:
+        """Codes for bases [start, end) of `name`; N blocks come back ambiguous."""
+        size, n_starts, n_ends, dna = self._record(name)
+        end = min(end, size)
+        if start >= end:
+            return np.empty(0, dtype=np.uint8)
+        packed = self.data[dna + start // 4:dna + (end - 1) // 4 + 1]
+        bases = ((packed[:, None] >> _SHIFTS) & 3).ravel()
+        codes = _TWOBIT_CODES[bases[start % 4:start % 4 + end - start]]
+        first = np.searchsorted(n_ends, start, side="right")
+        for block_start, block_end in zip(n_starts[first:], n_ends[first:]):
+            if block_start >= end:
+                break
+            codes[max(block_start, start) - start:min(block_end, end) - start] = grna_scan.AMBIGUOUS
+        return codes
+
+
+def iter_twobit(path: str, chunk_size: int = DEFAULT_CHUNK, records=None, region=None):
+    """`region` is (name, start, end), 0-based half-open; otherwise every (selected) record in full."""
+    twobit = TwoBitFile(path)
+    if region is not None:
+        spans = [(region[0], region[1], min(region[2], twobit.length(region[0])))]
+    else:
+        spans = [(name, 0, twobit.length(name)) for name in twobit.names if records is None or name in records]
+    for index, (name, start, end) in enumerate(spans):
+        for chunk_start in range(start, end, chunk_size):
+            yield index, name, chunk_start, twobit.fetch(name, chunk_start, min(chunk_start + chunk_size, end))
+
+
+def write_twobit(path: str, records: dict):
+    """Writes {name: sequence} as a version 0 .2bit file (non-ACGT bases become N blocks)."""
+    encoded = {name: grna_scan.encode_sequence(seq) for name, seq in records.items()}
+    header = struct.pack("<IIII", TWOBIT_SIGNATURE, 0, len(records), 0)
+    index_size = sum(1 + len(name.encode("ascii")) + 4 for name in records)
+    offset = len(header) + index_size
+    index, bodies = b"", []
+    for name, codes in encoded.items():
+        ambiguous = np.flatnonzero(codes == grna_scan.AMBIGUOUS)
+        runs = np.split(ambiguous, np.flatnonzero(np.diff(ambiguous) != 1) + 1) if ambiguous.size else []
+        n_starts = [int(run[0]) for run in runs]
+        n_sizes = [int(run.size) for run in runs]
+        twobit = np.array([2, 1, 3, 0, 0], dtype=np.uint8)[codes]  # A C G T N -> .2bit (N stored as T)
+        twobit = np.concatenate([twobit, np.zeros(-twobit.size % 4, dtype=np.uint8)]).reshape(-1, 4)
+        packed = (twobit << _SHIFTS).sum(axis=1, dtype=np.uint8).tobytes()
+        body = struct.pack("<II", codes.size, len(runs))
+        body += struct.pack(f"<{len(runs)}I", *n_starts) + struct.pack(f"<{len(runs)}I", *n_sizes)
+        body += struct.pack("<II", 0, 0) + packed
+        index += struct.pack("<B", len(name)) + name.encode("ascii") + struct.pack("<I", offset)
+        offset += len(body)
+        bodies.append(body)
+    with open(path, "wb") as handle:
+        handle.write(header + index + b"".join(bodies))
+
+
+def open_source(path: str, chunk_size: int = DEFAULT_CHUNK, records=None, region=None):
+    if path.endswith(".2bit"):
+        return iter_twobit(path, chunk_size, records, region)
+    if region is not None:
+        raise ValueError("--region needs a .2bit file; for FASTA select whole records with --records")
+    return iter_fasta(path, chunk_size, records)
+
+
+def parse_region(text: str):
+    """"chr1:1000-5000" (1-based, inclusive) -> ("chr1", 999, 5000)."""
+    match = re.fullmatch(r"(.+):([\d,]+)-([\d,]+)", text)
+    if not match:
+        raise ValueError(f"region must look like name:start-end, got {text!r}")
+    name, start, end = match.group(1), int(match.group(2).replace(",", "")), int(match.group(3).replace(",", ""))
+    return name, start - 1, end
+
+
+# ---------------------------------------------------------------- design
+
+class StreamDesigner:
+    """Feeds chunks through grna_scan and keeps the best `top_n` guides (per record with `per_record`)."""
+
+    def __init__(self, pam: str = "NGG", guide_length: int = 20, top_n: int = 5, per_record: bool = False):
+        self.pam = pam
+        self.guide_length = guide_length
+        self.top_n = top_n
+        self.per_record = per_record
+        self.overlap = guide_length + len(pam) - 1
+        self.bases = 0
+        self.candidates = 0
+        self._heaps = {}
+        self._names = {}
+        self._order = itertools.count()
+        self._record = None
+        self._tail = np.empty(0, dtype=np.uint8)
+        self._tail_start = 0
+
+    def feed(self, record: int, name: str, offset: int, codes: np.ndarray):
+        if record != self._record:
+            self._record, self._tail, self._tail_start = record, np.empty(0, dtype=np.uint8), offset
+            self._names[record] = name
+        window = np.concatenate([self._tail, codes]) if self._tail.size else codes
+        window_start = self._tail_start
+        self.bases += codes.size
+
+        candidates = grna_scan.scan_guides(window, pam=self.pam, guide_length=self.guide_length)
+        self.candidates += candidates.size
+        if candidates.size:
+            best = grna_scan.top_candidates(candidates, self.top_n)
+            guides = grna_scan.guides_from_candidates(window, best, pam=self.pam, guide_length=self.guide_length)
+            heap = self._heaps.setdefault(record if self.per_record else None, [])
+            for row, guide in zip(best, guides):
+                guide["start"] += window_start
+                guide["record"] = name
+                # Same order as grna_scan.top_candidates: score, then earliest record, position, + strand
+                entry = (float(row["score"]), -record, -guide["start"], guide["strand"] == "+", next(self._order), guide)
+                if len(heap) < self.top_n:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+
+        # No site fits inside the carried tail, so nothing is found twice
+        keep = min(self.overlap, window.size)
+        self._tail = window[window.size - keep:].copy()
+        self._tail_start = window_start + window.size - keep
+
+    def results(self):
+        """Best guides first: a list, or {record_name: list} with per_record."""
+        ranked = {key: [entry[-1] for entry in sorted(heap, reverse=True)] for key, heap in self._heaps.items()}
+        if self.per_record:
+            return {self._names[record]: guides for record, guides in ranked.items()}
+        return ranked.get(None, [])
+
+
+def design_stream(source, pam: str = "NGG", guide_length: int = 20, top_n: int = 5, per_record: bool = False):
+    designer = StreamDesigner(pam, guide_length, top_n, per_record)
+    for record, name, offset, codes in source:
+        designer.feed(record, name, offset, codes)
+    return designer
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("path", help="FASTA (.fa/.fasta/.fna, optionally .gz) or UCSC .2bit")
+    parser.add_argument("--records", nargs="+", help="only these sequence names")
+    parser.add_argument("--region", help="name:start-end, 1-based inclusive (.2bit only)")
+    parser.add_argument("--pam", default="NGG")
+    parser.add_argument("--guide-length", type=int, default=20)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--per-record", action="store_true", help="keep the best guides of every record")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK, help="bases (FASTA: bytes) per chunk")
+    parser.add_argument("--json", action="store_true", help="print the guides as JSON")
+    args = parser.parse_args(argv)
+
+    region = parse_region(args.region) if args.region else None
+    records = set(args.records) if args.records else None
+    began = time.perf_counter()
+    designer = design_stream(
+        open_source(args.path, args.chunk_size, records, region), args.pam, args.guide_length, args.top_n, args.per_record
+    )
+    elapsed = time.perf_counter() - began
+    results = designer.results()
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for record, guides in (results.items() if args.per_record else [(None, results)]):
+            if record is not None:
+                print(f"== {record}")
+            for guide in guides:
+                print(f"{guide['record']}:{guide['start'] + 1} {guide['strand']} {guide['sequence']} {guide['pam']} "
+                      f"score={guide['score']} gc={guide['gc_content']}")
+    print(
+        f"✅ {designer.bases:,} bases, {designer.candidates:,} candidate sites in {elapsed:.1f}s "
+        f"({designer.bases / max(elapsed, 1e-9) / 1e6:.1f} Mb/s), peak RSS {peak_rss_mb()} MB",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,29 @@
 import os
-import requests
+import io
+import asyncio
+import httpx
 import json
-import re
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
 import google.generativeai as genai
 from Bio import Entrez, SeqIO
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from functools import lru_cache
+from sequence_store import SequenceStore
+from chopchop import ChopchopClient
+import grna_scan
+import grna_stream
+import offtarget
+from singleflight import flights, single_flight
+from report_store import ReportStore, fingerprint as report_fingerprint
+from explanations import Explainer, ExplanationCache, ExplanationError, FakeBackend, GeminiBackend
+from catalogue import Catalogue, JsonResource
+from ensembl_bulk import EnsemblBulkClient
+import metrics
 
 # ====================== 🔑 Configuration =================================
 load_dotenv()
@@ -20,127 +35,105 @@ gemini_model = genai.GenerativeModel("gemini-1.5-flash")
 Entrez.email = "your.amrithesh23@example.com" # Be a good citizen and set your email
 
 # ====================== 🧬 Data & API Configuration ============================
-# (trait_species_db remains exactly the same as in your original script)
-trait_species_db = {
-    "rice": { "scientific_name": "oryza_sativa", "traits": { "drought resistance": {"ensembl_id":"LOC_Os06g03670","symbol":"DREB1A"}, "flood tolerance": {"ensembl_id":"LOC_Os09g11460","symbol":"SUB1A"}, "grain size": {"ensembl_id":"GW2","symbol":"GW2"} }},
-    "wheat": { "scientific_name": "triticum_aestivum", "traits": { "rust resistance": {"ensembl_id":"TraesCS7D02G080300","symbol":"Lr34"}, "semi-dwarf": {"ensembl_id":"Rht-B1","symbol":"Rht1"}, "grain protein": {"ensembl_id":"TraesCS6B02G055700","symbol":"GPC-B1"} }},
-    "maize": { "scientific_name": "zea_mays", "traits": { "drought resistance": {"ensembl_id":"Zm00001d052025","symbol":"ZmDREB2A"}, "vitamin a biofort": {"ensembl_id":"Zm00001d048183","symbol":"crtRB1"}, "pest resistance": {"ensembl_id":"Zm00001d015758","symbol":"Bt1"} }},
-    "sorghum": { "scientific_name": "sorghum_bicolor", "traits": { "stay-green": {"ensembl_id":"Stg1","symbol":"Stg1"}, "drought resistance": {"ensembl_id":"SbDREB2A","symbol":"DREB2A"} }},
-    "millet": { "scientific_name": "eleusine_coracana", "traits": { "drought tolerance": {"ensembl_id":"EcDREB1A","symbol":"DREB1A"}, "nutrient content": {"ensembl_id":"EcNAS2","symbol":"NAS2"} }},
-    "barley": { "scientific_name": "hordeum_vulgare", "traits": { "disease resistance": {"ensembl_id":"Mla","symbol":"Mla"}, "malting quality": {"ensembl_id":"HvTLP8","symbol":"TLP"} }},
-    "cotton": { "scientific_name": "gossypium_hirsutum", "traits": { "fiber length": {"ensembl_id":"GhLi","symbol":"Li1"}, "drought tolerance": {"ensembl_id":"GhDREB2A","symbol":"DREB2A"} }},
-    "sugarcane": { "scientific_name": "saccharum_officinarum", "traits": { "sucrose content": {"ensembl_id":"SoSPS3","symbol":"SPS3"}, "drought tolerance": {"ensembl_id":"SoDREB1A","symbol":"DREB1A"} }},
-    "potato": { "scientific_name": "solanum_tuberosum", "traits": { "late blight resistance": {"ensembl_id":"PGSC0003DMG400009332","symbol":"RB"}, "starch quality": {"ensembl_id":"GBSS1","symbol":"GBSS1"} }},
-    "tomato": { "scientific_name": "solanum_lycopersicum", "traits": { "shelf life": {"ensembl_id":"Solyc05g012020","symbol":"rin"}, "fruit size": {"ensembl_id":"FW2.2","symbol":"FW2.2"} }},
-    "eggplant": { "scientific_name": "solanum_melongena", "traits": { "fruit color": {"ensembl_id":"SmMYB1","symbol":"MYB1"}, "eggplant borer resistance": {"ensembl_id":"SmCBP","symbol":"CBP"} }},
-    "okra": { "scientific_name": "abelmoschus_esculentus", "traits": { "fibre strength": {"ensembl_id":"AeCesA1","symbol":"CesA1"} }},
-    "okra_pulses": { "scientific_name": "vasconcellea_puberula", "traits": {} },
-    "mustard": { "scientific_name": "brassica_juncea", "traits": { "oil content": {"ensembl_id":"LOC106352424","symbol":"FAD2"}, "cold tolerance": {"ensembl_id":"LOC106353489","symbol":"CBF1"} }},
-    "chickpea": { "scientific_name": "cicer_arietinum", "traits": { "drought resistance": {"ensembl_id":"CaDREB2","symbol":"DREB2"}, "fusarium resistance": {"ensembl_id":"CaFus3","symbol":"Fus3"} }},
-    "lentil": { "scientific_name": "lens_culinaris", "traits": { "frost tolerance": {"ensembl_id":"LcCOR15","symbol":"COR15"} }},
-    "pigeonpea": { "scientific_name": "cajanus_cajan", "traits": { "wilt resistance": {"ensembl_id":"CPCWR1","symbol":"WR1"} }},
-    "peanut": { "scientific_name": "arachis_hypogaea", "traits": { "rust resistance": {"ensembl_id":"AhR1","symbol":"R1"} }},
-    "soybean": { "scientific_name": "glycine_max", "traits": { "oil quality": {"ensembl_id":"GmFAD2","symbol":"FAD2"} }},
-    "banana": { "scientific_name": "musa_acuminata", "traits": { "panama wilt": {"ensembl_id":"MaRGA2","symbol":"RGA2"} }},
-    "tea": { "scientific_name": "camellia_sinensis", "traits": { "cold tolerance": {"ensembl_id":"CsCBF","symbol":"CBF"} }},
-    "coffee": { "scientific_name": "coffea_canephora", "traits": { "disease resistance": {"ensembl_id":"CcRGA","symbol":"RGA"} }},
-    "rubber": { "scientific_name": "hevea_brasiliensis", "traits": { "latex yield": {"ensembl_id":"HbHB1","symbol":"HB1"} }},
-    "sugarbeet": { "scientific_name": "beta_vulgaris", "traits": { "sugar content": {"ensembl_id":"BvSPS1","symbol":"SPS1"} }},
-    "sunflower": { "scientific_name": "helianthus_annuus", "traits": { "oil quality": {"ensembl_id":"HaFAD2","symbol":"FAD2"}, "disease resistance": {"ensembl_id":"HaRGA2","symbol":"RGA2"} }},
-    "sesame": { "scientific_name": "sesamum_indicum", "traits": { "oil quality": {"ensembl_id":"SiFAD2","symbol":"FAD2"}, "lodging resistance": {"ensembl_id":"SiLGR","symbol":"LGR"} }},
-    "papaya": { "scientific_name": "carica_papaya", "traits": { "papaya ring spot": {"ensembl_id":"CpPRSV","symbol":"PRSV"} }},
-    "mango": { "scientific_name": "mangifera_indica", "traits": { "anthracnose": {"ensembl_id":"MiRGA","symbol":"RGA"} }},
-    "grape": { "scientific_name": "vitis_vinifera", "traits": { "powdery mildew": {"ensembl_id":"VrRGA","symbol":"RGA"} }},
-    "apple": { "scientific_name": "malus_domestica", "traits": { "fire blight": {"ensembl_id":"MdRGA","symbol":"RGA"} }},
-    "pear": { "scientific_name": "pyrus_communis", "traits": { "scab resistance": {"ensembl_id":"PcRGA","symbol":"RGA"} }},
-    "cherry": { "scientific_name": "prunus_avium", "traits": { "fruit firmness": {"ensembl_id":"PaEXPA","symbol":"EXPA"} }},
-    "plum": { "scientific_name": "prunus_domestica", "traits": { "stone hardness": {"ensembl_id":"PdTRA1","symbol":"TRA1"} }},
-    "peach": { "scientific_name": "prunus_persica", "traits": { "fruit ripening": {"ensembl_id":"PpACO1","symbol":"ACO1"} }},
-    "olive": { "scientific_name": "olea_europaea", "traits": { "oil quality": {"ensembl_id":"OeFAD2","symbol":"FAD2"} }},
-    "avocado": { "scientific_name": "persea_americana", "traits": { "cold tolerance": {"ensembl_id":"PaCBF","symbol":"CBF"} }},
-    "pineapple": { "scientific_name": "ananas_comosus", "traits": { "fruit sugar": {"ensembl_id":"AcSPS","symbol":"SPS"} }},
-    "citrus": { "scientific_name": "citrus_sinensis", "traits": { "citrus greening": {"ensembl_id":"CsRGA","symbol":"RGA"} }},
-    "watermelon": { "scientific_name": "citrullus_lanatus", "traits": { "disease resistance": {"ensembl_id":"ClRGA","symbol":"RGA"} }},
-    "cucumber": { "scientific_name": "cucumis_sativus", "traits": { "powdery mildew": {"ensembl_id":"CsMLO","symbol":"MLO"} }},
-    "pumpkin": { "scientific_name": "cucurbita_maxima", "traits": { "fruit size": {"ensembl_id":"CmSUN","symbol":"SUN"} }},
-    "brinjal": { "scientific_name": "solanum_melongena", "traits": { "fruit color": {"ensembl_id":"SmMYB1","symbol":"MYB1"} }},
-    "bell_pepper": { "scientific_name": "capsicum_annuum", "traits": { "capsaicin content": {"ensembl_id":"CaPun1","symbol":"Pun1"} }},
-    "chilli": { "scientific_name": "capsicum_frutescens", "traits": { "heat level": {"ensembl_id":"Let1","symbol":"Let1"} }},
-    "carrot": { "scientific_name": "daucus_carota", "traits": { "beta-carotene": {"ensembl_id":"DcPSY1","symbol":"PSY1"} }},
-    "turnip": { "scientific_name": "brassica_rapa", "traits": { "glucosinolate": {"ensembl_id":"BrGSL1","symbol":"GSL1"} }},
-    "beet": { "scientific_name": "beta_vulgaris", "traits": { "sugar content": {"ensembl_id":"BvSPS1","symbol":"SPS1"} }},
-    "spinach": { "scientific_name": "spinacia_oleracea", "traits": { "leaf size": {"ensembl_id":"SoGHD7","symbol":"GHD7"} }},
-    "cabbage": { "scientific_name": "brassica_oleracea", "traits": { "head size": {"ensembl_id":"BoWRKY29","symbol":"WRKY29"} }},
-    "cauliflower": { "scientific_name": "brassica_oleracea", "traits": { "curd size": {"ensembl_id":"BoCAL","symbol":"CAL"} }},
-    "broccoli": { "scientific_name": "brassica_oleracea", "traits": { "flowering time": {"ensembl_id":"BoVRN1","symbol":"VRN1"} }},
-    "radish": { "scientific_name": "raphanus_sativus", "traits": { "root thickness": {"ensembl_id":"RsRD29B","symbol":"RD29B"}, "glucosinolate content": {"ensembl_id":"RsGSL","symbol":"GSL"} }},
-    "ginger": { "scientific_name": "zingiber_officinale", "traits": { "disease resistance": {"ensembl_id":"ZoRGA","symbol":"RGA"}, "aroma profile": {"ensembl_id":"ZoTPS","symbol":"TPS"} }},
-    "turmeric": { "scientific_name": "curcuma_longa", "traits": { "curcumin content": {"ensembl_id":"ClCURS","symbol":"CURS"}, "disease resistance": {"ensembl_id":"ClRGA2","symbol":"RGA2"} }},
-    "pearl_millet": {"scientific_name":"pennisetum_glaucum", "traits":{"heat tolerance":{"ensembl_id":"PgHSP17","symbol":"HSP17"}}},
-    "foxtail_millet": {"scientific_name":"setaria_italica", "traits":{"drought tolerance":{"ensembl_id":"SiDREB2A","symbol":"DREB2A"}}},
-    "barnyard_millet": {"scientific_name":"echinochloa_crus_galli", "traits":{"weed competitiveness":{"ensembl_id":"EcTIR1","symbol":"TIR"}}},
-    "kodo_millet": {"scientific_name":"paspalum_scrobiculatum", "traits":{"nutrient use":{"ensembl_id":"PsNRT1","symbol":"NRT1"}}},
-    "little_millet": {"scientific_name":"panicum_sumatrense", "traits":{"disease resistance":{"ensembl_id":"PsRGA","symbol":"RGA"}}},
-    "proso_millet": {"scientific_name":"panicum_miliaceum", "traits":{"grain size":{"ensembl_id":"PmGW2","symbol":"GW2"}}},
-    "french_bean": {"scientific_name":"phaseolus_vulgaris", "traits":{"virus resistance":{"ensembl_id":"PvRsv1","symbol":"RSV1"}}},
-    "field_bean": {"scientific_name":"vicia_faba", "traits":{"rust resistance":{"ensembl_id":"VfRGA1","symbol":"RGA1"}}},
-    "cowpea": {"scientific_name":"vigna_unguiculata", "traits":{"aphid resistance":{"ensembl_id":"VuRGA","symbol":"RGA"}}},
-    "mung_bean": {"scientific_name":"vigna_radiata", "traits":{"heat tolerance":{"ensembl_id":"VrHSP","symbol":"HSP"}}},
-    "horse_gram": {"scientific_name":"macrotyloma_uniflorum", "traits":{"drought tolerance":{"ensembl_id":"MuDREB","symbol":"DREB"}}},
-    "ricebean": {"scientific_name":"vigna_umatidala", "traits":{"disease tolerance":{"ensembl_id":"VuRGA2","symbol":"RGA2"}}},
-    "nudging_gram": {"scientific_name":"lablab_purpureus", "traits":{"protein quality":{"ensembl_id":"LpGPC","symbol":"GPC"}}},
-    "safflower": {"scientific_name":"carthamus_tinctorius", "traits":{"drought resistance":{"ensembl_id":"CtDREB","symbol":"DREB"}}},
-    "niger_seed": {"scientific_name":"guizotia_abyssinica", "traits":{"oil quality":{"ensembl_id":"GaFAD2","symbol":"FAD2"}}},
-    "castor": {"scientific_name":"ricinus_communis", "traits":{"ricin reduction":{"ensembl_id":"RcRicin","symbol":"RIC"}}},
-    "linseed": {"scientific_name":"linum_usitatissimum", "traits":{"omega_3 content":{"ensembl_id":"LuFAD3","symbol":"FAD3"}, "fibre quality":{"ensembl_id":"LuCESA","symbol":"CESA"}}},
-    "rapeseed": {"scientific_name":"brassica_napus", "traits":{"canola quality":{"ensembl_id":"BnFAD2","symbol":"FAD2"}}},
-    "hemp": {"scientific_name":"cannabis_sativa", "traits":{"cannabinoid content":{"ensembl_id":"CsTHC","symbol":"THC"}, "disease resistance":{"ensembl_id":"CsRGA2","symbol":"RGA2"}}},
-    "jute": {"scientific_name":"corchorus_capsularis", "traits":{"fiber strength":{"ensembl_id":"CcCESA","symbol":"CESA"}}},
-    "cotton": {"scientific_name":"gossypium_barbadense", "traits":{"fibre quality":{"ensembl_id":"GbQTL","symbol":"QTL"}}},
-    "hemp_fiber": {"scientific_name":"cannabis_sativa", "traits":{"fiber yield":{"ensembl_id":"CsHB1","symbol":"HB1"}}},
-    "ramie": {"scientific_name":"boehmeria_nivea", "traits":{"fiber length":{"ensembl_id":"BnLi","symbol":"Li"}}},
-    "flax": {"scientific_name":"linum_usitatissimum", "traits":{"phytochemical":{"ensembl_id":"LuPAL","symbol":"PAL"}}},
-    "henna": {"scientific_name":"lawsonia_inermis", "traits":{"dye content":{"ensembl_id":"LiLWN","symbol":"LWN"}}},
-    "medicinal_astragalus": {"scientific_name":"astragalus_membranaceus", "traits":{"saponin content":{"ensembl_id":"AmSaponin","symbol":"SAP"}}},
-    "ashwagandha": {"scientific_name":"withania_somnifera", "traits":{"withanolide biosynthesis":{"ensembl_id":"WsWNK","symbol":"WNK"}}},
-    "lemongrass": {"scientific_name":"cymbopogon_citratus", "traits":{"citral content":{"ensembl_id":"CcCIT","symbol":"CIT"}}},
-    "mint": {"scientific_name":"mentha_spicata", "traits":{"menthol content":{"ensembl_id":"MsMINT","symbol":"MINT"}}},
-    "basil": {"scientific_name":"ocimum_basilicum", "traits":{"eugenol content":{"ensembl_id":"ObEUG","symbol":"EUG"}}},
-    "coriander": {"scientific_name":"coriandrum_sativum", "traits":{"linalool content":{"ensembl_id":"CsLIN","symbol":"LIN"}}},
-    "fenugreek": {"scientific_name":"trigonella_foenum_graecum", "traits":{"diosgenin content":{"ensembl_id":"TfDIO","symbol":"DIO"}}},
-    "ajwain": {"scientific_name":"trachyspermum_ammi", "traits":{"thymol content":{"ensembl_id":"TaTHY","symbol":"THY"}}},
-    "cumin": {"scientific_name":"cuminum_cyminum", "traits":{"essential oil":{"ensembl_id":"CcEO","symbol":"EO"}}},
-    "carom": {"scientific_name":"trachyspermum_ammi", "traits":{"aromatic oil":{"ensembl_id":"TaARO","symbol":"ARO"}}},
-    "mustard": {"scientific_name":"brassica_rapa", "traits":{"erucic acid content":{"ensembl_id":"BrEAC","symbol":"EAC"}}},
-    "taro": {"scientific_name":"colocasia_esculenta", "traits":{"tuber quality":{"ensembl_id":"CeTQ","symbol":"TQ"}}},
-    "yam": {"scientific_name":"dioscorea_rotundata", "traits":{"starch content":{"ensembl_id":"DrSPS","symbol":"SPS"}}},
-    "cassava": {"scientific_name":"manihot_esculenta", "traits":{"cyanogenic glucoside":{"ensembl_id":"MeCYP79","symbol":"CYP79"}}},
-    "sweet_potato": {"scientific_name":"ipomoea_batatas", "traits":{"beta-carotene":{"ensembl_id":"IbPSY","symbol":"PSY"}}},
-    "plantain": {"scientific_name":"musa_balbisiana", "traits":{"disease resistance":{"ensembl_id":"MbRGA","symbol":"RGA"}}},
-    "oil_palm": {"scientific_name":"elaeis_guineensis", "traits":{"oil yield":{"ensembl_id":"EgOLE","symbol":"OLE"}}},
-    "date_palm": {"scientific_name":"phoenix_dactylifera", "traits":{"drought tolerance":{"ensembl_id":"PdDREB","symbol":"DREB"}}},
-    "pomegranate": {"scientific_name":"punica_granatum", "traits":{"antioxidant content":{"ensembl_id":"PgANT","symbol":"ANT"}}},
-    "guava": {"scientific_name":"psidium_guajava", "traits":{"vitamin_c":{"ensembl_id":"PgGME","symbol":"GME"}}},
-    "jackfruit": {"scientific_name":"artocarpus_heterophyllus", "traits":{"fruit size":{"ensembl_id":"AhSUN","symbol":"SUN"}}},
-    "mangosteen": {"scientific_name":"garcinia_mangostana", "traits":{"xanthone content":{"ensembl_id":"GmXAN","symbol":"XAN"}}},
-    "durian": {"scientific_name":"durio_zibethinus", "traits":{"aroma profile":{"ensembl_id":"DzTPS","symbol":"TPS"}}},
-    "breadfruit": {"scientific_name":"artocarpus_altilis", "traits":{"starch quality":{"ensembl_id":"AaGBSS","symbol":"GBSS"}}},
-    "quinoa": {"scientific_name":"chenopodium_quinoa", "traits":{"saponin content":{"ensembl_id":"CqSAP","symbol":"SAP"}, "protein quality":{"ensembl_id":"CqGPC","symbol":"GPC"}}},
-    "amaranth": {"scientific_name":"amaranthus_cruentus", "traits":{"drought tolerance":{"ensembl_id":"AmDREB","symbol":"DREB"}, "nutrient content":{"ensembl_id":"AmNAS","symbol":"NAS"}}},
-    "buckwheat": {"scientific_name":"fagopyrum_esculentum", "traits":{"rutin content":{"ensembl_id":"FeRUT","symbol":"RUT"}, "disease resistance":{"ensembl_id":"FeRGA","symbol":"RGA"}}},
-    "chia": {"scientific_name":"salvia_hispanica", "traits":{"omega_3 content":{"ensembl_id":"ShFAD3","symbol":"FAD3"}, "drought tolerance":{"ensembl_id":"ShDREB","symbol":"DREB"}}},
-    "kale": {"scientific_name":"brassica_oleracea", "traits":{"glucosinolate content":{"ensembl_id":"BoGSL2","symbol":"GSL2"}, "vitamin content":{"ensembl_id":"BoVTC","symbol":"VTC"}}},
-    "lettuce": {"scientific_name":"lactuca_sativa", "traits":{"leaf crispness":{"ensembl_id":"LsEXP","symbol":"EXP"}, "disease resistance":{"ensembl_id":"LsRGA","symbol":"RGA"}}},
-    "onion": {"scientific_name":"allium_cepa", "traits":{"flavonoid content":{"ensembl_id":"AcFLA","symbol":"FLA"}, "pungency":{"ensembl_id":"AcSUL","symbol":"SUL"}}},
-    "garlic": {"scientific_name":"allium_sativum", "traits":{"allicin content":{"ensembl_id":"AsALI","symbol":"ALI"}, "disease resistance":{"ensembl_id":"AsRGA","symbol":"RGA"}}},
-    "asparagus": {"scientific_name":"asparagus_officinalis", "traits":{"spear thickness":{"ensembl_id":"AoEXP","symbol":"EXP"}, "antioxidant content":{"ensembl_id":"AoANT","symbol":"ANT"}}},
-    "blueberry": {"scientific_name":"vaccinium_corymbosum", "traits":{"anthocyanin content":{"ensembl_id":"VcANT","symbol":"ANT"}, "cold tolerance":{"ensembl_id":"VcCBF","symbol":"CBF"}}},
-}
-
-ENSEMBL_BASE_URL = "https://rest.ensembl.org"
-ENSEMBL_HEADERS = {"Content-Type": "application/json"}
-
-app = FastAPI()
+CATALOGUE_PATH = os.getenv("CATALOGUE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogue.json"))
+catalogue = Catalogue.load(CATALOGUE_PATH)
+
+ENSEMBL_BASE_URL = os.getenv("ENSEMBL_BASE_URL", "https://rest.ensembl.org")
+NCBI_EUTILS_URL = os.getenv("NCBI_EUTILS_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils")
+
+# Per-stage deadlines (seconds) for /api/generate-report
+ENSEMBL_DEADLINE = float(os.getenv("ENSEMBL_DEADLINE", 20))
+NCBI_DEADLINE = float(os.getenv("NCBI_DEADLINE", 30))
+CHOPCHOP_DEADLINE = float(os.getenv("CHOPCHOP_DEADLINE", 120))
+GEMINI_DEADLINE = float(os.getenv("GEMINI_DEADLINE", 60))
+
+# Whole-batch Ensembl prefetch for /api/generate-reports and precompute.py
+ENSEMBL_BULK_DEADLINE = float(os.getenv("ENSEMBL_BULK_DEADLINE", 120))
+
+# /api/generate-reports limits
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 500))
+
+# Local guides scored for off-targets before the top 5 are kept
+OFFTARGET_CANDIDATES = int(os.getenv("OFFTARGET_CANDIDATES", 50))
+
+# Request tracing (see metrics.py): Server-Timing header, and a [TRACE] line for slow requests (0 = off)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+TRACE_LOG_SECONDS = float(os.getenv("TRACE_LOG_SECONDS", 0))
+
+# Sequences longer than this are designed in chunks (grna_stream.py) to keep memory flat
+GRNA_STREAM_THRESHOLD = int(os.getenv("GRNA_STREAM_THRESHOLD", 1_000_000))
+
+chopchop_client = ChopchopClient(
+    os.getenv("CHOPCHOP_URL", "https://chopchop.cbu.uib.no/api/v3/gRNA/"),
+    concurrency=int(os.getenv("CHOPCHOP_CONCURRENCY", 4)),
+    retries=int(os.getenv("CHOPCHOP_RETRIES", 2)),
+    timeout=float(os.getenv("CHOPCHOP_TIMEOUT", 30)),
+    max_retry_after=float(os.getenv("CHOPCHOP_MAX_RETRY_AFTER", 10)),
+)
+
+# Sequences survive restarts and are shared between workers (see sequence_store.py)
+SEQUENCE_CACHE_PATH = os.getenv(
+    "SEQUENCE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "sequences.sqlite"),
+)
+sequence_store = SequenceStore(
+    SEQUENCE_CACHE_PATH,
+    ttl=float(os.getenv("SEQUENCE_CACHE_TTL", 30 * 24 * 3600)),
+    negative_ttl=float(os.getenv("SEQUENCE_CACHE_NEGATIVE_TTL", 3600)),
+    max_bytes=int(os.getenv("SEQUENCE_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+)
+
+# Finished reports, precomputed by precompute.py or stored after the first request
+report_store = ReportStore(
+    os.getenv("REPORT_STORE_PATH", os.path.join(os.path.dirname(SEQUENCE_CACHE_PATH), "reports.sqlite")),
+    max_age=float(os.getenv("REPORT_STORE_MAX_AGE", 7 * 24 * 3600)),
+    # Reports built from a fallback (NCBI sequence or local guides) are retried soon
+    degraded_max_age=float(os.getenv("REPORT_STORE_DEGRADED_MAX_AGE", 3600)),
+)
+# Explanations: durable cache plus a pluggable backend ("gemini" or the offline "fake")
+EXPLAIN_BACKEND = os.getenv("EXPLAIN_BACKEND", "gemini")
+explainer = Explainer(
+    FakeBackend(float(os.getenv("FAKE_TOKEN_DELAY", 0)), float(os.getenv("FAKE_FAILURE_RATE", 0))) if EXPLAIN_BACKEND == "fake" else GeminiBackend(gemini_model),
+    ExplanationCache(os.getenv("EXPLANATION_CACHE_PATH", os.path.join(os.path.dirname(SEQUENCE_CACHE_PATH), "explanations.sqlite"))),
+)
+PRECOMPUTE_ON_STARTUP = os.getenv("PRECOMPUTE_ON_STARTUP", "0") == "1"
+PRECOMPUTE_CONCURRENCY = int(os.getenv("PRECOMPUTE_CONCURRENCY", 2))
+
+# One pooled keep-alive client shared by every request handled in this worker
+http_client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=16),
+        )
+    return http_client
+
+# Batched, rate-limit aware Ensembl lookups over the shared client (see ensembl_bulk.py)
+ensembl = EnsemblBulkClient(
+    ENSEMBL_BASE_URL,
+    get_http_client,
+    concurrency=int(os.getenv("ENSEMBL_CONCURRENCY", 4)),
+    retries=int(os.getenv("ENSEMBL_RETRIES", 3)),
+    max_rps=float(os.getenv("ENSEMBL_MAX_RPS", 15)),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up = None
+    if PRECOMPUTE_ON_STARTUP:
+        warm_up = asyncio.create_task(warm_report_store(PRECOMPUTE_CONCURRENCY))
+    yield
+    if warm_up is not None:
+        warm_up.cancel()
+    if http_client is not None:
+        await http_client.aclose()
+    await chopchop_client.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow CORS for frontend development
 origins = [
@@ -153,203 +146,504 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+STREAMED_MEDIA_TYPES = ("application/x-ndjson", "text/event-stream")
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Collects the spans of every stage a request runs (see metrics.py)."""
+    with metrics.trace() as trace:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - trace.start
+    route = request.scope.get("route")
+    metrics.request_seconds.observe(elapsed, request.method, getattr(route, "path", "unmatched"), response.status_code)
+    # Streamed bodies (batch reports, SSE) send their headers before any stage has run, so
+    # they get no Server-Timing: their stages show up in /metrics and the [TRACE] line instead
+    streamed = response.headers.get("content-type", "").split(";")[0] in STREAMED_MEDIA_TYPES
+    if SERVER_TIMING and not streamed:
+        response.headers["Server-Timing"] = trace.server_timing()
+        response.headers["Timing-Allow-Origin"] = ", ".join(origins)
+    if TRACE_LOG_SECONDS:
+        # Streamed bodies are still running here: log once they finish
+        body = response.body_iterator
+
+        async def body_then_log():
+            async for chunk in body:
+                yield chunk
+            if time.perf_counter() - trace.start >= TRACE_LOG_SECONDS:
+                metrics.log_trace(f"{request.method} {request.url.path}", trace)
+
+        response.body_iterator = body_then_log()
+    return response
+
 # ====================== �� Helper Functions (with caching) =============
-@lru_cache(maxsize=128)
-def cached_fetch_ensembl_gene_sequence(gene_id: str, species: str):
-    try:
-        lookup_url = f"{ENSEMBL_BASE_URL}/lookup/id/{gene_id}?expand=1"
-        response = requests.get(lookup_url, headers=ENSEMBL_HEADERS, timeout=10)
-        if response.status_code != 200:
-            return None
-        data = response.json()
-        region = f"{data['seq_region_name']}:{data['start']}-{data['end']}"
-        seq_url = f"{ENSEMBL_BASE_URL}/sequence/region/{species}/{region}"
-        seq_response = requests.get(seq_url, headers=ENSEMBL_HEADERS, timeout=10)
-        return seq_response.json()["seq"] if seq_response.ok else None
-    except Exception:
+@single_flight("ensembl")
+async def cached_fetch_ensembl_gene_sequence(gene_id: str, species: str):
+    key = f"ensembl:{species}:{gene_id}"
+    hit, seq = await asyncio.to_thread(sequence_store.get, key)
+    metrics.record_cache("sequence", "miss" if not hit else "hit" if seq else "negative")
+    if hit:
+        return seq
+    found = await ensembl.gene_sequences([(gene_id, species)])
+    if (gene_id, species) not in found:
+        return None  # request failed; try again next time
+    seq = found[(gene_id, species)]
+    if seq is None:
+        # Ensembl does not know this ID (or its region)
+        await asyncio.to_thread(sequence_store.put_miss, key)
         return None
+    await asyncio.to_thread(sequence_store.put, key, seq)
+    return seq
 
-@lru_cache(maxsize=128)
-def cached_fetch_ncbi_gene_sequence(symbol: str, organism: str):
+async def prefetch_ensembl_sequences(genes):
+    """
+    Fetches every (gene_id, species) not already in the sequence cache with
+    batched Ensembl requests and stores the results, so the per-gene fetches
+    that follow are cache hits. Returns how many genes were requested.
+    """
+    missing = []
+    for gene_id, species in set(genes):
+        hit, _ = await asyncio.to_thread(sequence_store.get, f"ensembl:{species}:{gene_id}")
+        if not hit:
+            missing.append((gene_id, species))
+    if not missing:
+        return 0
+    found = await ensembl.gene_sequences(missing)
+    for (gene_id, species), seq in found.items():
+        key = f"ensembl:{species}:{gene_id}"
+        if seq is None:
+            await asyncio.to_thread(sequence_store.put_miss, key)
+        else:
+            await asyncio.to_thread(sequence_store.put, key, seq)
+    return len(missing)
+
+@single_flight("ncbi")
+async def cached_fetch_ncbi_gene_sequence(symbol: str, organism: str):
+    key = f"ncbi:{organism}:{symbol}"
+    hit, seq = await asyncio.to_thread(sequence_store.get, key)
+    metrics.record_cache("sequence", "miss" if not hit else "hit" if seq else "negative")
+    if hit:
+        return seq
+    client = get_http_client()
+    # Same E-utilities calls Bio.Entrez makes, but over the shared async client
+    common = {"db": "nucleotide", "email": Entrez.email, "tool": "crisp-backend"}
     try:
         term = f"{symbol}[Gene Name] AND {organism}[Organism]"
-        search = Entrez.esearch(db="nucleotide", term=term, retmax=1)
-        record = Entrez.read(search)
-        if record["IdList"]:
-            gene_id = record["IdList"][0]
-            fetch = Entrez.efetch(db="nucleotide", id=gene_id, rettype="fasta", retmode="text")
-            seq_record = SeqIO.read(fetch, "fasta")
-            return str(seq_record.seq)
+        search = await client.get(
+            f"{NCBI_EUTILS_URL}/esearch.fcgi",
+            params={**common, "term": term, "retmax": 1, "retmode": "json"},
+        )
+        metrics.record_upstream("ncbi", search.status_code)
+        search.raise_for_status()
+        id_list = search.json()["esearchresult"]["idlist"]
+        if not id_list:
+            await asyncio.to_thread(sequence_store.put_miss, key)
+            return None
+        fetch = await client.get(
+            f"{NCBI_EUTILS_URL}/efetch.fcgi",
+            params={**common, "id": id_list[0], "rettype": "fasta", "retmode": "text"},
+        )
+        metrics.record_upstream("ncbi", fetch.status_code)
+        fetch.raise_for_status()
+        seq_record = SeqIO.read(io.StringIO(fetch.text), "fasta")
+        seq = str(seq_record.seq)
+        await asyncio.to_thread(sequence_store.put, key, seq)
+        return seq
+    except httpx.TransportError:
+        metrics.record_upstream("ncbi", "error")
+        return None
     except Exception:
         return None
 
-@lru_cache(maxsize=128)
-def cached_explain_with_gemini(crop: str, trait: str, symbol: str, ensembl_id: str = "", sequence_length: int = 0):
-    prompt = f"""
-    You are an expert plant biotechnologist explaining a CRISPR target to agricultural scientists in India.
-    Your tone should be professional yet accessible. Use emojis to add visual cues.
-
-    Please provide a concise explanation for the following gene target:
-
-    **🌱 Crop:** {crop.capitalize()}
-    **🎯 Trait for Improvement:** {trait.title()}
-    **🧬 Target Gene:** {symbol} (ID: {ensembl_id})
-
-    Structure your response into these four sections:
-    
-    **1. Gene Function & Significance:**
-       - What is the primary role of this gene in the plant?
-       - Why is it a crucial target for improving the specified trait?
-
-    **2. CRISPR-Cas9 Strategy:**
-       - How would gene editing (e.g., knockout, modification) of this gene lead to the desired trait?
-       - Briefly mention the expected molecular outcome (e.g., loss-of-function, altered expression).
-
-    **3. Potential Agronomic Impact:**
-       - What are the real-world benefits for farmers if this modification is successful? (e.g., higher yield, better stress tolerance, reduced inputs).
-       - Mention any known examples or similar research successes.
-
-    **4. Next Steps & Considerations:**
-       - What are the immediate next steps in the research pipeline? (e.g., gRNA validation, transformation, field trials).
-       - Mention one or two key challenges or considerations (e.g., off-target effects, regulatory hurdles).
+@single_flight("gemini")
+async def cached_explain_with_gemini(crop: str, trait: str, symbol: str, ensembl_id: str = ""):
+    """
+    Explanation from the durable cache or the configured backend. Failures
+    come back as a "❌ ..." message and are never cached.
     """
     try:
-        return gemini_model.generate_content(prompt).text
-    except Exception as e:
+        return await explainer.explain(crop, trait, symbol, ensembl_id)
+    except ExplanationError as e:
         return f"❌ Gemini API call failed: {e}"
 
-def grna_design_basic(dna_seq, pam="NGG", guide_length=20):
-    guides = []
-    pam_regex = pam.replace("N", "[ATGC]")
-    for match in re.finditer(f"(?=([ATGC]{{{guide_length}}}{pam_regex}))", dna_seq.upper()):
-        guides.append({
-            "sequence": match.group(1)[:guide_length],
-            "pam": match.group(1)[guide_length:],
-            "start": match.start(),
-            "strand": "+",
-            "score": round(0.9 - (match.start() % 10) * 0.02, 2)
-        })
-    return sorted(guides, key=lambda x: x["score"], reverse=True)
-
-def grna_design_chopchop(dna_seq, pam="NGG", genome="Oryza_sativa.IRGSP-1.0.30", scoring="Doench2016", top_n=5):
+def grna_design_basic(dna_seq, pam="NGG", guide_length=20, top_n=5):
+    """
+    Local fallback when CHOPCHOP is unavailable: scans both strands for `pam`
+    sites and ranks guides on GC content, seed composition and homopolymer runs.
+    """
+    if len(dna_seq) > GRNA_STREAM_THRESHOLD:
+        source = grna_stream.iter_string(dna_seq, grna_stream.DEFAULT_CHUNK)
+        guides = grna_stream.design_stream(source, pam=pam, guide_length=guide_length, top_n=top_n).results()
+        for guide in guides:
+            del guide["record"]
+        return guides
+    codes = grna_scan.encode_sequence(dna_seq)
+    candidates = grna_scan.scan_guides(codes, pam=pam, guide_length=guide_length)
+    return grna_scan.guides_from_candidates(codes, candidates, pam=pam, guide_length=guide_length, top_n=top_n)
+
+@single_flight("chopchop")
+async def grna_design_chopchop(dna_seq, pam="NGG", genome="Oryza_sativa.IRGSP-1.0.30", scoring="Doench2016", top_n=5):
     """
     Calls the CHOPCHOP API in sliding windows to design and score gRNAs for the entire gene sequence.
+    Windows are submitted concurrently (see chopchop.py).
     Returns a list of gRNAs with their scores and positions.
     """
-    url = "https://chopchop.cbu.uib.no/api/v3/gRNA/"
-    max_length = 3000  # CHOPCHOP API sequence length limit
-    step = 2000       # Overlap windows for better coverage
-    all_guides = []
-    seen = set()
-    for start in range(0, len(dna_seq), step):
-        window_seq = dna_seq[start:start+max_length]
-        if len(window_seq) < 20:  # skip too-short windows
-            continue
-        params = {
-            "SEQ": window_seq,
-            "GENOME": genome,
-            "PAM": pam,
-            "TYPE": "CRISPR/Cas9",
-            "SCORING": scoring
-        }
-        try:
-            response = requests.post(url, data=params, timeout=30, verify=False)
-            response.raise_for_status()
-            data = response.json()
-            for g in data.get("results", []):
-                # Adjust position to full gene
-                abs_start = g["start"] + start
-                key = (g["gRNA_sequence"], abs_start)
-                if key in seen:
-                    continue
-                seen.add(key)
-                all_guides.append({
-                    "sequence": g["gRNA_sequence"],
-                    "pam": g["PAM"],
-                    "start": abs_start,
-                    "strand": g["strand"],
-                    "score": g.get("score", 0.0)
-                })
-        except Exception as e:
-            print(f"[WARNING] CHOPCHOP window {start}-{start+max_length} failed: {e}")
-            continue
-    # Sort by score descending and return top_n
-    all_guides = sorted(all_guides, key=lambda x: x["score"], reverse=True)
-    return all_guides[:top_n]
+    return await chopchop_client.design(
+        dna_seq, pam=pam, genome=genome, scoring=scoring, top_n=top_n, deadline=CHOPCHOP_DEADLINE
+    )
 
 # ======================  FastAPI Models ===================================
 class ReportRequest(BaseModel):
     crop: str
     trait: str
 
+class BatchReportRequest(BaseModel):
+    items: List[ReportRequest]
+    concurrency: Optional[int] = None
+
 # ====================== 🚀 API Endpoints ==================================
+def json_resource(request: Request, resource: JsonResource) -> Response:
+    """Sends a pre-serialised catalogue response, or 304 if the client already has this ETag."""
+    headers = {"ETag": resource.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or resource.etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=resource.body, media_type="application/json", headers=headers)
+
 @app.get("/api/crops")
-def get_crops():
+def get_crops(request: Request):
     """Returns a list of all available crops."""
-    return {"crops": list(trait_species_db.keys())}
+    return json_resource(request, catalogue.crops_resource)
 
 @app.get("/api/traits/{crop}")
-def get_traits(crop: str):
+def get_traits(crop: str, request: Request):
     """Returns a list of available traits for a given crop."""
-    if crop not in trait_species_db:
+    resource = catalogue.traits_resources.get(crop)
+    if resource is None:
         raise HTTPException(status_code=404, detail="Crop not found")
-    return {"traits": list(trait_species_db[crop]["traits"].keys())}
+    return json_resource(request, resource)
 
-@app.post("/api/generate-report")
-def generate_report(request: ReportRequest):
-    crop = request.crop
-    trait = request.trait
+@app.get("/api/catalogue/{field}/{value}")
+def catalogue_lookup(field: str, value: str, request: Request):
+    """Every crop/trait target with the given trait, gene symbol, Ensembl ID or species."""
+    fields = {"traits": "trait", "genes": "symbol", "ensembl": "ensembl_id", "species": "species"}
+    if field not in fields:
+        raise HTTPException(status_code=404, detail=f"Unknown lookup '{field}', expected one of {', '.join(fields)}")
+    resource = catalogue.lookup_resource(fields[field], value)
+    if resource is None:
+        raise HTTPException(status_code=404, detail=f"No catalogue entry for {field} '{value}'")
+    return json_resource(request, resource)
 
-    if crop not in trait_species_db or trait not in trait_species_db[crop]["traits"]:
-        raise HTTPException(status_code=404, detail="Invalid crop or trait")
+@app.get("/api/catalogue/search")
+def catalogue_search(q: str, request: Request, limit: int = 20):
+    """Prefix and fuzzy search over crops, traits, gene symbols, Ensembl IDs and species for the UI selectors."""
+    return json_resource(request, catalogue.search_resource(q.strip().lower(), min(max(limit, 1), 100)))
 
-    species = trait_species_db[crop]["scientific_name"]
-    gene_info = trait_species_db[crop]["traits"][trait]
-    gene_id = gene_info["ensembl_id"]
-    symbol = gene_info["symbol"]
+async def fetch_sequence_stage(gene_id: str, symbol: str, species: str):
+    """Ensembl first, NCBI as fallback; each upstream gets its own deadline."""
+    try:
+        with metrics.span("ensembl") as span:
+            dna_seq = await asyncio.wait_for(cached_fetch_ensembl_gene_sequence(gene_id, species), ENSEMBL_DEADLINE)
+            span.set(outcome="ok" if dna_seq else "miss")
+    except asyncio.TimeoutError:
+        print(f"[WARNING] Ensembl fetch for {gene_id} exceeded {ENSEMBL_DEADLINE}s")
+        dna_seq = None
+    if dna_seq:
+        return dna_seq, "Ensembl"
+    try:
+        with metrics.span("ncbi") as span:
+            dna_seq = await asyncio.wait_for(
+                cached_fetch_ncbi_gene_sequence(symbol, species.replace("_", " ")), NCBI_DEADLINE
+            )
+            span.set(outcome="ok" if dna_seq else "miss")
+    except asyncio.TimeoutError:
+        print(f"[WARNING] NCBI fetch for {symbol} exceeded {NCBI_DEADLINE}s")
+        dna_seq = None
+    return dna_seq, "NCBI"
 
-    # Fetch sequence (try Ensembl, then NCBI)
-    dna_seq = cached_fetch_ensembl_gene_sequence(gene_id, species)
-    source = "Ensembl"
-    if not dna_seq:
-        dna_seq = cached_fetch_ncbi_gene_sequence(symbol, species.replace("_", " "))
-        source = "NCBI"
+async def design_guides_stage(dna_seq: str, species: str):
+    """
+    CHOPCHOP scoring with the local scanner as fallback. When an off-target
+    index exists for the species (see offtarget.py), guides are re-ranked on
+    genome-wide specificity. Returns (guides, "CHOPCHOP" or "local").
+    """
+    index = offtarget.get_index(species)
+    try:
+        with metrics.span("chopchop") as span:
+            guides = await asyncio.wait_for(grna_design_chopchop(dna_seq), CHOPCHOP_DEADLINE)
+            if not guides:
+                span.set(outcome="empty")
+                raise Exception("No guides returned from CHOPCHOP")
+        guide_source = "CHOPCHOP"
+    except Exception as e:
+        print(f"[WARNING] CHOPCHOP failed: {e!r}. Falling back to basic gRNA scoring.")
+        top_n = OFFTARGET_CANDIDATES if index is not None else 5
+        with metrics.span("local_design", sequence_length=len(dna_seq)):
+            guides = await asyncio.to_thread(grna_design_basic, dna_seq, top_n=top_n)
+        guide_source = "local"
+    if index is not None:
+        with metrics.span("offtarget"):
+            guides = await asyncio.to_thread(offtarget.rank_guides, index, guides, 5)
+    return guides, guide_source
+
+async def explain_stage(crop: str, trait: str, symbol: str, gene_id: str):
+    try:
+        with metrics.span("gemini") as span:
+            explanation = await asyncio.wait_for(cached_explain_with_gemini(crop, trait, symbol, gene_id), GEMINI_DEADLINE)
+            if explanation.startswith("❌"):
+                span.set(outcome="error")
+            return explanation
+    except asyncio.TimeoutError:
+        return f"❌ Gemini API call failed: no response within {GEMINI_DEADLINE}s"
 
+async def gene_stage(gene_id: str, symbol: str, species: str):
+    """Sequence fetch followed by guide design; shared by every report on the same gene."""
+    dna_seq, source = await fetch_sequence_stage(gene_id, symbol, species)
     if not dna_seq:
         raise HTTPException(status_code=404, detail=f"Could not retrieve gene sequence for {symbol} from Ensembl or NCBI.")
+    guides, guide_source = await design_guides_stage(dna_seq, species)
+    return dna_seq, source, guides, guide_source
 
-    # Use CHOPCHOP for gRNA design and scoring, fallback to basic if error
-    try:
-        guides = grna_design_chopchop(dna_seq)
-        if not guides:
-            raise Exception("No guides returned from CHOPCHOP")
-    except Exception as e:
-        print(f"[WARNING] CHOPCHOP failed: {e}. Falling back to basic gRNA scoring.")
-        guides = grna_design_basic(dna_seq)
+def lookup_target(crop: str, trait: str):
+    target = catalogue.target(crop, trait)
+    if target is None:
+        raise HTTPException(status_code=404, detail="Invalid crop or trait")
+    return target.species, target.gene_info()
+
+async def remember_report(crop: str, trait: str, species: str, gene_info: dict, report: dict):
+    """
+    Keeps a finished report for next time, unless the explanation failed.
+    Reports built from a fallback are kept for REPORT_STORE_DEGRADED_MAX_AGE
+    only, so an upstream outage does not pin them for the full max age.
+    """
+    if report["explanation"].startswith("❌"):
+        return
+    await asyncio.to_thread(
+        report_store.put, crop, trait, report_fingerprint(species, gene_info), report, degraded=is_degraded(report)
+    )
+
+async def stored_report(crop: str, trait: str, species: str, gene_info: dict):
+    with metrics.span("report_store"):
+        body = await asyncio.to_thread(report_store.get, crop, trait, report_fingerprint(species, gene_info))
+        metrics.record_cache("report", "hit" if body is not None else "miss")
+    return body
 
-    explanation = cached_explain_with_gemini(crop, trait, symbol, gene_id, len(dna_seq))
+def is_degraded(report: dict) -> bool:
+    """True if the sequence came from the NCBI fallback or the guides from the local scanner."""
+    return report["source"] != "Ensembl" or report["guide_source"] != "CHOPCHOP"
 
-    report = {
+def assemble_report(crop, trait, gene_info, source, dna_seq, guides, explanation, guide_source):
+    return {
         "crop": crop,
         "trait": trait,
         "gene": gene_info,
         "source": source,
+        "guide_source": guide_source,
         "sequence_length": len(dna_seq),
         "top_grnas": guides[:5],
         "explanation": explanation
     }
+
+@app.post("/api/generate-report")
+async def generate_report(request: ReportRequest):
+    crop = request.crop
+    trait = request.trait
+
+    species, gene_info = lookup_target(crop, trait)
+    gene_id = gene_info["ensembl_id"]
+    symbol = gene_info["symbol"]
+
+    body = await stored_report(crop, trait, species, gene_info)
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+
+    # The explanation only depends on the catalogue entry, so it runs while
+    # the sequence is fetched and guides are designed.
+    explanation_task = asyncio.create_task(explain_stage(crop, trait, symbol, gene_id))
+    try:
+        dna_seq, source, guides, guide_source = await gene_stage(gene_id, symbol, species)
+        explanation = await explanation_task
+    finally:
+        if not explanation_task.done():
+            explanation_task.cancel()
+
+    report = assemble_report(crop, trait, gene_info, source, dna_seq, guides, explanation, guide_source)
+    await remember_report(crop, trait, species, gene_info, report)
     return report
 
+async def stream_batch_reports(items, concurrency: int, use_store: bool = True):
+    """
+    Yields one NDJSON line per item as soon as it is finished. Items that
+    resolve to the same (gene_id, symbol, species) share a single fetch + design task,
+    and at most `concurrency` gene pipelines and explanations run at once.
+    """
+    gene_slots = asyncio.Semaphore(concurrency)
+    explain_slots = asyncio.Semaphore(concurrency)
+    gene_tasks = {}
+    explain_tasks = {}
+
+    async def prefetch():
+        # One batched Ensembl round for every gene that still needs a report
+        genes = []
+        for item in items:
+            target = catalogue.target(item.crop, item.trait)
+            if target is None:
+                continue
+            if use_store and await stored_report(item.crop, item.trait, target.species, target.gene_info()) is not None:
+                continue
+            genes.append((target.ensembl_id, target.species))
+        try:
+            with metrics.span("ensembl_bulk", genes=len(genes)):
+                await asyncio.wait_for(prefetch_ensembl_sequences(genes), ENSEMBL_BULK_DEADLINE)
+        except Exception as e:
+            print(f"[WARNING] Ensembl bulk prefetch failed, falling back to per-gene fetches: {e!r}")
+
+    prefetch_task = asyncio.create_task(prefetch())
+
+    async def bounded(slots, stage, *args):
+        async with slots:
+            return await stage(*args)
+
+    async def gene_after_prefetch(*args):
+        await asyncio.shield(prefetch_task)
+        return await bounded(gene_slots, gene_stage, *args)
+
+    async def run_item(index, item):
+        line = {"index": index, "crop": item.crop, "trait": item.trait}
+        try:
+            species, gene_info = lookup_target(item.crop, item.trait)
+            gene_id, symbol = gene_info["ensembl_id"], gene_info["symbol"]
+            body = await stored_report(item.crop, item.trait, species, gene_info) if use_store else None
+            if body is not None:
+                line.update(status="ok", report=json.loads(body))
+                return line
+            # The symbol is part of the key: the NCBI fallback searches by symbol
+            gene_key = (gene_id, symbol, species)
+            if gene_key not in gene_tasks:
+                gene_tasks[gene_key] = asyncio.create_task(gene_after_prefetch(gene_id, symbol, species))
+            explain_key = (item.crop, item.trait, symbol, gene_id)
+            if explain_key not in explain_tasks:
+                explain_tasks[explain_key] = asyncio.create_task(
+                    bounded(explain_slots, explain_stage, item.crop, item.trait, symbol, gene_id)
+                )
+            dna_seq, source, guides, guide_source = await gene_tasks[gene_key]
+            explanation = await explain_tasks[explain_key]
+            report = assemble_report(item.crop, item.trait, gene_info, source, dna_seq, guides, explanation, guide_source)
+            await remember_report(item.crop, item.trait, species, gene_info, report)
+            line.update(status="ok", report=report)
+        except HTTPException as e:
+            line.update(status="error", status_code=e.status_code, detail=e.detail)
+        except Exception as e:
+            print(f"[WARNING] Batch item {index} ({item.crop}/{item.trait}) failed: {e!r}")
+            line.update(status="error", status_code=500, detail=str(e))
+        return line
+
+    item_tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(item_tasks):
+            yield json.dumps(await next_done) + "\n"
+    finally:
+        # Client went away or the batch finished: stop anything still running
+        for task in [prefetch_task, *item_tasks, *gene_tasks.values(), *explain_tasks.values()]:
+            task.cancel()
+
+def sse_event(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.get("/api/explain/stream")
+async def explain_stream(crop: str, trait: str):
+    """
+    Server-Sent Events version of the report explanation. Sends
+    `data: {"text": ...}` chunks as they are generated, then `event: done`,
+    or `event: error` if generation fails (failures are not cached).
+    """
+    _, gene_info = lookup_target(crop, trait)
+
+    async def events():
+        # Same stage as explain_stage, timed from the first lookup to the last chunk
+        with metrics.span("gemini") as span:
+            try:
+                async for chunk in explainer.stream(crop, trait, gene_info["symbol"], gene_info["ensembl_id"]):
+                    yield sse_event({"text": chunk})
+            except ExplanationError as e:
+                span.set(outcome="error")
+                yield sse_event({"detail": f"❌ Gemini API call failed: {e}"}, event="error")
+                return
+        yield sse_event({}, event="done")
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/generate-reports")
+async def generate_reports(request: BatchReportRequest):
+    """
+    Batch version of /api/generate-report. Streams NDJSON, one line per item
+    in completion order: {"index", "crop", "trait", "status": "ok", "report"}
+    or {"index", "crop", "trait", "status": "error", "status_code", "detail"}.
+    """
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    concurrency = min(request.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    return StreamingResponse(
+        stream_batch_reports(request.items, max(concurrency, 1)), media_type="application/x-ndjson"
+    )
+
+async def warm_report_store(concurrency: int, force: bool = False, progress=None):
+    """
+    Builds every catalogue report that is missing, stale or built from an
+    outdated catalogue entry (all of them with `force`), and drops stored
+    reports for entries that no longer exist. Returns a summary dict.
+    """
+    stored = await asyncio.to_thread(report_store.fingerprints)
+    now = time.time()
+    current = set()
+    todo = []
+    for target in catalogue.targets:
+        current.add((target.crop, target.trait))
+        previous = stored.get((target.crop, target.trait))
+        fresh = (
+            previous is not None
+            and previous[0] == report_fingerprint(target.species, target.gene_info())
+            and now - previous[1] <= report_store.max_age_of(previous[2])
+        )
+        if force or not fresh:
+            todo.append(ReportRequest(crop=target.crop, trait=target.trait))
+    removed = await asyncio.to_thread(report_store.prune, current)
+
+    summary = {"entries": len(current), "refreshed": 0, "failed": 0, "up_to_date": len(current) - len(todo), "removed": removed}
+    async for line in stream_batch_reports(todo, concurrency, use_store=False):
+        result = json.loads(line)
+        summary["refreshed" if result["status"] == "ok" else "failed"] += 1
+        if progress:
+            progress(result)
+    return summary
+
 # ========== Additional endpoints for frontend compatibility ==========
 @app.get("/api/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/api/stats")
+def stats():
+    return {
+        "sequence_cache": sequence_store.stats(),
+        "report_store": report_store.stats(),
+        "explanation_cache": explainer.cache.stats(),
+        "chopchop": chopchop_client.stats.snapshot(),
+        "ensembl": ensembl.stats(),
+        "single_flight": flights.stats(),
+    }
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Stage, request, cache and upstream counters in the Prometheus text format."""
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/api/crops_and_traits")
-def crops_and_traits():
-    return trait_species_db
+def crops_and_traits(request: Request):
+    return json_resource(request, catalogue.full_resource)
 
 # ====================== 🚀 Server Startup ==================================
 if __name__ == "__main__":
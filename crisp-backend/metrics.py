@@ -0,0 +1,255 @@
+"""
+Request tracing and Prometheus metrics.
+
+Every HTTP request gets a Trace held in a context variable. Tasks started
+while handling the request inherit it, so stages running concurrently
+(Gemini next to the sequence fetch, CHOPCHOP windows, batch items) all add
+their spans to the same trace. A span records its stage, its duration, an
+outcome (ok, error, timeout or whatever the stage sets) and free-form
+attributes such as cache=hit. Finished spans also feed the process-wide
+histograms served at GET /metrics in the Prometheus text format.
+
+    with metrics.span("ensembl") as s:
+        seq = await fetch()
+        s.set(outcome="ok" if seq else "miss")
+
+Work coalesced by singleflight.py runs in the context of the first caller,
+so only that caller's trace shows the inner spans. The histograms count the
+work once either way.
+"""
+import asyncio
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels=(), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}  # labels -> [bucket counts..., sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        names = self.label_names + ("le",)
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(values[-1])}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+stage_seconds = registry.add(Histogram(
+    "crisp_stage_seconds", "Duration of report pipeline stages.", ("stage", "outcome")
+))
+request_seconds = registry.add(Histogram(
+    "crisp_request_seconds", "Time until the response headers were ready.", ("method", "route", "status")
+))
+cache_lookups = registry.add(Counter(
+    "crisp_cache_lookups_total", "Cache lookups by cache and result (hit, negative, miss).", ("cache", "result")
+))
+upstream_responses = registry.add(Counter(
+    "crisp_upstream_responses_total", "Upstream HTTP answers by status code, or error for transport failures.",
+    ("upstream", "status"),
+))
+chopchop_windows = registry.add(Counter(
+    "crisp_chopchop_windows_total", "CHOPCHOP windows by final outcome (after retries).", ("outcome",)
+))
+
+
+# ---------------------------------------------------------------- tracing
+
+class Span:
+    __slots__ = ("stage", "start", "duration", "attrs")
+
+    def __init__(self, stage: str, start: float):
+        self.stage = stage
+        self.start = start
+        self.duration = None
+        self.attrs = {}
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def as_dict(self, origin: float) -> dict:
+        return {
+            "stage": self.stage,
+            "offset_ms": round((self.start - origin) * 1000, 1),
+            "duration_ms": round((self.duration or 0) * 1000, 1),
+            **self.attrs,
+        }
+
+
+class Trace:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = []
+
+    def as_dict(self) -> dict:
+        return {
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 1),
+            "spans": [span.as_dict(self.start) for span in self.spans],
+        }
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing header value: one entry per stage with the durations
+        summed, plus total. desc holds each distinct outcome, followed by the
+        cache flag when there is one (e.g. "ok;cache=miss").
+        """
+        totals = {}
+        notes = {}
+        for span in self.spans:
+            if span.duration is None:
+                continue
+            totals[span.stage] = totals.get(span.stage, 0) + span.duration
+            note = str(span.attrs.get("outcome", "ok"))
+            if "cache" in span.attrs:
+                note += f";cache={span.attrs['cache']}"
+            notes.setdefault(span.stage, set()).add(note)
+        entries = [
+            f"{stage};dur={duration * 1000:.1f}"
+            + (f';desc="{"/".join(sorted(notes[stage]))}"' if stage in notes else "")
+            for stage, duration in totals.items()
+        ]
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_trace = contextvars.ContextVar("crisp_trace", default=None)
+_span = contextvars.ContextVar("crisp_span", default=None)
+
+
+@contextmanager
+def trace():
+    """Starts a Trace for the current request and every task it spawns."""
+    current = Trace()
+    token = _trace.set(current)
+    try:
+        yield current
+    finally:
+        _trace.reset(token)
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """
+    Times the enclosed block as `stage`. The outcome is "ok" unless the block
+    sets another one, raises (error) or times out (timeout).
+    """
+    current = Span(stage, time.perf_counter())
+    current.attrs.update(attrs)
+    owner = _trace.get()
+    if owner is not None:
+        owner.spans.append(current)
+    token = _span.set(current)
+    try:
+        yield current
+    except (asyncio.TimeoutError, TimeoutError):
+        current.attrs.setdefault("outcome", "timeout")
+        raise
+    except asyncio.CancelledError:
+        current.attrs.setdefault("outcome", "cancelled")
+        raise
+    except Exception:
+        current.attrs.setdefault("outcome", "error")
+        raise
+    finally:
+        _span.reset(token)
+        current.duration = time.perf_counter() - current.start
+        current.attrs.setdefault("outcome", "ok")
+        stage_seconds.observe(current.duration, stage, current.attrs["outcome"])
+
+
+def annotate(**attrs):
+    """Adds attributes to the innermost open span, if any."""
+    current = _span.get()
+    if current is not None:
+        current.set(**attrs)
+
+
+def record_cache(cache: str, result: str):
+    """result is "hit", "negative" (a cached not-found) or "miss"; also tags the open span."""
+    cache_lookups.inc(cache, result)
+    annotate(cache=result)
+
+
+def record_upstream(upstream: str, status):
+    upstream_responses.inc(upstream, str(status))
+
+
+def log_trace(label: str, current: Trace):
+    print(f"[TRACE] {label} {json.dumps(current.as_dict())}")
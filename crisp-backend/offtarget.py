@@ -0,0 +1,367 @@
+"""
+Offline off-target search over reference genomes stored on disk.
+
+For every species in catalogue.json a FASTA genome can be placed at
+GENOME_DIR/<scientific_name>.fa (.fasta/.fna, optionally gzipped). Building
+the index enumerates every 20 nt protospacer next to an NGG or NAG PAM on
+both strands and packs it, with its PAM class, into a uint64 (2 bits per
+base). Two sorted copies are written: one ordered on the first 10 nt, one on
+the last 10 nt. By the pigeonhole principle a site within 3 mismatches of a
+guide is within 1 mismatch on one of the halves, so a query reads the 31
+buckets (exact half plus every single substitution) of each half and
+verifies the full 20 nt. A bucket holds about sites / 4^10 entries.
+
+Building streams the FASTA in chunks and distributes the keys over
+partition files on disk, then sorts one partition at a time into the final
+arrays, so memory depends on the chunk and partition size rather than on
+the genome. The arrays are memory-mapped, so loading an index is instant and
+several workers share the same pages.
+
+    python offtarget.py build oryza_sativa [--fasta path/to/genome.fa]
+    python offtarget.py query oryza_sativa GUIDE [GUIDE ...]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import grna_scan
+import grna_stream
+
+GENOME_DIR = os.getenv(
+    "GENOME_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "genomes")
+)
+FASTA_SUFFIXES = (".fa", ".fasta", ".fna", ".fa.gz", ".fasta.gz", ".fna.gz")
+
+INDEX_VERSION = 2
+GUIDE_LENGTH = 20
+HALF_LENGTH = GUIDE_LENGTH // 2
+MAX_MISMATCHES = 3
+INDEX_PAM = "NRG"  # NGG plus the weaker NAG sites Cas9 also cuts
+# Keys are distributed over 4^5 partition files while building; each is sorted on its own
+PARTITION_BITS = 10
+
+PAM_NGG = 0
+PAM_NAG = 1
+
+# Weight of one off-target site by mismatch count, and the discount for NAG PAMs
+MISMATCH_WEIGHTS = np.array([1.0, 0.5, 0.2, 0.05])
+NAG_WEIGHT = 0.25
+
+_HALF_BITS = 2 * HALF_LENGTH
+_HALF_MASK = np.uint64((1 << _HALF_BITS) - 1)
+_KEY_BITS = 2 * GUIDE_LENGTH + 1  # protospacer, then the PAM class in the lowest bit
+_GUIDE_SYMBOLS = np.uint64(int("01" * GUIDE_LENGTH, 2))
+_HALF_SYMBOLS = np.uint64(int("01" * HALF_LENGTH, 2))
+# XOR masks turning a half into itself and each of its single-substitution neighbours
+_HALF_VARIANTS = np.array(
+    [0] + [code << (2 * position) for position in range(HALF_LENGTH) for code in (1, 2, 3)], dtype=np.uint64
+)
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def find_genome(species: str):
+    for suffix in FASTA_SUFFIXES:
+        path = os.path.join(GENOME_DIR, species + suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def index_dir_for(species: str) -> str:
+    return os.path.join(GENOME_DIR, f"{species}.offtarget")
+
+
+def pack_protospacers(codes: np.ndarray, positions: np.ndarray, guide_length: int = GUIDE_LENGTH) -> np.ndarray:
+    keys = np.zeros(positions.size, dtype=np.uint64)
+    for j in range(guide_length):
+        keys <<= np.uint64(2)
+        keys |= codes[positions + j].astype(np.uint64)
+    return keys
+
+
+def _rotate(protospacers: np.ndarray) -> np.ndarray:
+    """Swaps the two 10 nt halves (an involution), so the second half sorts first."""
+    return ((protospacers & _HALF_MASK) << np.uint64(_HALF_BITS)) | (protospacers >> np.uint64(_HALF_BITS))
+
+
+def _mismatches(keys: np.ndarray, query, symbols=_GUIDE_SYMBOLS) -> np.ndarray:
+    diff = keys ^ np.uint64(query)
+    diff = (diff | (diff >> np.uint64(1))) & symbols
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(diff)
+    return _POPCOUNT8[diff.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _chunk_keys(window: np.ndarray) -> np.ndarray:
+    """(protospacer << 1) | PAM class for every NGG/NAG site on both strands of `window`."""
+    parts = []
+    for strand in (window, grna_scan.reverse_complement(window)):
+        positions = grna_scan.find_sites(strand, INDEX_PAM, GUIDE_LENGTH)
+        # Second PAM base: G for NGG, A for NAG
+        nag = (strand[positions + GUIDE_LENGTH + 1] != 2).astype(np.uint64)
+        parts.append((pack_protospacers(strand, positions) << np.uint64(1)) | nag)
+    return np.concatenate(parts)
+
+
+class _Partitions:
+    """Appends keys to one raw file per leading PARTITION_BITS bits of the key."""
+
+    def __init__(self, directory: str, name: str):
+        self.paths = [os.path.join(directory, f"{name}-{p:04d}.bin") for p in range(1 << PARTITION_BITS)]
+
+    def add(self, keys: np.ndarray):
+        keys = np.sort(keys)
+        bounds = np.searchsorted(keys >> np.uint64(_KEY_BITS - PARTITION_BITS), np.arange((1 << PARTITION_BITS) + 1))
+        for partition in np.flatnonzero(np.diff(bounds)):
+            with open(self.paths[partition], "ab") as f:
+                keys[bounds[partition]:bounds[partition + 1]].tofile(f)
+
+    def write_sorted(self, path: str, total: int) -> np.ndarray:
+        """Sorts each partition into one .npy array; returns the bucket offsets on its leading half."""
+        counts = np.zeros(1 << _HALF_BITS, dtype=np.int64)
+        # A partition covers a contiguous run of buckets
+        span = 1 << (_HALF_BITS - PARTITION_BITS)
+        with open(path, "wb") as out:
+            header = {"descr": np.dtype(np.uint64).str, "fortran_order": False, "shape": (total,)}
+            np.lib.format.write_array_header_1_0(out, header)
+            for partition, partition_path in enumerate(self.paths):
+                if not os.path.exists(partition_path):
+                    continue
+                keys = np.sort(np.fromfile(partition_path, dtype=np.uint64))
+                os.remove(partition_path)
+                keys.tofile(out)
+                buckets = (keys >> np.uint64(_HALF_BITS + 1)).astype(np.int64) - partition * span
+                counts[partition * span:(partition + 1) * span] = np.bincount(buckets, minlength=span)
+        return np.concatenate(([0], np.cumsum(counts)))
+
+
+def build_index(fasta_path: str, out_dir: str, chunk_sites: int = 4_000_000, chunk_size: int = grna_stream.DEFAULT_CHUNK) -> dict:
+    """
+    Indexes every NGG/NAG protospacer in the FASTA. Keys are buffered up to
+    `chunk_sites` before they are spread over the partition files.
+    """
+    began = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    work = tempfile.mkdtemp(prefix="build-", dir=out_dir)
+    try:
+        forward, rotated = _Partitions(work, "keys"), _Partitions(work, "rotated")
+        buffered, size, total = [], 0, 0
+
+        def spill():
+            keys = np.concatenate(buffered)
+            forward.add(keys)
+            # The PAM bit stays lowest; only the protospacer halves swap
+            rotated.add((_rotate(keys >> np.uint64(1)) << np.uint64(1)) | (keys & np.uint64(1)))
+            buffered.clear()
+
+        # Consecutive chunks overlap by one base less than a site, so every site is seen exactly once
+        overlap = GUIDE_LENGTH + len(INDEX_PAM) - 1
+        record, tail = None, np.empty(0, dtype=np.uint8)
+        for index, _, _, codes in grna_stream.iter_fasta(fasta_path, chunk_size):
+            if index != record:
+                record, tail = index, np.empty(0, dtype=np.uint8)
+            window = np.concatenate([tail, codes]) if tail.size else codes
+            keys = _chunk_keys(window)
+            tail = window[window.size - min(overlap, window.size):].copy()
+            buffered.append(keys)
+            size += keys.size
+            total += keys.size
+            if size >= chunk_sites:
+                spill()
+                size = 0
+        if buffered:
+            spill()
+
+        offsets = [
+            forward.write_sorted(os.path.join(out_dir, "keys.npy"), total),
+            rotated.write_sorted(os.path.join(out_dir, "rotated.npy"), total),
+        ]
+        for half, half_offsets in enumerate(offsets):
+            np.save(os.path.join(out_dir, f"half{half}_offsets.npy"), half_offsets)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    stat = os.stat(fasta_path)
+    meta = {
+        "version": INDEX_VERSION,
+        "fasta": os.path.abspath(fasta_path),
+        "fasta_size": stat.st_size,
+        "fasta_mtime": stat.st_mtime,
+        "sites": int(total),
+        "guide_length": GUIDE_LENGTH,
+        "pam": INDEX_PAM,
+        "build_seconds": round(time.perf_counter() - began, 2),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+class OffTargetIndex:
+    def __init__(self, index_dir: str):
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta["version"] != INDEX_VERSION:
+            raise ValueError(f"{index_dir} was built by index version {self.meta['version']}, rebuild it")
+        load = lambda name: np.load(os.path.join(index_dir, name), mmap_mode="r")
+        # Sorted on the first half, and on the second half (halves swapped)
+        self.tables = [load("keys.npy"), load("rotated.npy")]
+        self.offsets = [load("half0_offsets.npy"), load("half1_offsets.npy")]
+
+    def _bucket_hits(self, half: int, value: int, substitutions: int) -> np.ndarray:
+        """Keys of the table whose leading half is within `substitutions` (0 or 1) of `value`."""
+        variants = np.uint64(value) ^ _HALF_VARIANTS[:1 + 3 * HALF_LENGTH * substitutions]
+        starts = self.offsets[half][variants.astype(np.int64)]
+        lengths = self.offsets[half][variants.astype(np.int64) + 1] - starts
+        # Positions of every bucket entry, gathered in one read
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return self.tables[half][positions]
+
+    def count(self, guides, max_mismatches: int = MAX_MISMATCHES) -> np.ndarray:
+        """
+        Returns an int array of shape (len(guides), 2, max_mismatches + 1):
+        genome sites per PAM class (NGG, NAG) and mismatch count. Guides that
+        are not 20 unambiguous bases get -1 everywhere.
+        """
+        if not 0 <= max_mismatches <= MAX_MISMATCHES:
+            raise ValueError(f"max_mismatches must be between 0 and {MAX_MISMATCHES}")
+        # One half of any site within max_mismatches has at most this many
+        substitutions = max_mismatches // 2
+        result = np.zeros((len(guides), 2, max_mismatches + 1), dtype=np.int64)
+        for row, guide in enumerate(guides):
+            codes = grna_scan.encode_sequence(guide)
+            if codes.size != GUIDE_LENGTH or (codes == grna_scan.AMBIGUOUS).any():
+                result[row] = -1
+                continue
+            query = int(pack_protospacers(codes, np.zeros(1, dtype=np.int64))[0])
+            first, second = query >> _HALF_BITS, query & int(_HALF_MASK)
+
+            hits = self._bucket_hits(0, first, substitutions)
+            protospacers = hits >> np.uint64(1)
+            rotated = self._bucket_hits(1, second, substitutions)
+            rotated_protospacers = _rotate(rotated >> np.uint64(1))
+            # Sites whose first half is close enough were already found through it
+            fresh = _mismatches(rotated_protospacers >> np.uint64(_HALF_BITS), first, _HALF_SYMBOLS) > substitutions
+            protospacers = np.concatenate([protospacers, rotated_protospacers[fresh]])
+            pams = np.concatenate([hits, rotated[fresh]]) & np.uint64(1)
+
+            mismatches = _mismatches(protospacers, query)
+            keep = mismatches <= max_mismatches
+            np.add.at(result[row], (pams[keep].astype(np.int64), mismatches[keep]), 1)
+        return result
+
+
+def specificity(counts: np.ndarray) -> np.ndarray:
+    """
+    Aggregate specificity in (0, 1] per guide from count() output: 1 means no
+    other site within the searched mismatches. The guide's own site (one
+    perfect NGG match) is not counted against it.
+    """
+    invalid = counts[:, 0, 0] < 0
+    counts = counts.astype(float)
+    counts[:, PAM_NGG, 0] = np.maximum(counts[:, PAM_NGG, 0] - 1, 0)
+    weights = MISMATCH_WEIGHTS[:counts.shape[2]]
+    penalty = (counts[:, PAM_NGG] * weights).sum(axis=1) + NAG_WEIGHT * (counts[:, PAM_NAG] * weights).sum(axis=1)
+    result = 1.0 / (1.0 + penalty)
+    result[invalid] = np.nan
+    return result
+
+
+def stale_reason(meta: dict):
+    """Why an index cannot be used (older format, FASTA size or mtime changed), or None if it can."""
+    if meta.get("version") != INDEX_VERSION:
+        return f"it was built by index version {meta.get('version')}"
+    try:
+        stat = os.stat(meta["fasta"])
+    except OSError:
+        return None  # the genome may be removed once indexed; the index stands on its own
+    if stat.st_size != meta["fasta_size"] or stat.st_mtime != meta["fasta_mtime"]:
+        return f"{meta['fasta']} changed since the index was built"
+    return None
+
+
+_loaded = {}
+_warned = set()
+
+
+def get_index(species: str):
+    """The species' index if one has been built and its FASTA is unchanged, else None."""
+    index = _loaded.get(species)
+    if index is not None and stale_reason(index.meta) is None:
+        return index
+    _loaded.pop(species, None)
+    index_dir = index_dir_for(species)
+    meta_path = os.path.join(index_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        reason = stale_reason(json.load(f))
+    if reason:
+        if (species, reason) not in _warned:
+            _warned.add((species, reason))
+            print(f"[WARNING] Ignoring off-target index for {species}: {reason}; "
+                  f"run `python offtarget.py build {species}`")
+        return None
+    index = _loaded[species] = OffTargetIndex(index_dir)
+    return index
+
+
+def rank_guides(index: OffTargetIndex, guides: list, top_n: int = 5) -> list:
+    """
+    Annotates guides with off-target counts and specificity and re-ranks them
+    on score x specificity.
+    """
+    if not guides:
+        return guides
+    counts = index.count([g["sequence"] for g in guides])
+    spec = specificity(counts)
+    for guide, row, s in zip(guides, counts, spec):
+        if row[0, 0] < 0:
+            continue
+        total = row.sum(axis=0)
+        guide["off_targets"] = {str(mm): int(n) for mm, n in enumerate(total)}
+        guide["specificity"] = round(float(s), 3)
+    ranked = sorted(
+        guides, key=lambda g: (-(g["score"] * g.get("specificity", 1.0)), g["start"])
+    )
+    return ranked[:top_n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query an off-target index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("species", help="scientific_name as used in catalogue.json")
+    build.add_argument("--fasta", help="defaults to GENOME_DIR/<species>.fa")
+    query = sub.add_parser("query")
+    query.add_argument("species")
+    query.add_argument("guides", nargs="+")
+    query.add_argument("--mismatches", type=int, default=MAX_MISMATCHES)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        fasta = args.fasta or find_genome(args.species)
+        if not fasta:
+            parser.error(f"no FASTA for {args.species} in {GENOME_DIR}")
+        meta = build_index(fasta, index_dir_for(args.species))
+        print(f"✅ Indexed {meta['sites']} sites from {fasta} in {meta['build_seconds']}s")
+        return
+
+    index = get_index(args.species)
+    if index is None:
+        parser.error(f"no up-to-date index for {args.species}; run `python offtarget.py build {args.species}` first")
+    began = time.perf_counter()
+    counts = index.count(args.guides, args.mismatches)
+    elapsed = time.perf_counter() - began
+    for guide, row, s in zip(args.guides, counts, specificity(counts)):
+        print(f"{guide}  NGG={row[PAM_NGG].tolist()}  NAG={row[PAM_NAG].tolist()}  specificity={s:.3f}")
+    print(f"{len(args.guides)} guides in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
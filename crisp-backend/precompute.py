@@ -0,0 +1,46 @@
+"""
+Precomputes reports for every crop/trait in catalogue.json.
+
+Only entries that are missing, older than REPORT_STORE_MAX_AGE or whose
+catalogue entry changed since they were built are regenerated, so running it
+again (e.g. from cron) is an incremental refresh.
+
+    python precompute.py [--concurrency 2] [--force]
+
+Set PRECOMPUTE_ON_STARTUP=1 to run the same job in the background when the
+API server starts.
+"""
+import argparse
+import asyncio
+import time
+
+import main
+
+
+def print_progress(result):
+    mark = "✅" if result["status"] == "ok" else "❌"
+    detail = "" if result["status"] == "ok" else f" ({result['detail']})"
+    print(f"{mark} {result['crop']} / {result['trait']}{detail}")
+
+
+async def run(concurrency: int, force: bool):
+    try:
+        return await main.warm_report_store(concurrency, force=force, progress=print_progress)
+    finally:
+        if main.http_client is not None:
+            await main.http_client.aclose()
+        await main.chopchop_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute crisp reports into the report store.")
+    parser.add_argument("--concurrency", type=int, default=main.PRECOMPUTE_CONCURRENCY)
+    parser.add_argument("--force", action="store_true", help="rebuild every report, even up-to-date ones")
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    summary = asyncio.run(run(args.concurrency, args.force))
+    print("=" * 60)
+    print(f"{summary['refreshed']} refreshed, {summary['up_to_date']} up to date, "
+          f"{summary['failed']} failed, {summary['removed']} removed "
+          f"({summary['entries']} entries, {time.perf_counter() - began:.1f}s)")
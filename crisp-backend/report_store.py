@@ -0,0 +1,106 @@
+"""
+Versioned store of finished reports.
+
+Reports are kept as ready-to-send JSON text keyed by (crop, trait). Each row
+carries a fingerprint of the catalogue entry it was built from plus
+REPORT_VERSION, so editing a gene in catalogue.json, or changing how
+reports are built, makes exactly the affected rows stale. Rows built from
+a fallback (NCBI sequence, locally designed guides) are marked degraded and
+expire after degraded_max_age instead. precompute.py fills the store ahead
+of time; /api/generate-report serves from it.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Bump whenever the report pipeline changes in a way that should invalidate stored reports
+REPORT_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    crop        TEXT NOT NULL,
+    trait       TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    body        TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    degraded    INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (crop, trait)
+)
+"""
+
+
+def fingerprint(species: str, gene_info: dict) -> str:
+    payload = json.dumps({"version": REPORT_VERSION, "species": species, "gene": gene_info}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReportStore:
+    def __init__(self, path: str, max_age: float, degraded_max_age: float = 0):
+        self.path = path
+        self.max_age = max_age
+        self.degraded_max_age = degraded_max_age
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+            if "degraded" not in columns:
+                conn.execute("ALTER TABLE reports ADD COLUMN degraded INTEGER NOT NULL DEFAULT 0")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def max_age_of(self, degraded: bool) -> float:
+        return self.degraded_max_age if degraded else self.max_age
+
+    def get(self, crop: str, trait: str, expected_fingerprint: str):
+        """The stored JSON body if it is current for this fingerprint and not too old, else None."""
+        row = self._connect().execute(
+            "SELECT fingerprint, body, created_at, degraded FROM reports WHERE crop = ? AND trait = ?", (crop, trait)
+        ).fetchone()
+        if row is None:
+            return None
+        stored_fingerprint, body, created_at, degraded = row
+        if stored_fingerprint != expected_fingerprint or time.time() - created_at > self.max_age_of(degraded):
+            return None
+        return body
+
+    def put(self, crop: str, trait: str, report_fingerprint: str, report: dict, degraded: bool = False):
+        """Stores a report; a degraded one is skipped entirely when degraded_max_age is 0."""
+        if degraded and self.degraded_max_age <= 0:
+            return
+        self._connect().execute(
+            "INSERT OR REPLACE INTO reports (crop, trait, fingerprint, body, created_at, degraded) VALUES (?, ?, ?, ?, ?, ?)",
+            (crop, trait, report_fingerprint, json.dumps(report), time.time(), int(degraded)),
+        )
+
+    def fingerprints(self) -> dict:
+        """{(crop, trait): (fingerprint, created_at, degraded)} for every stored report."""
+        rows = self._connect().execute("SELECT crop, trait, fingerprint, created_at, degraded FROM reports")
+        return {(crop, trait): (fp, created_at, bool(degraded)) for crop, trait, fp, created_at, degraded in rows}
+
+    def prune(self, keep) -> int:
+        """Deletes reports whose (crop, trait) is not in `keep`; returns how many were removed."""
+        keep = set(keep)
+        stale = [key for key in self.fingerprints() if key not in keep]
+        self._connect().executemany("DELETE FROM reports WHERE crop = ? AND trait = ?", stale)
+        return len(stale)
+
+    def stats(self) -> dict:
+        count, degraded, oldest = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(degraded), 0), MIN(created_at) FROM reports"
+        ).fetchone()
+        return {
+            "reports": count,
+            "degraded": degraded,
+            "oldest_age_seconds": round(time.time() - oldest, 1) if oldest else None,
+        }
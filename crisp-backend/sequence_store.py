@@ -0,0 +1,156 @@
+"""
+Disk-backed gene sequence store shared by every uvicorn worker.
+
+Sequences fetched from Ensembl/NCBI are kept in a small SQLite database so
+that a restart (or a second worker) does not go back to the network. Pure
+A/C/G/T sequences are packed 2 bits per base; anything containing other
+IUPAC codes falls back to zlib. Misses are cached separately with a shorter
+TTL so a gene that upstream does not know about is not re-queried on every
+request, and the file is kept under a byte budget by evicting the least
+recently read entries.
+"""
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+ENCODING_2BIT = "2bit"
+ENCODING_ZLIB = "zlib"
+ENCODING_MISS = "miss"
+
+# A=0 C=1 G=2 T=3, everything else marks the sequence as not 2-bit packable
+_PACK_LUT = np.full(256, 255, dtype=np.uint8)
+for _code, _base in enumerate(b"ACGT"):
+    _PACK_LUT[_base] = _code
+    _PACK_LUT[ord(chr(_base).lower())] = _code
+_UNPACK_LUT = np.frombuffer(b"ACGT", dtype=np.uint8)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sequences (
+    key         TEXT PRIMARY KEY,
+    encoding    TEXT NOT NULL,
+    length      INTEGER NOT NULL,
+    payload     BLOB,
+    size        INTEGER NOT NULL,
+    expires_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+
+
+def pack_sequence(seq: str):
+    """Returns (encoding, payload) for a DNA string."""
+    raw = np.frombuffer(seq.encode("ascii"), dtype=np.uint8)
+    codes = _PACK_LUT[raw]
+    if codes.size and codes.max() == 255:
+        return ENCODING_ZLIB, zlib.compress(seq.encode("ascii"), 6)
+    pad = (-codes.size) % 4
+    if pad:
+        codes = np.concatenate([codes, np.zeros(pad, dtype=np.uint8)])
+    quads = codes.reshape(-1, 4)
+    packed = (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+    return ENCODING_2BIT, packed.astype(np.uint8).tobytes()
+
+
+def unpack_sequence(encoding: str, payload: bytes, length: int) -> str:
+    if encoding == ENCODING_ZLIB:
+        return zlib.decompress(payload).decode("ascii")
+    packed = np.frombuffer(payload, dtype=np.uint8)
+    codes = np.empty((packed.size, 4), dtype=np.uint8)
+    codes[:, 0] = packed >> 6
+    codes[:, 1] = (packed >> 4) & 3
+    codes[:, 2] = (packed >> 2) & 3
+    codes[:, 3] = packed & 3
+    return _UNPACK_LUT[codes.reshape(-1)[:length]].tobytes().decode("ascii")
+
+
+class SequenceStore:
+    """
+    Process-safe sequence cache. Each thread gets its own SQLite connection;
+    WAL mode lets several worker processes read while one writes.
+    """
+
+    def __init__(self, path: str, ttl: float, negative_ttl: float, max_bytes: int):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        """
+        Returns (hit, sequence). A cached miss comes back as (True, None);
+        an absent or expired key as (False, None).
+        """
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT encoding, length, payload, expires_at FROM sequences WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return False, None
+        encoding, length, payload, expires_at = row
+        if expires_at <= now:
+            conn.execute("DELETE FROM sequences WHERE key = ? AND expires_at <= ?", (key, now))
+            return False, None
+        conn.execute("UPDATE sequences SET accessed_at = ? WHERE key = ?", (now, key))
+        if encoding == ENCODING_MISS:
+            return True, None
+        return True, unpack_sequence(encoding, payload, length)
+
+    def put(self, key: str, seq: str):
+        encoding, payload = pack_sequence(seq)
+        self._write(key, encoding, len(seq), payload, self.ttl)
+
+    def put_miss(self, key: str):
+        self._write(key, ENCODING_MISS, 0, None, self.negative_ttl)
+
+    def _write(self, key, encoding, length, payload, ttl):
+        now = time.time()
+        size = len(payload) if payload else 0
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO sequences (key, encoding, length, payload, size, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, encoding, length, payload, size, now + ttl, now),
+        )
+        self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM sequences WHERE expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM sequences").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM sequences ORDER BY accessed_at ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM sequences WHERE key = ?", victims)
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        entries, misses, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(encoding = ?), 0), COALESCE(SUM(size), 0) FROM sequences",
+            (ENCODING_MISS,),
+        ).fetchone()
+        return {"entries": entries, "negative_entries": misses, "bytes": total, "max_bytes": self.max_bytes}
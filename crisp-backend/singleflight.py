@@ -0,0 +1,57 @@
+"""
+In-process request coalescing.
+
+While a call for a given key is in flight, every other caller with the same
+key awaits the same task instead of starting its own upstream request. The
+shared task is shielded, so a caller that times out or disconnects does not
+cancel the work for the others. Counters record how many calls were served
+by an already running task.
+"""
+import asyncio
+import functools
+from collections import defaultdict
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+        self._counters = defaultdict(lambda: {"calls": 0, "executions": 0, "coalesced": 0})
+
+    async def do(self, group: str, key, fn, *args, **kwargs):
+        counters = self._counters[group]
+        counters["calls"] += 1
+        flight_key = (group, key)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            counters["executions"] += 1
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[flight_key] = task
+            task.add_done_callback(functools.partial(self._finished, flight_key))
+        else:
+            counters["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, flight_key, task):
+        self._inflight.pop(flight_key, None)
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every waiter gave up
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> dict:
+        return {group: dict(counts) for group, counts in self._counters.items()}
+
+
+flights = SingleFlight()
+
+
+def single_flight(group: str):
+    """Coalesces concurrent calls of an async function with identical arguments."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            return await flights.do(group, key, fn, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_main(tmp_path_factory):
+    """main.py imported offline: fake explanation backend and caches in a temporary directory."""
+    cache_dir = tmp_path_factory.mktemp("cache")
+    os.environ.update(
+        EXPLAIN_BACKEND="fake",
+        SEQUENCE_CACHE_PATH=str(cache_dir / "sequences.sqlite"),
+        GENOME_DIR=str(cache_dir / "genomes"),
+        PRECOMPUTE_ON_STARTUP="0",
+    )
+    import main
+    return main
@@ -0,0 +1,53 @@
+"""stream_batch_reports with the pipeline stages replaced by recording fakes."""
+import asyncio
+import json
+
+from catalogue import Catalogue
+
+CATALOGUE = {
+    "beet": {"scientific_name": "beta_vulgaris", "traits": {
+        "sugar content": {"ensembl_id": "BVRB_1", "symbol": "SUS1"},
+        "bolting": {"ensembl_id": "BVRB_1", "symbol": "BTC1"},
+    }},
+    "sugarbeet": {"scientific_name": "beta_vulgaris", "traits": {
+        "sugar content": {"ensembl_id": "BVRB_1", "symbol": "SUS1"},
+    }},
+}
+
+
+def run_batch(app_main, monkeypatch, pairs):
+    calls = []
+
+    async def gene_stage(gene_id, symbol, species):
+        calls.append((gene_id, symbol, species))
+        return "ACGT", "NCBI", [{"sequence": f"guide for {symbol}"}], "local"
+
+    async def nothing(*args, **kwargs):
+        return None
+
+    async def explain_stage(crop, trait, symbol, gene_id):
+        return f"about {symbol}"
+
+    monkeypatch.setattr(app_main, "catalogue", Catalogue(CATALOGUE))
+    monkeypatch.setattr(app_main, "gene_stage", gene_stage)
+    monkeypatch.setattr(app_main, "explain_stage", explain_stage)
+    monkeypatch.setattr(app_main, "prefetch_ensembl_sequences", nothing)
+    monkeypatch.setattr(app_main, "remember_report", nothing)
+    items = [app_main.ReportRequest(crop=crop, trait=trait) for crop, trait in pairs]
+
+    async def collect():
+        return [json.loads(line) async for line in app_main.stream_batch_reports(items, 4, use_store=False)]
+    return sorted(asyncio.run(collect()), key=lambda line: line["index"]), calls
+
+
+def test_shared_gene_fetched_once(app_main, monkeypatch):
+    lines, calls = run_batch(app_main, monkeypatch, [("beet", "sugar content"), ("sugarbeet", "sugar content")])
+    assert calls == [("BVRB_1", "SUS1", "beta_vulgaris")]
+    assert [line["report"]["top_grnas"] for line in lines] == [[{"sequence": "guide for SUS1"}]] * 2
+
+
+def test_same_gene_id_with_another_symbol_is_fetched_separately(app_main, monkeypatch):
+    lines, calls = run_batch(app_main, monkeypatch, [("beet", "sugar content"), ("beet", "bolting")])
+    assert sorted(calls) == [("BVRB_1", "BTC1", "beta_vulgaris"), ("BVRB_1", "SUS1", "beta_vulgaris")]
+    assert [line["report"]["top_grnas"][0]["sequence"] for line in lines] == ["guide for SUS1", "guide for BTC1"]
+    assert [line["report"]["explanation"] for line in lines] == ["about SUS1", "about BTC1"]
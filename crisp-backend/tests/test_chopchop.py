@@ -0,0 +1,197 @@
+"""ChopchopClient.design against an in-process CHOPCHOP stub (httpx.MockTransport)."""
+import asyncio
+import random
+import time
+from urllib.parse import parse_qs
+
+import httpx
+
+from chopchop import ChopchopClient, WINDOW_STEP
+
+
+def random_sequence(length, seed=0):
+    rng = random.Random(seed)
+    return "".join(rng.choice("ACGT") for _ in range(length))
+
+
+def window_of(request):
+    return parse_qs(request.content.decode("ascii"))["SEQ"][0]
+
+
+def guide_at(window, position, score=0.8):
+    return {"gRNA_sequence": window[position:position + 20], "PAM": "AGG", "start": position, "strand": "+", "score": score}
+
+
+def make_client(handler, **kwargs):
+    client = ChopchopClient("http://chopchop.test/api/", **{"backoff": 0, **kwargs})
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def design(client, seq, top_n=100, deadline=None):
+    async def run():
+        try:
+            return await client.design(seq, pam="NGG", genome="test", scoring="Doench2016", top_n=top_n, deadline=deadline)
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_windows_are_submitted_concurrently():
+    seq = random_sequence(9000)  # windows at 0, 2000, 4000, 6000, 8000
+    in_flight = {"now": 0, "max": 0, "requests": 0}
+
+    async def handler(request):
+        in_flight["now"] += 1
+        in_flight["requests"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.1)
+        in_flight["now"] -= 1
+        return httpx.Response(200, json={"results": [guide_at(window_of(request), 0)]})
+
+    began = time.perf_counter()
+    guides = design(make_client(handler, concurrency=4), seq)
+    elapsed = time.perf_counter() - began
+
+    assert in_flight["requests"] == 5
+    assert in_flight["max"] == 4
+    assert elapsed < 5 * 0.1  # two rounds, not five
+    assert sorted(g["start"] for g in guides) == [0, 2000, 4000, 6000, 8000]
+
+
+def test_503_is_retried():
+    seq = random_sequence(5000)  # windows at 0, 2000, 4000
+    attempts = {}
+
+    def handler(request):
+        window = window_of(request)
+        attempts[window] = attempts.get(window, 0) + 1
+        if attempts[window] == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"results": [guide_at(window, 5)]})
+
+    client = make_client(handler, retries=2)
+    guides = design(client, seq)
+
+    assert len(guides) == 3
+    assert all(count == 2 for count in attempts.values())
+    snapshot = client.stats.snapshot()
+    assert snapshot["retries"] == 3
+    assert snapshot["failed_windows"] == 0
+
+
+def test_429_waits_for_retry_after():
+    seq = random_sequence(1500)  # a single window
+    calls = []
+
+    def handler(request):
+        calls.append(time.perf_counter())
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.3"})
+        return httpx.Response(200, json={"results": [guide_at(window_of(request), 10)]})
+
+    # A huge backoff proves the delay came from Retry-After, not from the backoff schedule
+    client = make_client(handler, retries=1, backoff=60)
+    guides = design(client, seq)
+
+    assert len(guides) == 1
+    assert len(calls) == 2
+    assert 0.3 <= calls[1] - calls[0] < 5
+    assert client.stats.snapshot()["retries"] == 1
+
+
+def test_retry_after_is_capped():
+    seq = random_sequence(1500)
+    calls = []
+
+    def handler(request):
+        calls.append(time.perf_counter())
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "3600"})
+        return httpx.Response(200, json={"results": [guide_at(window_of(request), 10)]})
+
+    client = make_client(handler, retries=1, backoff=60, max_retry_after=0.2)
+    guides = design(client, seq)
+
+    assert len(guides) == 1
+    assert 0.2 <= calls[1] - calls[0] < 5
+
+
+def test_retry_after_past_the_deadline_falls_back_to_backoff():
+    seq = random_sequence(1500)
+    calls = []
+
+    def handler(request):
+        calls.append(time.perf_counter())
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "3600"})
+        return httpx.Response(200, json={"results": [guide_at(window_of(request), 10)]})
+
+    client = make_client(handler, retries=1, backoff=0.05, max_retry_after=3600)
+    guides = design(client, seq, deadline=5)
+
+    assert len(guides) == 1
+    assert calls[1] - calls[0] < 1
+
+
+def test_window_gives_up_when_the_wait_would_pass_the_deadline():
+    seq = random_sequence(1500)
+
+    def handler(request):
+        return httpx.Response(503)
+
+    client = make_client(handler, retries=5, backoff=60)
+    began = time.perf_counter()
+    guides = design(client, seq, deadline=2)
+
+    assert guides == []
+    assert time.perf_counter() - began < 1
+    assert client.stats.snapshot()["failed_windows"] == 1
+
+
+def test_guides_from_overlapping_windows_are_deduplicated():
+    seq = random_sequence(5000)
+    position = 2500  # inside window 0 (0-3000) and window 2000 (2000-5000)
+    guide = seq[position:position + 20]
+
+    def handler(request):
+        window = window_of(request)
+        found = window.find(guide)
+        return httpx.Response(200, json={"results": [guide_at(window, found)] if found >= 0 else []})
+
+    guides = design(make_client(handler), seq)
+
+    assert [(g["sequence"], g["start"]) for g in guides] == [(guide, position)]
+
+
+def test_results_are_ranked_on_score_then_position():
+    seq = random_sequence(5000)
+
+    def handler(request):
+        window = window_of(request)
+        return httpx.Response(200, json={"results": [guide_at(window, 100, score=0.5), guide_at(window, 200, score=0.9)]})
+
+    guides = design(make_client(handler), seq, top_n=4)
+
+    assert [g["start"] for g in guides] == [200, 200 + WINDOW_STEP, 200 + 2 * WINDOW_STEP, 100]
+
+
+def test_stats_count_failed_windows_and_latency():
+    seq = random_sequence(5000)  # windows at 0, 2000, 4000
+
+    def handler(request):
+        window = window_of(request)
+        if window == seq[2000:5000]:
+            return httpx.Response(503)  # this window never succeeds
+        return httpx.Response(200, json={"results": [guide_at(window, 0)]})
+
+    client = make_client(handler, retries=1)
+    guides = design(client, seq)
+
+    assert sorted(g["start"] for g in guides) == [0, 4000]
+    snapshot = client.stats.snapshot()
+    assert snapshot["windows"] == 3
+    assert snapshot["failed_windows"] == 1
+    assert snapshot["retries"] == 1
+    assert snapshot["latency_seconds"]["samples"] == 3
+    assert snapshot["latency_seconds"]["p50"] is not None
@@ -0,0 +1,131 @@
+"""EnsemblBulkClient against an in-process mock of the Ensembl REST API (httpx.MockTransport)."""
+import asyncio
+import json
+import time
+
+import httpx
+
+from ensembl_bulk import LOOKUP_BATCH, REGION_BATCH, EnsemblBulkClient
+
+
+class MockEnsembl:
+    """Knows every ID except those in `unknown`; `rejected` IDs make a whole lookup answer 400."""
+
+    def __init__(self, unknown=(), rejected=(), failing_species=(), responses=None):
+        self.unknown = set(unknown)
+        self.rejected = set(rejected)
+        self.failing_species = set(failing_species)
+        self.responses = list(responses or [])  # canned responses served first
+        self.requests = []
+
+    def __call__(self, request):
+        body = json.loads(request.content)
+        self.requests.append((request.url.path, body, time.perf_counter()))
+        if self.responses:
+            return self.responses.pop(0)
+        if request.url.path == "/lookup/id":
+            if self.rejected & set(body["ids"]):
+                return httpx.Response(400, json={"error": "invalid ID"})
+            return httpx.Response(200, json={
+                i: None if i in self.unknown else {"seq_region_name": f"chr_{i}", "start": 1, "end": 30, "strand": 1}
+                for i in body["ids"]
+            })
+        species = request.url.path.rsplit("/", 1)[-1]
+        if species in self.failing_species:
+            return httpx.Response(503)
+        return httpx.Response(200, json=[{"query": r, "seq": "ACGT" * 5} for r in body["regions"]])
+
+    def posts(self, path_prefix):
+        return [body for path, body, _ in self.requests if path.startswith(path_prefix)]
+
+
+def run(mock, call, **kwargs):
+    async def go():
+        http = httpx.AsyncClient(transport=httpx.MockTransport(mock))
+        client = EnsemblBulkClient("http://ensembl.test", lambda: http, **{"backoff": 0, "max_rps": 0, **kwargs})
+        try:
+            return client, await call(client)
+        finally:
+            await http.aclose()
+    return asyncio.run(go())
+
+
+def test_lookups_are_posted_in_chunks_of_1000_ids():
+    mock = MockEnsembl()
+    ids = [f"G{i}" for i in range(2500)]
+    _, found = run(mock, lambda client: client.lookup(ids))
+
+    assert sorted(len(body["ids"]) for body in mock.posts("/lookup/id")) == [500, LOOKUP_BATCH, LOOKUP_BATCH]
+    assert len(found) == 2500 and all(found[i] for i in ids)
+
+
+def test_regions_are_posted_in_chunks_of_50_per_species():
+    mock = MockEnsembl()
+    genes = [(f"G{i}", "oryza_sativa") for i in range(120)] + [(f"Z{i}", "zea_mays") for i in range(10)]
+    _, found = run(mock, lambda client: client.gene_sequences(genes))
+
+    assert len(mock.posts("/lookup/id")) == 1  # one lookup covers every species
+    sizes = {
+        species: sorted(len(body["regions"]) for path, body, _ in mock.requests if path == f"/sequence/region/{species}")
+        for species in ("oryza_sativa", "zea_mays")
+    }
+    assert sizes == {"oryza_sativa": [20, REGION_BATCH, REGION_BATCH], "zea_mays": [10]}
+    assert len(found) == 130 and all(found.values())
+
+
+def test_rejected_lookup_is_bisected_down_to_the_bad_id():
+    mock = MockEnsembl(rejected={"BAD"})
+    ids = [f"G{i}" for i in range(7)] + ["BAD"]
+    _, found = run(mock, lambda client: client.lookup(ids))
+
+    assert found["BAD"] is None
+    assert all(found[i] for i in ids if i != "BAD")
+    # 8 -> 4 + 4 -> the rejected half splits again: 2 + 2 -> 1 + 1
+    assert sorted(len(body["ids"]) for body in mock.posts("/lookup/id")) == [1, 1, 2, 2, 4, 4, 8]
+
+
+def test_429_waits_for_retry_after():
+    mock = MockEnsembl(responses=[httpx.Response(429, headers={"Retry-After": "0.3"})])
+    client, found = run(mock, lambda client: client.lookup(["G1"]))
+
+    assert found["G1"]
+    first, second = mock.requests[0][2], mock.requests[1][2]
+    assert second - first >= 0.3
+    assert client.stats()["rate_limited"] == 1
+    assert client.stats()["retries"] == 1
+
+
+def test_low_remaining_quota_waits_for_reset():
+    headers = {"X-RateLimit-Limit": "55000", "X-RateLimit-Remaining": "2", "X-RateLimit-Reset": "0.3"}
+    mock = MockEnsembl(responses=[httpx.Response(200, headers=headers, json={"G1": None})])
+
+    async def two_lookups(client):
+        await client.lookup(["G1"])
+        return await client.lookup(["G2"])
+
+    client, found = run(mock, two_lookups, reserve=10)
+
+    assert found["G2"]
+    assert mock.requests[1][2] - mock.requests[0][2] >= 0.3
+    stats = client.stats()
+    assert stats["rate_limit_remaining"] == 2 and stats["rate_limit_limit"] == 55000
+    assert stats["throttled_seconds"] >= 0.25
+
+
+def test_definite_miss_is_none_and_failed_chunk_is_left_out():
+    mock = MockEnsembl(unknown={"GONE"}, failing_species={"zea_mays"})
+    genes = [("G1", "oryza_sativa"), ("GONE", "oryza_sativa"), ("Z1", "zea_mays")]
+    client, found = run(mock, lambda client: client.gene_sequences(genes), retries=1)
+
+    assert found[("G1", "oryza_sativa")] == "ACGT" * 5
+    assert found[("GONE", "oryza_sativa")] is None  # Ensembl does not know it: cacheable miss
+    assert ("Z1", "zea_mays") not in found            # request failed: try again later
+    assert client.stats()["failed"] == 1
+
+
+def test_failed_lookup_leaves_every_gene_out():
+    mock = MockEnsembl(responses=[httpx.Response(503), httpx.Response(503)])
+    client, found = run(mock, lambda client: client.gene_sequences([("G1", "oryza_sativa")]), retries=1)
+
+    assert found == {}
+    assert client.stats()["requests"] == 2
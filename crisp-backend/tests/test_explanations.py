@@ -0,0 +1,113 @@
+"""Explainer with the offline FakeBackend, its durable cache and the SSE endpoint."""
+import asyncio
+import json
+import re
+
+import httpx
+import pytest
+
+from explanations import ExplanationCache, ExplanationError, Explainer, FakeBackend
+
+
+class CountingBackend(FakeBackend):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    async def stream(self, prompt):
+        self.calls += 1
+        async for chunk in super().stream(prompt):
+            yield chunk
+
+
+def make_explainer(tmp_path, **kwargs):
+    backend = CountingBackend(**kwargs)
+    return backend, Explainer(backend, ExplanationCache(str(tmp_path / "explanations.sqlite")))
+
+
+def collect(explainer, *args):
+    async def run():
+        return [chunk async for chunk in explainer.stream(*args)]
+    return asyncio.run(run())
+
+
+def test_explain_caches_after_a_miss(tmp_path):
+    backend, explainer = make_explainer(tmp_path)
+    first = asyncio.run(explainer.explain("rice", "grain size", "GW2", "GW2"))
+    second = asyncio.run(explainer.explain("rice", "grain size", "GW2", "GW2"))
+    assert first == second and "Rice, Grain Size, GW2" in first
+    assert backend.calls == 1
+    assert explainer.cache.stats() == {"entries": 1}
+
+    asyncio.run(explainer.explain("rice", "drought resistance", "DREB1A", "LOC_Os06g03670"))
+    assert backend.calls == 2
+
+
+def test_failures_are_not_cached(tmp_path):
+    backend, explainer = make_explainer(tmp_path, failure_rate=1.0)
+    with pytest.raises(ExplanationError):
+        asyncio.run(explainer.explain("rice", "grain size", "GW2"))
+    with pytest.raises(ExplanationError):
+        collect(explainer, "rice", "grain size", "GW2")
+    assert explainer.cache.stats() == {"entries": 0}
+
+
+def test_stream_yields_chunks_then_serves_the_cache(tmp_path):
+    backend, explainer = make_explainer(tmp_path)
+    chunks = collect(explainer, "rice", "grain size", "GW2")
+    assert len(chunks) > 10
+    cached = collect(explainer, "rice", "grain size", "GW2")
+    assert cached == ["".join(chunks)]
+    assert backend.calls == 1
+    # explain() and stream() share the cache entry
+    assert asyncio.run(explainer.explain("rice", "grain size", "GW2")) == "".join(chunks)
+
+
+def sse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+def gemini_stage_count(metrics_text, outcome):
+    match = re.search(rf'crisp_stage_seconds_count\{{stage="gemini",outcome="{outcome}"\}} (\S+)', metrics_text)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_explain_stream_endpoint(app_main):
+    async def run():
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            before = gemini_stage_count((await client.get("/metrics")).text, "ok")
+            first = await client.get("/api/explain/stream", params={"crop": "rice", "trait": "grain size"})
+            second = await client.get("/api/explain/stream", params={"crop": "rice", "trait": "grain size"})
+            after = gemini_stage_count((await client.get("/metrics")).text, "ok")
+            return first, second, after - before
+
+    first, second, timed = asyncio.run(run())
+    assert first.headers["content-type"].startswith("text/event-stream")
+    events = sse_events(first.text)
+    assert events[-1] == ("done", {})
+    chunks = [data["text"] for event, data in events[:-1]]
+    assert len(chunks) > 10 and all(event == "message" for event, _ in events[:-1])
+    # The second request is served from the cache as one chunk
+    assert sse_events(second.text) == [("message", {"text": "".join(chunks)}), ("done", {})]
+    assert timed == 2
+
+
+def test_server_timing_left_off_streamed_responses(app_main, monkeypatch):
+    monkeypatch.setattr(app_main, "SERVER_TIMING", True)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            plain = await client.get("/api/health")
+            streamed = await client.get("/api/explain/stream", params={"crop": "rice", "trait": "grain size"})
+            return plain, streamed
+
+    plain, streamed = asyncio.run(run())
+    assert "total;dur=" in plain.headers["server-timing"]
+    assert "server-timing" not in streamed.headers
+    assert sse_events(streamed.text)[-1] == ("done", {})
@@ -0,0 +1,88 @@
+import os
+import random
+
+import numpy as np
+
+import offtarget
+
+
+def write_genome(path, seed):
+    seq = "".join(random.Random(seed).choices("ACGT", k=5000))
+    with open(path, "w") as f:
+        f.write(f">chr1\n{seq}\n")
+
+
+def test_index_ignored_after_fasta_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(offtarget, "GENOME_DIR", str(tmp_path))
+    monkeypatch.setattr(offtarget, "_loaded", {})
+    fasta = str(tmp_path / "test_species.fa")
+    write_genome(fasta, 1)
+    offtarget.build_index(fasta, offtarget.index_dir_for("test_species"))
+    assert offtarget.get_index("test_species") is not None
+
+    write_genome(fasta, 2)
+    os.utime(fasta, (0, 0))
+    assert offtarget.get_index("test_species") is None
+
+    offtarget.build_index(fasta, offtarget.index_dir_for("test_species"))
+    assert offtarget.get_index("test_species") is not None
+
+
+def test_index_kept_when_fasta_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(offtarget, "GENOME_DIR", str(tmp_path))
+    monkeypatch.setattr(offtarget, "_loaded", {})
+    fasta = str(tmp_path / "test_species.fa")
+    write_genome(fasta, 1)
+    offtarget.build_index(fasta, offtarget.index_dir_for("test_species"))
+    os.remove(fasta)
+    assert offtarget.get_index("test_species") is not None
+
+
+COMPLEMENT = str.maketrans("ACGTN", "TGCAN")
+
+
+def brute_force(records, guide, max_mismatches):
+    """Counts per (PAM class, mismatches) by checking every position of both strands."""
+    counts = [[0] * (max_mismatches + 1) for _ in range(2)]
+    strands = [strand for seq in records for strand in (seq, seq.translate(COMPLEMENT)[::-1])]
+    for strand in strands:
+        for start in range(len(strand) - 22):
+            site, pam = strand[start:start + 20], strand[start + 20:start + 23]
+            if pam[1:] not in ("GG", "AG") or "N" in site + pam:
+                continue
+            mismatches = sum(a != b for a, b in zip(site, guide))
+            if mismatches <= max_mismatches:
+                counts[offtarget.PAM_NGG if pam[1] == "G" else offtarget.PAM_NAG][mismatches] += 1
+    return counts
+
+
+def mutate(rng, guide, n):
+    bases = list(guide)
+    for position in rng.sample(range(20), n):
+        bases[position] = rng.choice([b for b in "ACGT" if b != bases[position]])
+    return "".join(bases)
+
+
+def test_counts_match_brute_force(tmp_path):
+    rng = random.Random(7)
+    guides = ["".join(rng.choices("ACGT", k=20)) for _ in range(6)]
+    pieces = []
+    for _ in range(120):
+        pieces.append("".join(rng.choices("ACGT", k=rng.randint(5, 60))))
+        # Near copies of the guides, with either PAM, on either strand
+        site = mutate(rng, rng.choice(guides), rng.randint(0, 4)) + rng.choice("ACGT") + rng.choice(["GG", "AG"])
+        pieces.append(site if rng.random() < 0.5 else site.translate(COMPLEMENT)[::-1])
+    records = ["".join(pieces[:120]), "NN" + "".join(pieces[120:]) + "ACGTN"]
+    fasta = str(tmp_path / "genome.fa")
+    with open(fasta, "w") as f:
+        for number, seq in enumerate(records):
+            f.write(f">chr{number}\n" + "\n".join(seq[i:i + 60] for i in range(0, len(seq), 60)) + "\n")
+
+    # Small chunks and spills so sites across chunk boundaries and several partition passes are covered
+    meta = offtarget.build_index(fasta, str(tmp_path / "index"), chunk_sites=500, chunk_size=997)
+    index = offtarget.OffTargetIndex(str(tmp_path / "index"))
+    assert meta["sites"] == sum(map(sum, brute_force(records, "A" * 20, 20)))
+    expected = np.array([brute_force(records, guide, 3) for guide in guides])
+    assert (expected[:, :, 1:] > 0).any() and (expected[:, offtarget.PAM_NAG] > 0).any()
+    for max_mismatches in range(4):
+        assert (index.count(guides, max_mismatches) == expected[:, :, :max_mismatches + 1]).all()
@@ -0,0 +1,39 @@
+import sqlite3
+import time
+
+from report_store import ReportStore
+
+REPORT = {"crop": "rice", "trait": "grain size", "explanation": "..."}
+
+
+def test_degraded_reports_expire_sooner(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.sqlite"), max_age=3600, degraded_max_age=60)
+    store.put("rice", "grain size", "fp", REPORT)
+    store.put("rice", "drought tolerance", "fp", REPORT, degraded=True)
+    assert store.fingerprints()[("rice", "drought tolerance")][2] is True
+    assert store.stats()["degraded"] == 1
+
+    store._connect().execute("UPDATE reports SET created_at = ?", (time.time() - 120,))
+    assert store.get("rice", "grain size", "fp") is not None
+    assert store.get("rice", "drought tolerance", "fp") is None
+
+
+def test_degraded_reports_not_stored_when_max_age_is_zero(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.sqlite"), max_age=3600, degraded_max_age=0)
+    store.put("rice", "grain size", "fp", REPORT, degraded=True)
+    assert store.get("rice", "grain size", "fp") is None
+    assert store.fingerprints() == {}
+
+
+def test_adds_degraded_column_to_an_old_store(tmp_path):
+    path = str(tmp_path / "reports.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE reports (crop TEXT NOT NULL, trait TEXT NOT NULL, fingerprint TEXT NOT NULL,"
+            " body TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (crop, trait))"
+        )
+        conn.execute("INSERT INTO reports VALUES ('rice', 'grain size', 'fp', '{}', ?)", (time.time(),))
+    store = ReportStore(path, max_age=3600, degraded_max_age=60)
+    assert store.fingerprints()[("rice", "grain size")][2] is False
+    store.put("rice", "grain size", "fp", REPORT, degraded=True)
+    assert store.stats()["degraded"] == 1
@@ -0,0 +1,105 @@
+"""
+Dynamic micro-batching in front of the Keras model.
+
+Request threads submit one preprocessed (224,224,3) image each and block on
+a Future. A single worker thread takes the first waiting image, keeps
+collecting until it has `max_batch` images or `max_wait_ms` has passed since
+that first image arrived, runs one forward pass over the stacked batch and
+hands each caller its own row of probabilities.
+
+max_batch=1 degenerates to one predict per request, which is what the
+server did before batching. `collate` turns the list of queued images into
+the model input; the server passes BatchBuffer.collate so uint8 images are
+scaled straight into a preallocated float32 batch.
+"""
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    def __init__(self, predict_fn, max_batch: int = 16, max_wait_ms: float = 5.0, window: int = 1024, collate=np.stack):
+        self.predict_fn = predict_fn
+        self.collate = collate
+        self.max_batch = max(int(max_batch), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = collections.Counter()
+        self._delays = collections.deque(maxlen=window)  # seconds spent queued, most recent requests
+        self._requests = 0
+        self._batches = 0
+        self._delay_total = 0.0
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, image: np.ndarray) -> Future:
+        """Queues one (224,224,3) image; the Future resolves to its probability vector."""
+        future = Future()
+        self._queue.put((image, future, time.perf_counter()))
+        return future
+
+    def predict(self, image: np.ndarray, timeout: float = None) -> np.ndarray:
+        return self.submit(image).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self._record(len(batch), [started - queued for _, _, queued in batch])
+            live = [(image, future) for image, future, _ in batch if future.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            images, futures = zip(*live)
+            try:
+                probs = np.asarray(self.predict_fn(self.collate(images)))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, row in zip(futures, probs):
+                future.set_result(row)
+
+    def _record(self, size: int, delays):
+        with self._lock:
+            self._batches += 1
+            self._requests += size
+            self._batch_sizes[size] += 1
+            self._delay_total += sum(delays)
+            self._delays.extend(delays)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        with self._lock:
+            delays = np.array(self._delays) * 1000
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "requests": self._requests,
+                "batches": self._batches,
+                "mean_batch_size": round(self._requests / self._batches, 2) if self._batches else None,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "queue_depth": self.queue_depth(),
+                "queue_delay_ms": {
+                    "mean": round(self._delay_total * 1000 / self._requests, 3) if self._requests else None,
+                    "p50": round(float(np.percentile(delays, 50)), 3) if delays.size else None,
+                    "p99": round(float(np.percentile(delays, 99)), 3) if delays.size else None,
+                },
+            }
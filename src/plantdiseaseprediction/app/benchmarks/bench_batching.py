@@ -0,0 +1,71 @@
+"""
+Throughput versus tail latency of the micro-batcher at different settings.
+
+Each client thread submits preprocessed images back to back (closed loop)
+through a MicroBatcher wrapped around the loaded model; max_batch=1 is the
+one-predict-per-request baseline.
+
+    python benchmarks/bench_batching.py [--clients 32] [--requests 20] [--settings 1:0 8:2 16:5 32:10]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main as classifier  # noqa: E402
+from batching import MicroBatcher  # noqa: E402
+
+
+def run(batcher, clients, requests, image):
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        mine = []
+        for _ in range(requests):
+            began = time.perf_counter()
+            batcher.predict(image)
+            mine.append(time.perf_counter() - began)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - began, np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--settings", nargs="+", default=["1:0", "8:2", "16:5", "32:10"], help="max_batch:max_wait_ms")
+    args = parser.parse_args()
+
+    image = np.random.default_rng(0).random((224, 224, 3), dtype=np.float32)
+    predict = lambda batch: classifier.predict_batch(classifier.model, batch)  # noqa: E731
+    print(f"{'batch':>6} {'wait ms':>8} {'img/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'mean batch':>11} {'queue p99':>10}")
+    for setting in args.settings:
+        max_batch, max_wait_ms = setting.split(":")
+        batcher = MicroBatcher(predict, int(max_batch), float(max_wait_ms))
+        for size in {1, batcher.max_batch}:  # trace each batch shape before timing
+            predict(np.zeros((size, 224, 224, 3), dtype=np.float32))
+        elapsed, latencies = run(batcher, args.clients, args.requests, image)
+        stats = batcher.stats()
+        print(
+            f"{batcher.max_batch:>6} {float(max_wait_ms):>8.1f} {latencies.size / elapsed:>8.1f} "
+            f"{np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 99):>8.1f} "
+            f"{stats['mean_batch_size']:>11} {stats['queue_delay_ms']['p99']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Per-image cost and output difference of preprocess.py against the original
+load_image (resize, then RGB, then float64 / 255, then expand_dims).
+
+Synthetic photos are encoded in memory as a large JPEG, an RGBA PNG and a
+palette PNG; pass --images to use real files instead.
+
+    python benchmarks/bench_preprocess.py [--repeat 20] [--images leaf1.jpg leaf2.png]
+"""
+import argparse
+import io
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(APP_DIR))), "benchmarks"))
+
+import preprocess  # noqa: E402
+from timing import best_of  # noqa: E402
+
+
+def legacy_load_image(source):
+    """The original main.load_image, kept as the reference."""
+    img1 = Image.open(source)
+    img1 = img1.resize((224, 224))
+    img1 = img1.convert('RGB')
+    img1 = np.array(img1)
+    img1 = img1 / 255.0
+    return np.expand_dims(img1, axis=0)
+
+
+def synthetic_images(seed):
+    rng = np.random.default_rng(seed)
+    # Smooth gradients plus noise compress and resample like a photo rather than like static
+    y, x = np.mgrid[0:2448, 0:3264]
+    base = np.stack([x / 3264 * 180, y / 2448 * 200, (x + y) / 5712 * 120], axis=-1)
+    photo = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    images = {}
+    buffer = io.BytesIO()
+    Image.fromarray(photo).save(buffer, format="JPEG", quality=90)
+    images["jpeg 3264x2448"] = buffer.getvalue()
+    buffer = io.BytesIO()
+    Image.fromarray(photo[:1024, :1024]).convert("RGBA").save(buffer, format="PNG")
+    images["png rgba 1024"] = buffer.getvalue()
+    buffer = io.BytesIO()
+    Image.fromarray(photo[:1024, :1024]).quantize(64).save(buffer, format="PNG")
+    images["png palette 1024"] = buffer.getvalue()
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", nargs="*", help="image files to use instead of synthetic ones")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.images:
+        images = {os.path.basename(path): open(path, "rb").read() for path in args.images}
+    else:
+        images = synthetic_images(args.seed)
+
+    buffer = preprocess.BatchBuffer(1)
+    print(f"{'image':>18} {'legacy ms':>10} {'exact ms':>9} {'draft ms':>9} {'speedup':>8} {'max diff':>9} {'mean diff':>10}")
+    for name, data in images.items():
+        legacy_s, legacy = best_of(lambda: legacy_load_image(io.BytesIO(data)), args.repeat)
+        exact_s, _ = best_of(lambda: buffer.fill(0, data, draft=False), args.repeat)
+        draft_s, _ = best_of(lambda: buffer.fill(0, data), args.repeat)
+        diff = np.abs(buffer.array - legacy)
+        print(
+            f"{name:>18} {legacy_s * 1000:>10.2f} {exact_s * 1000:>9.2f} {draft_s * 1000:>9.2f} "
+            f"{legacy_s / draft_s:>7.1f}x {diff.max():>9.4f} {diff.mean():>10.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Compares the Keras backend with TFLite exports of the plant disease model.
+
+Each backend is loaded in a fresh process so startup time and resident
+memory are measured cold. Reports model size, startup time, peak RSS, per
+image latency, top-1 agreement with Keras and the largest probability
+difference. If --images is a directory whose subfolders are named after
+classes in class_indices.json, accuracy against those labels is also shown.
+
+    python compare_backends.py --images sample_leaves/
+    python compare_backends.py --lite trained_model/plant_disease_Pred1.int8.tflite --json results.json
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+_started = time.perf_counter()
+
+import numpy as np  # noqa: E402
+
+working_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_inputs(source: str, count: int, seed: int = 0):
+    """
+    (names, (n,224,224,3) float32, skipped) from a directory/archive, or
+    random images. Files that cannot be decoded are left out and listed in
+    `skipped` as (name, error).
+    """
+    import preprocess
+    from scan import decode, iter_images
+
+    if not source:
+        rng = np.random.default_rng(seed)
+        return [f"random_{i}" for i in range(count)], rng.random((count, 224, 224, 3), dtype=np.float32), []
+    names, images, skipped = [], [], []
+    for name, payload in iter_images(source):
+        name, pixels, error = decode(name, payload, draft=True)
+        if error:
+            skipped.append((name, error))
+            continue
+        images.append(pixels)
+        names.append(name)
+        if len(names) >= count:
+            break
+    if not images:
+        raise SystemExit(f"❌ No readable images in {source}")
+    batch = preprocess.BatchBuffer(len(images))
+    return names, batch.collate(images), skipped
+
+
+def measure(images_source, count, repeat):
+    """Runs inside the child process for one backend; prints a JSON report."""
+    import main  # loads the backend selected by PREDICT_BACKEND
+
+    startup = time.perf_counter() - _started
+    names, inputs, skipped = load_inputs(images_source, count)
+    main.predict_batch(main.model, inputs[:1])  # first call traces/allocates
+    latencies, probs = [], []
+    for _ in range(repeat):
+        for i in range(len(inputs)):
+            began = time.perf_counter()
+            out = main.predict_batch(main.model, inputs[i:i + 1])
+            latencies.append(time.perf_counter() - began)
+            if len(probs) < len(inputs):
+                probs.append(np.asarray(out)[0].tolist())
+    latencies = np.array(latencies) * 1000
+    print(json.dumps({
+        "backend": main.backend,
+        "model_path": main.model_path,
+        "model_size_mb": round(os.path.getsize(main.model_path) / 2**20, 2),
+        "startup_s": round(startup, 3),
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 3),
+            "p50": round(float(np.percentile(latencies, 50)), 3),
+            "p99": round(float(np.percentile(latencies, 99)), 3),
+        },
+        "names": names,
+        "skipped": skipped,
+        "probs": probs,
+        "class_indices": main.class_indices,
+    }))
+
+
+def run_backend(backend, lite_path, args):
+    env = dict(os.environ, PREDICT_BACKEND=backend, TF_CPP_MIN_LOG_LEVEL="3")
+    if lite_path:
+        env["PREDICT_TFLITE_MODEL"] = os.path.abspath(lite_path)
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--count", str(args.count), "--repeat", str(args.repeat)]
+    if args.images:
+        command += ["--images", os.path.abspath(args.images)]
+    with tempfile.TemporaryFile("w+") as stderr:
+        process = subprocess.Popen(command, env=env, cwd=working_dir, stdout=subprocess.PIPE, stderr=stderr, text=True)
+        stdout = process.stdout.read()
+        process.stdout.close()
+        if hasattr(os, "wait4"):
+            # The child's own resource usage: peak RSS over its whole life, model load included
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            peak_rss = round(usage.ru_maxrss / 1024, 1)
+        else:  # Windows
+            process.wait()
+            peak_rss = None
+        if process.returncode != 0:
+            stderr.seek(0)
+            raise SystemExit(f"❌ {backend} {lite_path or ''} failed:\n{stderr.read()[-2000:]}")
+    return {**json.loads(stdout.strip().splitlines()[-1]), "peak_rss_mb": peak_rss}
+
+
+def accuracy(report):
+    labels = set(report["class_indices"].values())
+    truth = [name.replace("\\", "/").split("/")[0] for name in report["names"]]
+    if not all(label in labels for label in truth):
+        return None
+    predicted = [report["class_indices"][str(int(np.argmax(p)))] for p in report["probs"]]
+    return round(float(np.mean([p == t for p, t in zip(predicted, truth)])), 4)
+
+
+def summarise(reports):
+    reference = np.array(reports[0]["probs"])
+    rows = []
+    for report in reports:
+        probs = np.array(report["probs"])
+        rows.append({
+            "backend": report["backend"] if report["backend"] == "keras" else os.path.basename(report["model_path"]),
+            "model_size_mb": report["model_size_mb"],
+            "startup_s": report["startup_s"],
+            "peak_rss_mb": report["peak_rss_mb"],
+            "latency_ms": report["latency_ms"],
+            "top1_agreement": round(float(np.mean(probs.argmax(axis=1) == reference.argmax(axis=1))), 4),
+            "max_prob_diff": round(float(np.abs(probs - reference).max()), 6),
+            "accuracy": accuracy(report),
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("--images", help="directory or archive of sample images (default: random inputs)")
+    parser.add_argument("--lite", nargs="*", help="TFLite models to compare (default: trained_model/*.tflite)")
+    parser.add_argument("--count", type=int, default=50, help="images to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return measure(args.images, args.count, args.repeat)
+
+    lite_paths = args.lite if args.lite is not None else sorted(glob.glob(f"{working_dir}/trained_model/*.tflite"))
+    if not lite_paths:
+        print("[WARNING] No .tflite models found; run export_lite.py first")
+    reports = [run_backend("keras", None, args)] + [run_backend("tflite", path, args) for path in lite_paths]
+    for name, error in reports[0]["skipped"]:
+        print(f"[WARNING] Skipping unreadable image {name}: {error}")
+    rows = summarise(reports)
+
+    print(f"{'backend':>34} {'MB':>7} {'startup s':>10} {'RSS MB':>8} {'p50 ms':>8} {'p99 ms':>8} {'top-1 agree':>12} {'max Δp':>8} {'accuracy':>9}")
+    for row in rows:
+        print(
+            f"{row['backend']:>34} {row['model_size_mb']:>7} {row['startup_s']:>10} {row['peak_rss_mb']:>8} "
+            f"{row['latency_ms']['p50']:>8} {row['latency_ms']['p99']:>8} {row['top1_agreement']:>12} "
+            f"{row['max_prob_diff']:>8.4f} {row['accuracy'] if row['accuracy'] is not None else '-':>9}"
+        )
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(rows, file, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
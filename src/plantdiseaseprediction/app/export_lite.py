@@ -0,0 +1,87 @@
+"""
+Converts trained_model/plant_disease_Pred1.h5 into a TFLite model for the
+lightweight backend (PREDICT_BACKEND=tflite, see lite_backend.py).
+
+    python export_lite.py --mode float16
+    python export_lite.py --mode int8 --calibration sample_leaves/ --samples 200
+
+float16 halves the file size and keeps accuracy essentially unchanged.
+int8 quantises weights and activations (inputs and outputs stay float32).
+It needs representative images to calibrate activation ranges, so point
+--calibration at a directory of real leaf photos. Random noise is used, with
+a warning, when none is given, but it calibrates poorly.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+import preprocess
+from scan import iter_images
+
+working_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL = f"{working_dir}/trained_model/plant_disease_Pred1.h5"
+
+
+def default_output(model_path: str, mode: str) -> str:
+    return f"{os.path.splitext(model_path)[0]}.{mode}.tflite"
+
+
+def calibration_batches(source: str, samples: int, seed: int = 0):
+    """Yields [(1,224,224,3) float32] representative inputs for the int8 converter."""
+    if source:
+        count = 0
+        for name, payload in iter_images(source):
+            try:
+                yield [preprocess.to_batch(payload)]
+            except Exception as e:
+                print(f"[WARNING] Skipping calibration image {name}: {e}")
+                continue
+            count += 1
+            if count >= samples:
+                return
+        if count == 0:
+            raise SystemExit(f"❌ No readable images in {source}")
+        return
+    print("[WARNING] No --calibration images given; calibrating int8 on random noise")
+    rng = np.random.default_rng(seed)
+    for _ in range(samples):
+        yield [rng.random((1, 224, 224, 3), dtype=np.float32)]
+
+
+def export(model_path: str, output: str, mode: str, calibration: str = None, samples: int = 100) -> str:
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == "int8":
+        converter.representative_dataset = lambda: calibration_batches(calibration, samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    flatbuffer = converter.convert()
+    with open(output, "wb") as file:
+        file.write(flatbuffer)
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Keras .h5 model")
+    parser.add_argument("--mode", choices=["float16", "int8", "dynamic"], default="float16",
+                        help="dynamic = int8 weights, float activations, no calibration")
+    parser.add_argument("--output", help="default: <model>.<mode>.tflite")
+    parser.add_argument("--calibration", help="directory or archive of sample images (int8)")
+    parser.add_argument("--samples", type=int, default=100, help="calibration images to use (int8)")
+    args = parser.parse_args(argv)
+
+    output = args.output or default_output(args.model, args.mode)
+    export(args.model, output, args.mode, args.calibration, args.samples)
+    size_mb = os.path.getsize(output) / 2**20
+    print(f"✅ {args.mode} model written to {output} ({size_mb:.1f} MB, .h5 was {os.path.getsize(args.model) / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
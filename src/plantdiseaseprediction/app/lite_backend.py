@@ -0,0 +1,69 @@
+"""
+TFLite inference backend for the plant disease model.
+
+LiteModel wraps a .tflite file produced by export_lite.py behind the two
+Keras methods the app uses, predict(x, verbose=0) and predict_on_batch(x),
+so main.py, server.py and scan.py work unchanged with PREDICT_BACKEND=tflite.
+
+The interpreter comes from the first of these that is installed:
+ai-edge-litert or tflite-runtime (a few MB, no TensorFlow), then
+tensorflow.lite as a last resort. int8 models take and return float32 here;
+quantisation of the input and output happens inside.
+"""
+import threading
+
+import numpy as np
+
+
+def load_interpreter_class():
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class LiteModel:
+    def __init__(self, path: str, num_threads: int = None):
+        self.path = path
+        self.interpreter = load_interpreter_class()(model_path=path, num_threads=num_threads)
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch = None
+        self._lock = threading.Lock()  # an interpreter must not be invoked from two threads at once
+        self._resize(1)
+
+    def _resize(self, batch: int):
+        if batch == self._batch:
+            return
+        self.interpreter.resize_tensor_input(self._input["index"], [batch, *self._input["shape"][1:]])
+        self.interpreter.allocate_tensors()
+        self._batch = batch
+
+    def predict_on_batch(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.asarray(batch, dtype=np.float32)
+        scale, zero_point = self._input["quantization"]
+        if scale:
+            batch = np.clip(np.round(batch / scale + zero_point), *_limits(self._input["dtype"])).astype(self._input["dtype"])
+        with self._lock:
+            self._resize(len(batch))
+            self.interpreter.set_tensor(self._input["index"], batch)
+            self.interpreter.invoke()
+            out = self.interpreter.get_tensor(self._output["index"])
+        scale, zero_point = self._output["quantization"]
+        if scale:
+            return (out.astype(np.float32) - zero_point) * scale
+        return out.copy()
+
+    def predict(self, batch: np.ndarray, verbose=0) -> np.ndarray:
+        return self.predict_on_batch(batch)
+
+
+def _limits(dtype):
+    info = np.iinfo(dtype)
+    return info.min, info.max
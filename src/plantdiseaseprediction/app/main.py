@@ -1,34 +1,51 @@
 import os
 import json
-from PIL import Image
 
 import numpy as np
-import tensorflow as tf
+
+import preprocess
 # import streamlit as st # Streamlit is not needed for the Next.js API route
 
 working_dir = os.path.dirname(os.path.abspath(__file__))   # it provide absolute path for app directory
-model_path = f"{working_dir}/trained_model/plant_disease_Pred1.h5"
-# Load the pre-trained model
-model = tf.keras.models.load_model(model_path)
+model_path = os.getenv("PREDICT_MODEL", f"{working_dir}/trained_model/plant_disease_Pred1.h5")
+# keras: the .h5 on full TensorFlow; tflite: a model from export_lite.py on the small TFLite interpreter
+backend = os.getenv("PREDICT_BACKEND", "keras")
+lite_model_path = os.getenv("PREDICT_TFLITE_MODEL", f"{working_dir}/trained_model/plant_disease_Pred1.float16.tflite")
+
+# Load the pre-trained model (TensorFlow is only imported for the keras backend)
+if backend == "tflite":
+   import lite_backend
+   model_path = lite_model_path
+   model = lite_backend.LiteModel(model_path)
+else:
+   import tensorflow as tf
+   model = tf.keras.models.load_model(model_path)
 
 # loading the class names
-class_indices = json.load(open(f"{working_dir}/class_indices.json"))
+class_indices_path = f"{working_dir}/class_indices.json"
+class_indices = json.load(open(class_indices_path))
+
+# Load and Preprocess the Image (see preprocess.py): RGB at 224x224, scaled to [0,1] float32,
+# with the batch dimension ---> important step (1,224,224,3)
+def load_image(path):
+   return preprocess.to_batch(path)
 
-# Function to Load and Preprocess the Image using Pillow
 def predict_class(model,path,class_indices):
-   img1 = Image.open(path)
-   img1 = img1.resize((224,224))
-   img1 = img1.convert('RGB')
-   img1 = np.array(img1)
-   img1 = img1 / 255.0  # optional depending on model preprocessing
-
-# Add batch dimension ---> important step (1,224,224,3)
-   img1 = np.expand_dims(img1, axis=0)
+   img1 = load_image(path)
 # Predict
-   y_p = model.predict(img1)
+   y_p = model.predict(img1, verbose=0)
    y_predicted = y_p.argmax(axis=1)
    return class_indices[str(y_predicted[0])]
 
+# Forward pass over an already stacked (n,224,224,3) batch; used by the micro-batcher
+def predict_batch(model,batch):
+   return model.predict_on_batch(batch)
+
+# The k most likely classes for one probability vector
+def top_k_from_probs(probs,class_indices,k=3):
+   top = np.argsort(probs)[::-1][:k]
+   return [{"label": class_indices[str(i)], "probability": float(probs[i])} for i in top]
+
 # The Streamlit app part will be removed as we are creating a Next.js API route
 # st.title('🌿Plant Disease Predictor🔍')
 # uploaded_image = st.file_uploader("Upload an image...", type=["jpg", "jpeg", "png"])
@@ -0,0 +1,74 @@
+"""
+Image preprocessing for the plant disease model.
+
+Images are decoded straight to RGB before resizing, so palette and RGBA
+uploads are resampled as colour rather than as palette indices. JPEGs use
+Pillow's draft mode to let the decoder downscale in the DCT domain, never
+below the target size. The only full-size float array is the model input
+itself, written as float32 into a preallocated BatchBuffer.
+
+Sources may be paths, file objects or raw bytes; nothing touches disk.
+"""
+import io
+
+import numpy as np
+from PIL import Image
+
+TARGET_SIZE = (224, 224)
+_SCALE = np.float32(1 / 255)
+
+
+def open_image(source) -> Image.Image:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    return Image.open(source)
+
+
+def decode_rgb(source, size=TARGET_SIZE, draft: bool = True) -> np.ndarray:
+    """The image as a (height, width, 3) uint8 array at `size`."""
+    img = open_image(source)
+    if draft and img.format == "JPEG":
+        img.draft("RGB", size)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if img.size != tuple(size):
+        img = img.resize(size, Image.BICUBIC)
+    return np.asarray(img)
+
+
+def scale_into(pixels: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Writes pixels / 255 into `out` (float32) without an intermediate copy."""
+    return np.multiply(pixels, _SCALE, out=out)
+
+
+class BatchBuffer:
+    """
+    A reusable float32 (capacity, 224, 224, 3) model input. Not thread-safe:
+    give each worker its own.
+    """
+
+    def __init__(self, capacity: int, size=TARGET_SIZE):
+        self.array = np.empty((capacity, size[1], size[0], 3), dtype=np.float32)
+        self.size = size
+
+    @property
+    def capacity(self) -> int:
+        return len(self.array)
+
+    def fill(self, index: int, source, draft: bool = True) -> np.ndarray:
+        return scale_into(decode_rgb(source, self.size, draft), self.array[index])
+
+    def collate(self, images) -> np.ndarray:
+        """Scales decoded uint8 images into the buffer; returns a view of the first len(images) rows."""
+        if len(images) > self.capacity:
+            raise ValueError(f"{len(images)} images do not fit in a batch of {self.capacity}")
+        for index, pixels in enumerate(images):
+            scale_into(pixels, self.array[index])
+        return self.array[:len(images)]
+
+
+def to_batch(source, draft: bool = True) -> np.ndarray:
+    """One image as a fresh (1, 224, 224, 3) float32 model input."""
+    buffer = BatchBuffer(1)
+    buffer.fill(0, source, draft)
+    return buffer.array
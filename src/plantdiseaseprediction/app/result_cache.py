@@ -0,0 +1,133 @@
+"""
+Prediction cache keyed by the content of the uploaded image.
+
+The key is sha256(model version + raw image bytes), where the model version
+is a hash of the model file and class_indices.json as loaded. A retrain or a
+relabelled class list therefore gets fresh keys, and rows for older versions
+are dropped from the disk store when it is opened.
+
+Entries are the full probability vector, so one cached forward pass serves
+any top_k. The in-memory layer is an LRU bounded by bytes. The optional
+SQLite layer survives restarts and is consulted on a memory miss.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+_ENTRY_OVERHEAD = 200  # key string, tuple and OrderedDict node, roughly
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def model_version(*paths: str) -> str:
+    """A short hash over the contents of every file that determines the model's answers."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(file_digest(path).encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+class ResultCache:
+    def __init__(self, version: str, max_bytes: int, path: str = None):
+        self.version = version
+        self.max_bytes = max_bytes
+        self.path = path
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            conn = self._connect()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, version TEXT NOT NULL, probs BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("DELETE FROM results WHERE version != ?", (version,))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def key(self, data: bytes) -> str:
+        digest = hashlib.sha256(self.version.encode("ascii"))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """The cached probability vector, or None."""
+        with self._lock:
+            probs = self._entries.get(key)
+            if probs is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return probs
+        if self.path:
+            row = self._connect().execute("SELECT probs FROM results WHERE key = ?", (key,)).fetchone()
+            if row:
+                probs = np.frombuffer(row[0], dtype=np.float32)
+                self._remember(key, probs)
+                with self._lock:
+                    self._counters["disk_hits"] += 1
+                return probs
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, key: str, probs: np.ndarray):
+        probs = np.array(probs, dtype=np.float32)  # own copy: the caller's row may be a view into a reused batch
+        probs.flags.writeable = False
+        self._remember(key, probs)
+        if self.path:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO results (key, version, probs, created_at) VALUES (?, ?, ?, ?)",
+                (key, self.version, probs.tobytes(), time.time()),
+            )
+
+    def _remember(self, key: str, probs: np.ndarray):
+        size = probs.nbytes + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes + _ENTRY_OVERHEAD
+            self._entries[key] = probs
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes + _ENTRY_OVERHEAD
+                self._counters["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            lookups = counters["hits"] + counters["disk_hits"] + counters["misses"]
+            stats = {
+                "version": self.version,
+                **counters,
+                "hit_ratio": round((counters["hits"] + counters["disk_hits"]) / lookups, 4) if lookups else None,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+        if self.path:
+            stats["disk_entries"] = self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return stats
@@ -0,0 +1,292 @@
+"""
+Bulk offline disease scan over a directory tree or a .tar/.tar.gz/.zip
+archive of leaf photos.
+
+Images are decoded and resized in a pool of worker processes while the
+model runs over large batches in this one. Results are appended to a CSV
+file, or to numbered part files when the output ends in .parquet (needs
+pyarrow). Images already classified in the output are skipped, so an
+interrupted scan picks up where it stopped when rerun with the same
+arguments. Images that failed to decode are tried again on a rerun, which
+appends a new row for them; the last row for a path is the current one.
+
+    python scan.py survey_photos/ --output survey.csv
+    python scan.py survey.zip --output survey.parquet --batch-size 128 --workers 8
+
+Columns: path, label, probability, top_k (JSON [[label, probability], ...]), error
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import preprocess
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp", ".tif", ".tiff"}
+COLUMNS = ["path", "label", "probability", "top_k", "error"]
+
+
+def is_image(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def iter_images(source: str):
+    """
+    Yields (name, payload) for every image under `source`. Directory images
+    are passed on as paths so workers read them; archive members are read
+    here as bytes, streaming tar archives in one pass.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for file in sorted(files):
+                if is_image(file):
+                    path = os.path.join(root, file)
+                    yield os.path.relpath(path, source), path
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and is_image(info.filename):
+                    yield info.filename, archive.read(info)
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source, mode="r|*") as archive:
+            for member in archive:
+                if member.isfile() and is_image(member.name):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise SystemExit(f"❌ {source} is not a directory, zip or tar archive")
+
+
+def decode(name: str, payload, draft: bool):
+    """Worker side: (name, uint8 224x224x3 pixels or None, error or None)."""
+    try:
+        return name, preprocess.decode_rgb(payload, draft=draft), None
+    except Exception as e:
+        return name, None, f"{type(e).__name__}: {e}"
+
+
+class CsvSink:
+    def __init__(self, path: str):
+        self.path = path
+        self._trim_partial_line()
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        if new:
+            self._writer.writerow(COLUMNS)
+
+    def _trim_partial_line(self):
+        # A scan killed mid-write can leave half a row; drop it so that image is redone
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as file:
+            data = file.read()
+            if data and not data.endswith(b"\n"):
+                file.truncate(data.rfind(b"\n") + 1)
+
+    def done(self) -> set:
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, newline="", encoding="utf-8") as file:
+            return {row["path"] for row in csv.DictReader(file) if not row["error"]}
+
+    def write(self, rows):
+        self._writer.writerows([[row[column] for column in COLUMNS] for row in rows])
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    """
+    Writes <stem>.part-NNNNN.parquet files of about `rows_per_part` rows.
+    Every write() (one inference batch) goes straight to the open part as a
+    row group, so only the current batch is held in memory. A part is renamed
+    into place once complete; an interrupted scan redoes the unfinished one.
+    """
+
+    def __init__(self, path: str, rows_per_part: int = 100_000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("❌ Parquet output needs pyarrow: pip install pyarrow")
+        self._pa, self._pq = pyarrow, pyarrow.parquet
+        # Fixed schema so a part holding only failed rows still matches the others
+        self._schema = pyarrow.schema([
+            ("path", pyarrow.string()), ("label", pyarrow.string()), ("probability", pyarrow.float64()),
+            ("top_k", pyarrow.string()), ("error", pyarrow.string()),
+        ])
+        self.directory = os.path.dirname(os.path.abspath(path))
+        self.stem = os.path.splitext(os.path.basename(path))[0]
+        self.rows_per_part = rows_per_part
+        self._writer = None
+        self._part_rows = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._next_part = len(self._parts())
+
+    def _parts(self):
+        prefix = f"{self.stem}.part-"
+        return sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.startswith(prefix) and name.endswith(".parquet")
+        )
+
+    def done(self) -> set:
+        done = set()
+        for part in self._parts():
+            table = self._pq.read_table(part, columns=["path", "error"])
+            done.update(path for path, error in zip(table["path"].to_pylist(), table["error"].to_pylist()) if not error)
+        return done
+
+    def _part_path(self) -> str:
+        return os.path.join(self.directory, f"{self.stem}.part-{self._next_part:05d}.parquet")
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._part_path() + ".tmp", self._schema)
+        self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self._schema))
+        self._part_rows += len(rows)
+        if self._part_rows >= self.rows_per_part:
+            self._finish_part()
+
+    def _finish_part(self):
+        self._writer.close()
+        os.replace(self._part_path() + ".tmp", self._part_path())
+        self._writer = None
+        self._part_rows = 0
+        self._next_part += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._finish_part()
+
+
+def open_sink(path: str, rows_per_part: int = 100_000):
+    return ParquetSink(path, rows_per_part) if path.endswith(".parquet") else CsvSink(path)
+
+
+class Scanner:
+    def __init__(self, batch_size: int, top_k: int):
+        import main as classifier  # loads TensorFlow and the model; kept out of the worker processes
+
+        self.classifier = classifier
+        self.top_k = top_k
+        self.buffer = preprocess.BatchBuffer(batch_size)
+        self.names, self.images = [], []
+
+    def add(self, name, pixels):
+        self.names.append(name)
+        self.images.append(pixels)
+        return self.flush() if len(self.images) == self.buffer.capacity else []
+
+    def flush(self):
+        if not self.images:
+            return []
+        probs = self.classifier.predict_batch(self.classifier.model, self.buffer.collate(self.images))
+        rows = []
+        for name, row in zip(self.names, probs):
+            top = self.classifier.top_k_from_probs(row, self.classifier.class_indices, self.top_k)
+            rows.append({
+                "path": name,
+                "label": top[0]["label"],
+                "probability": round(top[0]["probability"], 6),
+                "top_k": json.dumps([[entry["label"], round(entry["probability"], 6)] for entry in top]),
+                "error": "",
+            })
+        self.names, self.images = [], []
+        return rows
+
+
+def scan(source, output, batch_size=64, workers=None, top_k=3, draft=True, progress_every=500, rows_per_part=100_000):
+    sink = open_sink(output, rows_per_part)
+    done = sink.done()
+    workers = workers or os.cpu_count() or 1
+    window = max(batch_size * 2, workers * 4)  # decoded images in flight, bounds memory
+    # spawn keeps TensorFlow state out of the workers on every platform
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    scanner = Scanner(batch_size, top_k)
+    # "scanned" counts classified images only; decode failures go to "failed"
+    counts = {"scanned": 0, "failed": 0, "skipped": 0}
+    failed_rows = []  # written with the next batch, so failures do not make row groups of their own
+    began = time.perf_counter()
+
+    def write(rows):
+        rows = rows + failed_rows
+        failed_rows.clear()
+        if not rows:
+            return
+        sink.write(rows)
+        before = counts["scanned"] // progress_every
+        counts["scanned"] += sum(1 for row in rows if not row["error"])
+        if counts["scanned"] // progress_every > before:
+            rate = counts["scanned"] / (time.perf_counter() - began)
+            print(f"[scan] {counts['scanned']} images, {rate:.1f} img/s", flush=True)
+
+    def collect(future):
+        name, pixels, error = future.result()
+        if error:
+            counts["failed"] += 1
+            failed_rows.append({"path": name, "label": None, "probability": None, "top_k": None, "error": error})
+            if len(failed_rows) >= batch_size:
+                write([])
+        else:
+            rows = scanner.add(name, pixels)
+            if rows:
+                write(rows)
+
+    try:
+        pending = deque()
+        for name, payload in iter_images(source):
+            if name in done:
+                counts["skipped"] += 1
+                continue
+            pending.append(pool.submit(decode, name, payload, draft))
+            if len(pending) >= window:
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+        write(scanner.flush())
+    finally:
+        pool.shutdown(cancel_futures=True)
+        sink.close()
+
+    elapsed = time.perf_counter() - began
+    counts["seconds"] = round(elapsed, 2)
+    counts["images_per_second"] = round(counts["scanned"] / elapsed, 1) if elapsed else None
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("source", help="directory, .zip or .tar[.gz] of images")
+    parser.add_argument("--output", "-o", default="scan_results.csv", help="results file (.csv or .parquet)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=None, help="decoding processes (default: all cores)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--no-draft", action="store_true", help="decode JPEGs at full size before resizing")
+    parser.add_argument("--rows-per-part", type=int, default=100_000, help="rows per Parquet part file")
+    args = parser.parse_args(argv)
+
+    counts = scan(
+        args.source, args.output, args.batch_size, args.workers, args.top_k,
+        draft=not args.no_draft, rows_per_part=args.rows_per_part,
+    )
+    print(
+        f"✅ {counts['scanned']} images in {counts['seconds']}s ({counts['images_per_second']} img/s), "
+        f"{counts['failed']} failed, {counts['skipped']} already done -> {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
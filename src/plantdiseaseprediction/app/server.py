@@ -0,0 +1,126 @@
+"""
+Long-lived plant disease inference service.
+
+Importing main loads plant_disease_Pred1.h5 and class_indices.json once for
+the life of the process; a warm-up prediction then runs in the background so
+the first real request does not pay for graph tracing. Concurrent requests
+are grouped by a MicroBatcher (batching.py) so a burst of uploads shares one
+forward pass. The Next.js route /api/predict-disease forwards uploads here.
+
+    python server.py                      # http://127.0.0.1:5001
+
+GET  /healthz   process is up
+GET  /readyz    200 once the model is loaded and warmed up, 503 before
+POST /predict   multipart field "image" (or the raw image as the body), ?top_k=3
+GET  /stats     batch sizes, queueing delay and result cache hit ratio
+
+PREDICT_MAX_BATCH (16) and PREDICT_MAX_WAIT_MS (5) bound how many images
+share a forward pass and how long the first of them may wait for company.
+Repeat uploads of the same image are answered from ResultCache
+(result_cache.py): PREDICT_CACHE_MB (64) bounds it in memory, and
+PREDICT_CACHE_PATH, if set, also keeps results in SQLite across restarts.
+PREDICT_BACKEND=tflite serves a model from export_lite.py (PREDICT_TFLITE_MODEL)
+without importing TensorFlow.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+from flask import Flask, jsonify, request
+
+import main
+import preprocess
+from batching import MicroBatcher
+from result_cache import ResultCache, model_version
+
+HOST = os.getenv("PREDICT_HOST", "127.0.0.1")
+PORT = int(os.getenv("PREDICT_PORT", 5001))
+READY_TIMEOUT = float(os.getenv("PREDICT_READY_TIMEOUT", 60))
+MAX_BATCH = int(os.getenv("PREDICT_MAX_BATCH", 16))
+MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", 5))
+CACHE_MB = float(os.getenv("PREDICT_CACHE_MB", 64))
+CACHE_PATH = os.getenv("PREDICT_CACHE_PATH", "")
+
+app = Flask(__name__)
+batcher = MicroBatcher(
+    lambda batch: main.predict_batch(main.model, batch),
+    MAX_BATCH,
+    MAX_WAIT_MS,
+    collate=preprocess.BatchBuffer(MAX_BATCH).collate,
+)
+results = ResultCache(model_version(main.model_path, main.class_indices_path), int(CACHE_MB * 2**20), CACHE_PATH or None)
+ready = threading.Event()
+warm_up_ms = None
+
+
+def warm_up():
+    global warm_up_ms
+    start = time.perf_counter()
+    for size in {1, MAX_BATCH}:
+        main.predict_batch(main.model, np.zeros((size, 224, 224, 3), dtype=np.float32))
+    warm_up_ms = round((time.perf_counter() - start) * 1000, 2)
+    ready.set()
+
+
+@app.get("/healthz")
+def healthz():
+    return jsonify({"status": "ok"})
+
+
+@app.get("/readyz")
+def readyz():
+    if not ready.is_set():
+        return jsonify({"ready": False}), 503
+    return jsonify({"ready": True, "classes": len(main.class_indices), "warm_up_ms": warm_up_ms})
+
+
+@app.post("/predict")
+def predict():
+    start = time.perf_counter()
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("image")
+        data = upload.read() if upload else b""
+    else:
+        data = request.get_data()
+    if not data:
+        return jsonify({"error": "No image provided"}), 400
+    top_k = min(max(request.args.get("top_k", default=3, type=int), 1), len(main.class_indices))
+    key = results.key(data)
+    probs = results.get(key)
+    cached = probs is not None
+    loaded = done = time.perf_counter()
+    if not cached:
+        if not ready.wait(READY_TIMEOUT):
+            return jsonify({"error": "Model is still loading"}), 503
+        try:
+            image = preprocess.decode_rgb(data)
+        except Exception as e:  # PIL.UnidentifiedImageError and friends
+            return jsonify({"error": f"Could not process image: {e}"}), 400
+        loaded = time.perf_counter()
+        probs = batcher.predict(image)
+        done = time.perf_counter()
+        results.put(key, probs)
+    top = main.top_k_from_probs(probs, main.class_indices, top_k)
+    return jsonify({
+        "prediction": top[0]["label"],
+        "top_k": top,
+        "cached": cached,
+        "timings_ms": {
+            "preprocess": round((loaded - start) * 1000, 2),
+            "inference": round((done - loaded) * 1000, 2),
+            "total": round((time.perf_counter() - start) * 1000, 2),
+        },
+    })
+
+
+@app.get("/stats")
+def stats():
+    return jsonify({"batching": batcher.stats(), "result_cache": results.stats()})
+
+
+threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+if __name__ == "__main__":
+    print(f"🌿 Plant disease inference server on http://{HOST}:{PORT}")
+    app.run(host=HOST, port=PORT, threaded=True)
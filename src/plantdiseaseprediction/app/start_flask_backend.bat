@@ -8,9 +8,9 @@ REM call venv\Scripts\activate
 
 :loop
 echo Starting Flask backend...
-set FLASK_APP=main.py
+set FLASK_APP=server.py
 set FLASK_ENV=development
-flask run --host=0.0.0.0 --port=5000
+flask run --host=0.0.0.0 --port=5001
 echo Flask crashed or stopped. Restarting in 5 seconds...
 timeout /t 5
 goto loop 
\ No newline at end of file